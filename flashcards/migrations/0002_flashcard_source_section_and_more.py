@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flashcards', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='source_section',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='flashcardset',
+            name='source_sections',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -10,6 +10,8 @@ class FlashcardSet(models.Model):
     note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name='flashcard_sets', null=True, blank=True)
     subject = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True)
     is_public = models.BooleanField(default=False)
+    # Fingerprints of the note sections the cards were generated from (see regenerate_flashcards)
+    source_sections = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -26,6 +28,7 @@ class Flashcard(models.Model):
     back_text = models.TextField()
     hint = models.TextField(blank=True)
     order = models.IntegerField(default=0)
+    source_section = models.CharField(max_length=64, blank=True)  # fingerprint of the note section it covers
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -0,0 +1,297 @@
+"""
+AI flashcard generation shared by the flashcard views and background generation jobs
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import FlashcardSet, Flashcard
+from generation.coalesce import coalesce_key, single_flight
+from generation.drafts import take_draft
+from generation.parsing import valid_items, validate_flashcard
+from generation.text import match_section, section_index
+from generation.utils import item_count
+
+
+def _create_flashcard(flashcard_set, card_data, order, sections=None):
+    """Save one generated card; sections is the note's section_index, if any"""
+    return Flashcard.objects.create(
+        flashcard_set=flashcard_set,
+        front_text=card_data['front_text'],
+        back_text=card_data['back_text'],
+        hint=card_data.get('hint', '') or '',
+        order=order,
+        source_section=match_section(f"{card_data['front_text']} {card_data['back_text']}", sections)
+    )
+
+
+def _bulk_create_flashcards(flashcard_set, flashcards_data, first_order=1, sections=None):
+    """Save generated cards with one INSERT; sections is the note's section_index, if any"""
+    return Flashcard.objects.bulk_create([
+        Flashcard(
+            flashcard_set=flashcard_set,
+            front_text=card_data['front_text'],
+            back_text=card_data['back_text'],
+            hint=card_data.get('hint', '') or '',
+            order=first_order + i,
+            source_section=match_section(f"{card_data['front_text']} {card_data['back_text']}", sections)
+        )
+        for i, card_data in enumerate(flashcards_data)
+    ])
+
+
+def build_flashcard_set(flashcards_data, sections=None, **fields):
+    """
+    Save generated cards as a new flashcard set created with `fields`
+
+    Like quizzes.services.build_quiz: the payload is validated before
+    anything is written, and the set and its cards are written in one
+    transaction with two INSERTs.
+    """
+    flashcards_data = valid_items(flashcards_data, validate_flashcard, 'flashcards')
+    with transaction.atomic():
+        flashcard_set = FlashcardSet.objects.create(**fields)
+        _bulk_create_flashcards(flashcard_set, flashcards_data, sections=sections)
+    return flashcard_set
+
+
+def _save_streamed_flashcards(flashcard_set, flashcards_data, sections=None):
+    """Save each streamed card as soon as it arrives and yield it"""
+    saved = 0
+    try:
+        for card_data in flashcards_data:
+            saved += 1
+            yield _create_flashcard(flashcard_set, card_data, saved, sections)
+    finally:
+        if not saved:
+            flashcard_set.delete()
+
+
+def create_flashcards_from_note(user, note, num_cards=10, use_cache=True, progress=None):
+    """
+    Generate flashcards for a note with AI and save them as a new set
+
+    A speculative draft for the unchanged note is used when there is one;
+    otherwise identical concurrent requests share one generation and
+    receive the same set.
+    """
+    num_cards = item_count(num_cards, settings.AI_MAX_FLASHCARDS)
+    flashcards_data = take_draft(note, 'flashcards', num_cards) if use_cache else None
+    if flashcards_data:
+        return save_note_flashcards(user, note, flashcards_data)
+
+    key = coalesce_key(user, 'flashcards_from_note', note.id, note.title, note.content, num_cards, use_cache)
+    flashcard_set_id = single_flight(key, lambda: _create_flashcards_from_note(
+        user, note, num_cards, use_cache, progress
+    ).id)
+    return FlashcardSet.objects.get(id=flashcard_set_id)
+
+
+def _create_flashcards_from_note(user, note, num_cards=10, use_cache=True, progress=None):
+    """Generate flashcards for a note with AI and save them as a new set"""
+    from studybuddy.ai_service import ai_service
+
+    # Generate flashcards using AI
+    flashcards_data = ai_service.generate_flashcards(
+        note_content=note.content,
+        note_title=note.title,
+        num_cards=num_cards,
+        use_cache=use_cache
+    )
+
+    if progress:
+        progress(80, 'Saving flashcards')
+
+    return save_note_flashcards(user, note, flashcards_data)
+
+
+def save_note_flashcards(user, note, flashcards_data):
+    """Save AI-generated cards as a new flashcard set on note"""
+    sections = section_index(note.content)
+    return build_flashcard_set(
+        flashcards_data,
+        sections,
+        title=f"Flashcards: {note.title}",
+        description=f"AI-generated flashcards from note: {note.title}",
+        user=user,
+        note=note,
+        subject=note.subject,
+        source_sections=[fingerprint for fingerprint, _, _ in sections]
+    )
+
+
+def regenerate_flashcards(user, flashcard_set, use_cache=True, progress=None):
+    """
+    Bring a note's flashcard set up to date after the note was edited
+
+    Cards whose source section is unchanged are kept along with their
+    review progress; cards from edited or removed sections are deleted,
+    dropping their review progress, and replaced by cards generated from
+    the changed sections only (see quizzes.services.regenerate_quiz).
+
+    Returns (flashcard_set, {'kept': n, 'removed': n, 'added': n}).
+    Identical concurrent requests share one regeneration.
+    """
+    note = flashcard_set.note
+    key = coalesce_key(user, 'flashcards_regenerate', flashcard_set.id, note.title, note.content, use_cache)
+    # No linger: a later request must regenerate again and report its own changes
+    changes = single_flight(key, lambda: _regenerate_flashcards(flashcard_set, use_cache, progress), linger=0)
+    flashcard_set.refresh_from_db()
+    return flashcard_set, changes
+
+
+def _regenerate_flashcards(flashcard_set, use_cache=True, progress=None):
+    from studybuddy.ai_service import ai_service
+
+    note = flashcard_set.note
+    sections = section_index(note.content)
+    current = {fingerprint for fingerprint, _, _ in sections}
+    previous = set(flashcard_set.source_sections)
+    changed = [entry for entry in sections if entry[0] not in previous]
+
+    cards = list(flashcard_set.flashcards.all())
+    kept = [card for card in cards if card.source_section in current]
+    removed = [card for card in cards if card.source_section not in current]
+
+    flashcards_data = []
+    if changed:
+        flashcards_data = valid_items(ai_service.generate_flashcards(
+            note_content='\n\n'.join(text for _, text, _ in changed),
+            note_title=note.title,
+            num_cards=max(len(removed), 1),
+            use_cache=use_cache
+        ), validate_flashcard, 'flashcards')
+
+    if progress:
+        progress(80, 'Saving flashcards')
+
+    with transaction.atomic():
+        Flashcard.objects.filter(id__in=[card.id for card in removed]).delete()
+        for order, card in enumerate(kept, 1):
+            card.order = order
+        Flashcard.objects.bulk_update(kept, ['order'])
+        _bulk_create_flashcards(flashcard_set, flashcards_data, len(kept) + 1, changed)
+
+        flashcard_set.source_sections = [fingerprint for fingerprint, _, _ in sections]
+        flashcard_set.save(update_fields=['source_sections', 'updated_at'])
+
+    return {'kept': len(kept), 'removed': len(removed), 'added': len(flashcards_data)}
+
+
+def create_flashcards_from_topic(user, topic, description='', num_cards=10, subject_name='',
+                                 use_cache=True, progress=None):
+    """
+    Generate flashcards about a topic with AI and save them as a new set without a note
+
+    Identical concurrent requests share one generation and receive the same set.
+    """
+    num_cards = item_count(num_cards, settings.AI_MAX_FLASHCARDS)
+    key = coalesce_key(user, 'flashcards_from_topic', topic, description, num_cards, subject_name, use_cache)
+    flashcard_set_id = single_flight(key, lambda: _create_flashcards_from_topic(
+        user, topic, description, num_cards, subject_name, use_cache, progress
+    ).id)
+    return FlashcardSet.objects.get(id=flashcard_set_id)
+
+
+def _create_flashcards_from_topic(user, topic, description='', num_cards=10, subject_name='',
+                                 use_cache=True, progress=None):
+    """Generate flashcards about a topic with AI and save them as a new set without a note"""
+    from studybuddy.ai_service import ai_service
+    from notes.models import Subject
+
+    # Create content from topic and description
+    content = description if description.strip() else f"Study material for: {topic}"
+
+    # Generate flashcards using AI
+    flashcards_data = ai_service.generate_flashcards(
+        note_content=content,
+        note_title=topic,
+        num_cards=num_cards,
+        use_cache=use_cache
+    )
+
+    if progress:
+        progress(80, 'Saving flashcards')
+
+    # Handle subject if provided
+    subject = None
+    if subject_name and subject_name.strip():
+        subject, created = Subject.objects.get_or_create(
+            name=subject_name.strip(),
+            defaults={'description': f'Subject for {subject_name.strip()}'}
+        )
+
+    # Create flashcard set without linking to a note
+    return build_flashcard_set(
+        flashcards_data,
+        title=topic,
+        description=f"AI-generated flashcards for: {topic}",
+        user=user,
+        note=None,  # No note association
+        subject=subject
+    )
+
+
+def stream_flashcards_from_note(user, note, num_cards=10, use_cache=True):
+    """
+    Streaming variant of create_flashcards_from_note
+
+    Returns the new set and a generator that saves and yields each
+    Flashcard as the model produces it. The set is removed again if no
+    card arrives.
+    """
+    from studybuddy.ai_service import ai_service
+
+    num_cards = item_count(num_cards, settings.AI_MAX_FLASHCARDS)
+
+    # Resolve the cards first so a failing draft lookup leaves no empty set behind
+    flashcards_data = take_draft(note, 'flashcards', num_cards) if use_cache else None
+    if flashcards_data is None:
+        flashcards_data = ai_service.stream_flashcards(
+            note_content=note.content,
+            note_title=note.title,
+            num_cards=num_cards,
+            use_cache=use_cache
+        )
+
+    sections = section_index(note.content)
+    flashcard_set = FlashcardSet.objects.create(
+        title=f"Flashcards: {note.title}",
+        description=f"AI-generated flashcards from note: {note.title}",
+        user=user,
+        note=note,
+        subject=note.subject,
+        source_sections=[fingerprint for fingerprint, _, _ in sections]
+    )
+    return flashcard_set, _save_streamed_flashcards(flashcard_set, flashcards_data, sections)
+
+
+def stream_flashcards_from_topic(user, topic, description='', num_cards=10, subject_name='', use_cache=True):
+    """Streaming variant of create_flashcards_from_topic; see stream_flashcards_from_note"""
+    from studybuddy.ai_service import ai_service
+    from notes.models import Subject
+
+    num_cards = item_count(num_cards, settings.AI_MAX_FLASHCARDS)
+
+    content = description if description.strip() else f"Study material for: {topic}"
+
+    subject = None
+    if subject_name and subject_name.strip():
+        subject, created = Subject.objects.get_or_create(
+            name=subject_name.strip(),
+            defaults={'description': f'Subject for {subject_name.strip()}'}
+        )
+
+    flashcard_set = FlashcardSet.objects.create(
+        title=topic,
+        description=f"AI-generated flashcards for: {topic}",
+        user=user,
+        note=None,  # No note association
+        subject=subject
+    )
+    flashcards_data = ai_service.stream_flashcards(
+        note_content=content,
+        note_title=topic,
+        num_cards=num_cards,
+        use_cache=use_cache
+    )
+    return flashcard_set, _save_streamed_flashcards(flashcard_set, flashcards_data)
@@ -1,3 +1,86 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from unittest import mock
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import FlashcardSet, FlashcardProgress
+from .services import regenerate_flashcards, save_note_flashcards
+from notes.models import Note
+
+
+class FlashcardStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.note = Note.objects.create(user=self.user, title='Cells', content='# Nucleus\n\nThe nucleus stores DNA.')
+
+    def test_each_card_is_an_event(self):
+        cards = [{'front_text': 'Nucleus', 'back_text': 'Stores DNA'}, {'front_text': 'Membrane', 'back_text': 'Gate'}]
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            ai_service.stream_flashcards.return_value = iter(cards)
+            response = self.client.post('/api/flashcards/generate/stream/', {
+                'note_id': self.note.id, 'num_cards': 2, 'use_cache': False,
+            }, format='json')
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(body.count('event: flashcard\ndata: '), 2)
+        self.assertIn('event: done', body)
+        self.assertEqual(FlashcardSet.objects.get(user=self.user).flashcards.count(), 2)
+
+    def test_note_stream_rejects_non_numeric_count(self):
+        response = self.client.post('/api/flashcards/generate/stream/', {
+            'note_id': self.note.id, 'num_cards': 'abc',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('num_cards', response.data['error'])
+        self.assertFalse(FlashcardSet.objects.exists())
+
+    def test_topic_stream_rejects_non_numeric_count(self):
+        response = self.client.post('/api/flashcards/generate-topic/stream/', {
+            'topic': 'Cells', 'num_cards': 'abc',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FlashcardSet.objects.exists())
+
+
+class RegenerateFlashcardsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.note = Note.objects.create(
+            user=self.user, title='Cells',
+            content='# Nucleus\n\nThe nucleus stores genetic material.\n\n# Membrane\n\nThe membrane controls transport.'
+        )
+        self.flashcard_set = save_note_flashcards(self.user, self.note, [
+            {'front_text': 'What does the nucleus store?', 'back_text': 'genetic material'},
+            {'front_text': 'What does the membrane control?', 'back_text': 'transport'},
+        ])
+        self.nucleus_card = self.flashcard_set.flashcards.get(order=1)
+        self.membrane_card = self.flashcard_set.flashcards.get(order=2)
+        for card in (self.nucleus_card, self.membrane_card):
+            FlashcardProgress.objects.create(user=self.user, flashcard=card, review_count=3)
+
+    def regenerate(self):
+        self.note.content = self.note.content.replace('genetic material', 'DNA')
+        self.note.save()
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            ai_service.generate_flashcards.return_value = [{'front_text': 'Where is DNA kept?', 'back_text': 'nucleus'}]
+            return regenerate_flashcards(self.user, FlashcardSet.objects.get(id=self.flashcard_set.id),
+                                         use_cache=False)
+
+    def test_only_edited_sections_are_replaced(self):
+        flashcard_set, changes = self.regenerate()
+
+        self.assertEqual(changes, {'kept': 1, 'removed': 1, 'added': 1})
+        self.assertEqual([card.front_text for card in flashcard_set.flashcards.order_by('order')],
+                         ['What does the membrane control?', 'Where is DNA kept?'])
+
+    def test_kept_cards_keep_their_review_progress(self):
+        self.regenerate()
+
+        self.assertEqual(FlashcardProgress.objects.get(flashcard=self.membrane_card).review_count, 3)
+        self.assertFalse(FlashcardProgress.objects.filter(flashcard_id=self.nucleus_card.id).exists())
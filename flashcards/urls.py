@@ -5,6 +5,7 @@ urlpatterns = [
     # Frontend expected endpoints (using 'decks' instead of 'sets')
     path('decks/', views.FlashcardSetListCreateView.as_view(), name='flashcard-deck-list-create'),
     path('decks/<int:pk>/', views.FlashcardSetDetailView.as_view(), name='flashcard-deck-detail'),
+    path('decks/<int:pk>/regenerate/', views.regenerate_flashcards_from_note, name='regenerate-deck'),
     path('decks/<int:deck_id>/cards/', views.FlashcardListCreateView.as_view(), name='flashcard-list-create'),
     path('decks/<int:deck_id>/cards/<int:pk>/', views.FlashcardDetailView.as_view(), name='flashcard-detail'),
     path('decks/<int:deck_id>/study/', views.start_study_session, name='deck-study-session'),
@@ -12,6 +13,7 @@ urlpatterns = [
     # Backward compatibility endpoints
     path('sets/', views.FlashcardSetListCreateView.as_view(), name='flashcard-set-list-create'),
     path('sets/<int:pk>/', views.FlashcardSetDetailView.as_view(), name='flashcard-set-detail'),
+    path('sets/<int:pk>/regenerate/', views.regenerate_flashcards_from_note, name='regenerate-set'),
     path('sets/<int:set_id>/flashcards/', views.FlashcardListCreateView.as_view(), name='flashcard-list-create-old'),
     path('flashcards/<int:pk>/', views.FlashcardDetailView.as_view(), name='flashcard-detail-old'),
 
@@ -22,4 +24,7 @@ urlpatterns = [
     path('sessions/end/<int:session_id>/', views.end_study_session, name='end-study-session'),
     path('generate/', views.generate_flashcards_from_note, name='generate-flashcards'),
     path('generate-topic/', views.generate_flashcards_from_topic, name='generate-flashcards-topic'),
+    path('generate/stream/', views.generate_flashcards_from_note_stream, name='generate-flashcards-stream'),
+    path('generate-topic/stream/', views.generate_flashcards_from_topic_stream,
+         name='generate-flashcards-topic-stream'),
 ]
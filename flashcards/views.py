@@ -1,18 +1,30 @@
 from rest_framework import generics, filters, status, serializers
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count, Avg
 from django.utils import timezone
 from datetime import timedelta
+import logging
 from .models import FlashcardSet, Flashcard, FlashcardProgress, StudySession
 from .serializers import (
     FlashcardSetSerializer, FlashcardSetListSerializer, FlashcardSetCreateSerializer,
     FlashcardSerializer, FlashcardCreateSerializer, FlashcardProgressSerializer,
     StudySessionSerializer, FlashcardReviewSerializer
 )
+from .services import (
+    create_flashcards_from_note, create_flashcards_from_topic, regenerate_flashcards,
+    stream_flashcards_from_note, stream_flashcards_from_topic
+)
 from analytics.utils import track_flashcard_session
+from generation.utils import request_count, request_flag, sse_item_stream, sse_response, EventStreamRenderer
+from generation.views import enqueue_response
+from generation.idempotency import idempotent
+from generation.deadline import DeadlineExceeded, deadline_response, with_deadline
+
+logger = logging.getLogger(__name__)
 
 
 class FlashcardSetListCreateView(generics.ListCreateAPIView):
@@ -230,110 +242,191 @@ def end_study_session(request, session_id):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
+@with_deadline
 def generate_flashcards_from_note(request):
-    """Generate flashcards from a note using AI"""
-    from studybuddy.ai_service import ai_service
+    """Generate flashcards from a note using AI (pass async=true to queue a job and poll it)"""
     from notes.models import Note
 
     note_id = request.data.get('note_id')
-    num_cards = request.data.get('num_cards', 10)
+    num_cards = request_count(request, 'num_cards', 10)
+    use_cache = request_flag(request, 'use_cache', default=True)
 
     if not note_id:
         return Response({'error': 'note_id is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+    if num_cards is None:
+        return Response({'error': 'num_cards must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+
     try:
         note = Note.objects.get(id=note_id, user=request.user)
     except Note.DoesNotExist:
         return Response({'error': 'Note not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    try:
-        # Generate flashcards using AI
-        flashcards_data = ai_service.generate_flashcards(
-            note_content=note.content,
-            note_title=note.title,
-            num_cards=num_cards
-        )
+    if request_flag(request, 'async'):
+        return enqueue_response(request, 'flashcards_from_note', {
+            'note_id': note.id,
+            'num_cards': num_cards,
+            'use_cache': use_cache,
+        })
 
-        # Create flashcard set
-        flashcard_set = FlashcardSet.objects.create(
-            title=f"Flashcards: {note.title}",
-            description=f"AI-generated flashcards from note: {note.title}",
-            user=request.user,
-            note=note,
-            subject=note.subject
+    try:
+        flashcard_set = create_flashcards_from_note(
+            request.user, note,
+            num_cards=num_cards,
+            use_cache=use_cache
         )
-
-        # Create flashcards
-        for i, card_data in enumerate(flashcards_data):
-            Flashcard.objects.create(
-                flashcard_set=flashcard_set,
-                front_text=card_data['front_text'],
-                back_text=card_data['back_text'],
-                hint=card_data.get('hint', ''),
-                order=i + 1
-            )
-
         return Response(FlashcardSetSerializer(flashcard_set).data, status=status.HTTP_201_CREATED)
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
+@with_deadline
 def generate_flashcards_from_topic(request):
     """Generate flashcards directly from a topic using AI without creating a note"""
-    from studybuddy.ai_service import ai_service
-    from notes.models import Subject
-
     topic = request.data.get('topic')
     description = request.data.get('description', '')
-    num_cards = request.data.get('num_cards', 10)
+    num_cards = request_count(request, 'num_cards', 10)
     subject_name = request.data.get('subject_name', '')
+    use_cache = request_flag(request, 'use_cache', default=True)
 
     if not topic or not topic.strip():
         return Response({'error': 'topic is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-    try:
-        # Create content from topic and description
-        content = description if description.strip() else f"Study material for: {topic}"
-
-        # Generate flashcards using AI
-        flashcards_data = ai_service.generate_flashcards(
-            note_content=content,
-            note_title=topic,
-            num_cards=num_cards
-        )
-
-        # Handle subject if provided
-        subject = None
-        if subject_name and subject_name.strip():
-            subject, created = Subject.objects.get_or_create(
-                name=subject_name.strip(),
-                defaults={'description': f'Subject for {subject_name.strip()}'}
-            )
-
-        # Create flashcard set without linking to a note
-        flashcard_set = FlashcardSet.objects.create(
-            title=topic,
-            description=f"AI-generated flashcards for: {topic}",
-            user=request.user,
-            note=None,  # No note association
-            subject=subject
-        )
+    if num_cards is None:
+        return Response({'error': 'num_cards must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create flashcards
-        for i, card_data in enumerate(flashcards_data):
-            Flashcard.objects.create(
-                flashcard_set=flashcard_set,
-                front_text=card_data['front_text'],
-                back_text=card_data['back_text'],
-                hint=card_data.get('hint', ''),
-                order=i + 1
-            )
+    if request_flag(request, 'async'):
+        return enqueue_response(request, 'flashcards_from_topic', {
+            'topic': topic,
+            'description': description,
+            'num_cards': num_cards,
+            'subject_name': subject_name,
+            'use_cache': use_cache,
+        })
 
+    try:
+        flashcard_set = create_flashcards_from_topic(
+            request.user, topic,
+            description=description,
+            num_cards=num_cards,
+            subject_name=subject_name,
+            use_cache=use_cache
+        )
         return Response(FlashcardSetSerializer(flashcard_set).data, status=status.HTTP_201_CREATED)
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         logger.error(f"Error generating flashcards from topic: {e}")
         return Response({'error': 'Failed to generate flashcards'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+@with_deadline
+def regenerate_flashcards_from_note(request, pk):
+    """
+    Update a note's flashcard set after the note was edited, regenerating
+    only the cards from changed sections (pass async=true to queue a job and poll it)
+    """
+    use_cache = request_flag(request, 'use_cache', default=True)
+
+    try:
+        flashcard_set = FlashcardSet.objects.select_related('note').get(id=pk, user=request.user)
+    except FlashcardSet.DoesNotExist:
+        return Response({'error': 'Flashcard set not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if flashcard_set.note is None:
+        return Response({'error': 'Only flashcard sets generated from a note can be regenerated'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    if request_flag(request, 'async'):
+        return enqueue_response(request, 'flashcards_regenerate', {
+            'flashcard_set_id': flashcard_set.id,
+            'use_cache': use_cache,
+        })
+
+    try:
+        flashcard_set, changes = regenerate_flashcards(request.user, flashcard_set, use_cache=use_cache)
+        return Response({**FlashcardSetSerializer(flashcard_set).data, 'changes': changes})
+
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _flashcard_event_stream(flashcard_set, flashcards):
+    return sse_response(sse_item_stream(
+        flashcards, 'flashcard',
+        lambda flashcard: FlashcardSerializer(flashcard).data,
+        lambda: FlashcardSetSerializer(flashcard_set).data
+    ))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def generate_flashcards_from_note_stream(request):
+    """
+    Generate flashcards from a note, streaming each card as Server-Sent Events
+
+    Emits a `flashcard` event as soon as each card is generated and
+    saved, then a `done` event with the full set, or an `error` event.
+    """
+    from notes.models import Note
+
+    note_id = request.data.get('note_id')
+    num_cards = request_count(request, 'num_cards', 10)
+
+    if not note_id:
+        return Response({'error': 'note_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if num_cards is None:
+        return Response({'error': 'num_cards must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        note = Note.objects.get(id=note_id, user=request.user)
+    except Note.DoesNotExist:
+        return Response({'error': 'Note not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    flashcard_set, flashcards = stream_flashcards_from_note(
+        request.user, note,
+        num_cards=num_cards,
+        use_cache=request_flag(request, 'use_cache', default=True)
+    )
+    return _flashcard_event_stream(flashcard_set, flashcards)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def generate_flashcards_from_topic_stream(request):
+    """Generate flashcards from a topic, streaming each card as Server-Sent Events"""
+    topic = request.data.get('topic')
+    description = request.data.get('description', '')
+    num_cards = request_count(request, 'num_cards', 10)
+    subject_name = request.data.get('subject_name', '')
+
+    if not topic or not topic.strip():
+        return Response({'error': 'topic is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if num_cards is None:
+        return Response({'error': 'num_cards must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    flashcard_set, flashcards = stream_flashcards_from_topic(
+        request.user, topic,
+        description=description,
+        num_cards=num_cards,
+        subject_name=subject_name,
+        use_cache=request_flag(request, 'use_cache', default=True)
+    )
+    return _flashcard_event_stream(flashcard_set, flashcards)
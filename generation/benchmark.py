@@ -0,0 +1,167 @@
+"""
+Per-model latency and output-quality benchmark
+
+Sends representative quiz, flashcard and notes prompts straight to each
+model (bypassing fallback, the circuit breaker and the cache) with a
+bounded number of calls in flight, and summarises latency, output tokens
+per second and how often the JSON parsed cleanly, had to be salvaged or
+failed. Used by `manage.py test_ai_models --benchmark` to pick the
+GeminiAIService.model_names order from data.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .parsing import salvage_items, validate_flashcard, validate_question
+from .text import estimate_tokens
+
+SAMPLE_TITLE = 'Photosynthesis'
+SAMPLE_CONTENT = """# Photosynthesis
+
+Photosynthesis is the process by which plants, algae and some bacteria
+convert light energy into chemical energy stored in glucose.
+
+## Light-dependent reactions
+
+These take place in the thylakoid membranes of the chloroplast.
+Chlorophyll absorbs light, water is split into oxygen, protons and
+electrons, and the energy is stored as ATP and NADPH.
+
+## Calvin cycle
+
+In the stroma, the enzyme RuBisCO fixes carbon dioxide onto ribulose
+bisphosphate. ATP and NADPH from the light reactions reduce the product
+to G3P, some of which is used to build glucose.
+
+## Limiting factors
+
+The rate of photosynthesis depends on light intensity, carbon dioxide
+concentration and temperature; the factor in shortest supply limits it.
+"""
+
+KINDS = ('quiz', 'flashcards', 'notes')
+
+
+def _workloads(service, kinds):
+    """(kind, prompt, generation config, items key, validator) for each benchmarked kind"""
+    workloads = {
+        'quiz': (
+            service._create_quiz_prompt(SAMPLE_CONTENT, SAMPLE_TITLE, 5, 'medium'),
+            service._config(service._output_budget('questions', 5)),
+            'questions', validate_question,
+        ),
+        'flashcards': (
+            service._create_flashcard_prompt(SAMPLE_CONTENT, SAMPLE_TITLE, 10),
+            service._config(service._output_budget('flashcards', 10)),
+            'flashcards', validate_flashcard,
+        ),
+        'notes': (
+            service._create_notes_prompt(SAMPLE_TITLE),
+            service._config(),
+            None, None,
+        ),
+    }
+    return [(kind, *workloads[kind]) for kind in kinds]
+
+
+def _parse_outcome(service, text, key, validator):
+    """'full', 'salvaged' or 'failed', judged the way the service parses responses"""
+    if key is None:
+        return 'full' if text.strip() else 'failed'
+    try:
+        data = json.loads(service._clean_json_response(text))
+        items = data.get(key) if isinstance(data, dict) else None
+        if isinstance(items, list) and any(validator(item) for item in items):
+            return 'full'
+    except json.JSONDecodeError:
+        pass
+    return 'salvaged' if salvage_items(text, key, validator) else 'failed'
+
+
+def _run_one(service, model_name, kind, prompt, generation_config, key, validator):
+    started = time.monotonic()
+    try:
+        text = service.provider.generate(model_name, prompt, generation_config)
+    except Exception as e:
+        return {'model': model_name, 'kind': kind, 'latency': time.monotonic() - started, 'error': str(e)}
+    latency = time.monotonic() - started
+    return {
+        'model': model_name,
+        'kind': kind,
+        'latency': latency,
+        'response_tokens': estimate_tokens(text),
+        'outcome': _parse_outcome(service, text or '', key, validator),
+        'error': '',
+    }
+
+
+def _percentile(values, q):
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+def _summarise(samples):
+    """Aggregate a list of sample results into latency, throughput and parse rates"""
+    ok = [sample for sample in samples if not sample['error']]
+    latencies = sorted(sample['latency'] for sample in ok)
+    outcomes = [sample['outcome'] for sample in ok]
+    total_time = sum(latencies)
+    return {
+        'samples': len(samples),
+        'errors': len(samples) - len(ok),
+        'latency_p50': round(_percentile(latencies, 50), 3) if latencies else None,
+        'latency_p95': round(_percentile(latencies, 95), 3) if latencies else None,
+        'tokens_per_second': round(sum(sample['response_tokens'] for sample in ok) / total_time, 1)
+        if total_time else None,
+        'parse_success_rate': round(outcomes.count('full') / len(samples), 3) if samples else None,
+        'salvage_rate': round(outcomes.count('salvaged') / len(samples), 3) if samples else None,
+    }
+
+
+def benchmark_models(service, model_names=None, kinds=KINDS, samples=5, concurrency=8):
+    """
+    Benchmark each model with `samples` calls per kind, at most
+    `concurrency` calls in flight across all models
+
+    Returns a JSON-serializable report with per-model and per-kind
+    summaries and a suggested model order: most usable responses
+    (parsed or salvaged) first, then lowest median latency.
+    """
+    model_names = list(model_names or service.model_names)
+    tasks = [
+        (model_name, *workload)
+        for model_name in model_names
+        for workload in _workloads(service, kinds)
+        for _ in range(samples)
+    ]
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda task: _run_one(service, *task), tasks))
+    elapsed = time.monotonic() - started
+
+    models = {}
+    for model_name in model_names:
+        model_results = [result for result in results if result['model'] == model_name]
+        models[model_name] = {
+            **_summarise(model_results),
+            'kinds': {
+                kind: _summarise([result for result in model_results if result['kind'] == kind])
+                for kind in kinds
+            },
+        }
+
+    def rank(model_name):
+        summary = models[model_name]
+        usable = (summary['parse_success_rate'] or 0) + (summary['salvage_rate'] or 0)
+        p50 = summary['latency_p50']
+        return -usable, p50 if p50 is not None else float('inf')
+
+    return {
+        'provider': service.provider.name,
+        'samples_per_kind': samples,
+        'concurrency': concurrency,
+        'elapsed': round(elapsed, 2),
+        'models': models,
+        'suggested_model_order': sorted(model_names, key=rank),
+    }
@@ -0,0 +1,143 @@
+"""
+Persistent, content-addressed cache for parsed AI generation results
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(operation, prompt, model_names, generation_config):
+    """
+    Hash everything that determines the model output
+
+    Args:
+        operation: Name of the generation operation, e.g. 'flashcards'
+        prompt: Fully rendered prompt text
+        model_names: Ordered list of models the request may be served by
+        generation_config: Dict of GenerationConfig parameters
+    """
+    material = json.dumps({
+        'operation': operation,
+        'prompt': prompt,
+        'models': list(model_names),
+        'config': generation_config,
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class AIResponseCacheStore:
+    """
+    LRU/TTL cache backed by the AIResponseCache table so entries survive
+    restarts and are shared between gunicorn workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return settings.AI_CACHE_ENABLED
+
+    def get(self, key):
+        """Return the cached payload for key, or None on a miss"""
+        from .models import AIResponseCache
+
+        if not self.enabled:
+            return None
+
+        try:
+            entry = AIResponseCache.objects.filter(key=key, expires_at__gt=timezone.now()).first()
+            if entry is not None:
+                AIResponseCache.objects.filter(pk=entry.pk).update(
+                    hits=F('hits') + 1,
+                    last_accessed=timezone.now()
+                )
+        except Exception as e:
+            logger.warning(f"AI cache lookup failed: {e}")
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return entry.payload if entry is not None else None
+
+    def set(self, key, operation, payload, model_name=''):
+        """Store a parsed payload and evict expired and least recently used entries"""
+        from .models import AIResponseCache
+
+        if not self.enabled:
+            return
+
+        size = len(json.dumps(payload))
+        if size > settings.AI_CACHE_MAX_ENTRY_BYTES:
+            logger.info(f"Skipping AI cache for {operation}: payload of {size} bytes exceeds cap")
+            return
+
+        now = timezone.now()
+        try:
+            AIResponseCache.objects.update_or_create(
+                key=key,
+                defaults={
+                    'operation': operation,
+                    'model_name': model_name or '',
+                    'payload': payload,
+                    'size': size,
+                    'last_accessed': now,
+                    'expires_at': now + timedelta(seconds=settings.AI_CACHE_TTL),
+                }
+            )
+            self.evict()
+        except Exception as e:
+            logger.warning(f"AI cache store failed: {e}")
+
+    def evict(self):
+        """Drop expired rows, then trim least recently used rows above the size cap"""
+        from .models import AIResponseCache
+
+        AIResponseCache.objects.filter(expires_at__lte=timezone.now()).delete()
+
+        overflow = AIResponseCache.objects.count() - settings.AI_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            stale_ids = list(
+                AIResponseCache.objects.order_by('last_accessed').values_list('id', flat=True)[:overflow]
+            )
+            AIResponseCache.objects.filter(id__in=stale_ids).delete()
+
+    def clear(self):
+        from .models import AIResponseCache
+
+        AIResponseCache.objects.all().delete()
+
+    def stats(self):
+        """Hit/miss counters for this process plus totals stored in the table"""
+        from .models import AIResponseCache
+
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+
+        totals = AIResponseCache.objects.aggregate(total_hits=Sum('hits'), total_bytes=Sum('size'))
+        return {
+            'enabled': self.enabled,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0,
+            'entries': AIResponseCache.objects.count(),
+            'stored_hits': totals['total_hits'] or 0,
+            'stored_bytes': totals['total_bytes'] or 0,
+            'max_entries': settings.AI_CACHE_MAX_ENTRIES,
+            'ttl_seconds': settings.AI_CACHE_TTL,
+        }
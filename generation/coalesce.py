@@ -0,0 +1,99 @@
+"""
+Single-flight coalescing of identical concurrent generation requests
+
+The first caller for a key inserts a GenerationLock row and runs the
+generation; concurrent callers with the same key (in any worker process)
+find the row, wait for it to finish and receive the same result instead
+of starting a duplicate model call. The result lingers for a few seconds
+so callers arriving just after it finished get it too; callers that must
+always run (e.g. regeneration, whose result is a change count) pass
+linger=0.
+"""
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .deadline import DeadlineExceeded, check_budget
+from .models import GenerationLock
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.25  # seconds between checks while waiting on another caller
+
+
+def coalesce_key(user, operation, *inputs):
+    """Hash of (user, operation, inputs) identifying duplicate requests"""
+    material = json.dumps([user.pk, operation, list(inputs)], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _try_acquire(key):
+    now = timezone.now()
+    # A lock whose holder died, or a finished lock past its linger window, is free again
+    GenerationLock.objects.filter(key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            GenerationLock.objects.create(
+                key=key,
+                expires_at=now + timedelta(seconds=settings.AI_SINGLE_FLIGHT_LEASE)
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def single_flight(key, fn, linger=None):
+    """
+    Run fn() once for all concurrent callers sharing key and return its
+    JSON-serializable result to each of them
+
+    The result is kept for `linger` seconds after fn() returns (default
+    AI_SINGLE_FLIGHT_LINGER); callers already waiting always receive it.
+    """
+    if linger is None:
+        linger = settings.AI_SINGLE_FLIGHT_LINGER
+    deadline = time.monotonic() + settings.AI_SINGLE_FLIGHT_LEASE
+
+    while True:
+        if _try_acquire(key):
+            try:
+                result = fn()
+            except Exception as e:
+                # Waiters re-raise a deadline failure as such, so they answer 504 like the holder
+                GenerationLock.objects.filter(key=key).update(
+                    status='expired' if isinstance(e, DeadlineExceeded) else 'failed',
+                    error=str(e),
+                    expires_at=timezone.now()
+                )
+                raise
+
+            GenerationLock.objects.filter(key=key).update(
+                status='done',
+                result=result,
+                expires_at=timezone.now() + timedelta(seconds=linger)
+            )
+            return result
+
+        logger.info(f"Waiting on in-flight generation {key[:12]}")
+        while time.monotonic() < deadline:
+            lock = GenerationLock.objects.filter(key=key).values('status', 'result', 'error', 'expires_at').first()
+            if lock is None:
+                break  # holder finished and was cleaned up; try to take over
+            if lock['status'] == 'done':
+                return lock['result']
+            if lock['status'] == 'failed':
+                raise Exception(lock['error'])
+            if lock['status'] == 'expired':
+                raise DeadlineExceeded(lock['error'])
+            if lock['expires_at'] <= timezone.now():
+                break  # holder died; try to take over
+            check_budget(POLL_INTERVAL, 'the identical in-flight request to finish')
+            time.sleep(POLL_INTERVAL)
+        else:
+            raise Exception("Timed out waiting for an identical generation request")
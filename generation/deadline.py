@@ -0,0 +1,91 @@
+"""
+Deadline budget for synchronous AI generation requests
+
+A sync generation view runs under a deadline taken from the
+X-Request-Timeout header (or a `timeout` parameter), capped at
+settings.AI_REQUEST_TIMEOUT so work stops before the gunicorn worker is
+killed. GeminiAIService checks the remaining budget before every model
+call and passes it on as the call's timeout: once the budget cannot cover
+a typical call the request fails fast with DeadlineExceeded instead of
+walking the rest of the fallback chain for a client that has given up.
+
+The deadline lives in a context variable, so it follows the request
+through the service layer without extra arguments. Code that fans out to
+worker threads must run them in a copy of the context to keep it.
+"""
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'X-Request-Timeout'
+
+_deadline = contextvars.ContextVar('ai_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget cannot cover the next piece of AI work"""
+
+
+def time_left():
+    """Seconds left in the current deadline, or None when there is none"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def deadline(seconds):
+    """Run the block under a budget of `seconds`; a nested deadline can only shorten the outer one"""
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(at, outer))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def check_budget(needed=0.0, what='the next model call'):
+    """Raise DeadlineExceeded unless more than `needed` seconds of budget are left"""
+    left = time_left()
+    if left is not None and left <= needed:
+        typical = f" (~{needed:.1f}s)" if needed else ''
+        raise DeadlineExceeded(
+            f"Request deadline exceeded: {max(left, 0):.1f}s left, not enough for {what}{typical}"
+        )
+
+
+def request_budget(request):
+    """Budget in seconds from the header or `timeout` parameter, capped at AI_REQUEST_TIMEOUT"""
+    limit = settings.AI_REQUEST_TIMEOUT
+    value = request.headers.get(HEADER) or request.data.get('timeout') or request.query_params.get('timeout')
+    try:
+        budget = float(value) if value else limit
+    except (TypeError, ValueError):
+        budget = limit
+    if budget <= 0:
+        return limit
+    return min(budget, limit) if limit else budget
+
+
+def with_deadline(view_func):
+    """Run a DRF function view under the request's deadline"""
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        budget = request_budget(request)
+        if not budget:
+            return view_func(request, *args, **kwargs)
+        with deadline(budget):
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def deadline_response(error):
+    """504 response for a view whose generation ran out of budget"""
+    return Response({'error': str(error)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
@@ -0,0 +1,118 @@
+"""
+Speculative pre-generation of quizzes and flashcards for saved notes
+
+Users usually generate study material right after creating or editing a
+note. With AI_SPECULATIVE_DRAFTS on, saving a note queues a low-priority
+'note_drafts' job that generates a quiz and a flashcard set with the
+endpoint defaults and stores them as GenerationDrafts keyed by a hash of
+the note's title and content. When the user then asks for a quiz or deck
+with those settings and the note is unchanged, the draft is saved as the
+result instead of calling the model. Drafts are used once; edits make
+them stale, and the next save replaces them.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GenerationDraft, GenerationJob
+
+logger = logging.getLogger(__name__)
+
+# Queue priority of speculative jobs; user-requested jobs use 0 and run first
+DRAFT_PRIORITY = 10
+
+# Drafts are generated with the defaults of the generate endpoints
+DRAFT_NUM_QUESTIONS = 5
+DRAFT_DIFFICULTY = 'medium'
+DRAFT_NUM_CARDS = 10
+
+
+def content_hash(note):
+    """Hash of the note fields that go into the generation prompts"""
+    return hashlib.sha256(f"{note.title}\n{note.content}".encode('utf-8')).hexdigest()
+
+
+def request_drafts(note):
+    """
+    Queue speculative generation for a note that was just saved
+
+    Does nothing when the feature is off or drafts for the current
+    content exist. A pending job for the same note is pointed at the new
+    content and pushed back instead, so a burst of edits costs one
+    generation.
+    """
+    from .jobs import enqueue_job
+
+    if not settings.AI_SPECULATIVE_DRAFTS:
+        return
+
+    current = content_hash(note)
+    if GenerationDraft.objects.filter(note=note, content_hash=current).exists():
+        return
+
+    params = {'note_id': note.id, 'content_hash': current}
+    run_after = timezone.now() + timedelta(seconds=settings.AI_SPECULATIVE_DELAY)
+    updated = GenerationJob.objects.filter(
+        operation='note_drafts', status='pending', params__note_id=note.id
+    ).update(params=params, run_after=run_after)
+    if not updated:
+        enqueue_job(None, 'note_drafts', params, priority=DRAFT_PRIORITY, run_after=run_after)
+
+
+def generate_drafts(note, expected_hash, progress=None):
+    """Generate and store quiz and flashcard drafts, unless the note changed since it was queued"""
+    from studybuddy.ai_service import ai_service
+
+    current = content_hash(note)
+    if current != expected_hash:
+        logger.info(f"Skipping drafts for note {note.id}: edited since they were requested")
+        return []
+
+    questions_data = ai_service.generate_quiz_questions(
+        note_content=note.content,
+        note_title=note.title,
+        num_questions=DRAFT_NUM_QUESTIONS,
+        difficulty=DRAFT_DIFFICULTY
+    )
+    if progress:
+        progress(50, 'Quiz draft ready')
+
+    flashcards_data = ai_service.generate_flashcards(
+        note_content=note.content,
+        note_title=note.title,
+        num_cards=DRAFT_NUM_CARDS
+    )
+
+    # Drafts for earlier versions of the note can never be served again
+    GenerationDraft.objects.filter(note=note).exclude(content_hash=current).delete()
+    drafts = [
+        GenerationDraft(note=note, kind='quiz', content_hash=current, num_items=DRAFT_NUM_QUESTIONS,
+                        difficulty=DRAFT_DIFFICULTY, payload=questions_data),
+        GenerationDraft(note=note, kind='flashcards', content_hash=current, num_items=DRAFT_NUM_CARDS,
+                        payload=flashcards_data),
+    ]
+    GenerationDraft.objects.bulk_create(drafts, ignore_conflicts=True)
+    return drafts
+
+
+def take_draft(note, kind, num_items, difficulty=''):
+    """
+    Claim the draft matching the note's current content and the request,
+    returning its items, or None when there is none
+    """
+    draft = GenerationDraft.objects.filter(
+        note=note, kind=kind, content_hash=content_hash(note),
+        num_items=int(num_items), difficulty=difficulty
+    ).first()
+    if draft is None:
+        return None
+
+    # The delete decides which of two concurrent requests gets the draft
+    deleted, _ = GenerationDraft.objects.filter(id=draft.id).delete()
+    if not deleted:
+        return None
+    logger.info(f"Serving {kind} draft for note {note.id}")
+    return draft.payload
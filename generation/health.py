@@ -0,0 +1,138 @@
+"""
+Per-model circuit breaker for the AI fallback chain
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class _ModelHealth:
+    def __init__(self, window):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.successes = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=window)
+        # Only calls made under a request deadline, which bounds them (see GeminiAIService._call_model)
+        self.deadline_latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.last_error = ''
+
+
+class ModelCircuitBreaker:
+    """
+    Tracks recent failures and latency per model.
+
+    A model opens after `failure_threshold` consecutive failures and is
+    skipped on the request path. Once `recovery_timeout` seconds have
+    passed a single half-open probe is let through; success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=3, recovery_timeout=60, window=50):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.window = window
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def _health(self, model_name):
+        if model_name not in self._models:
+            self._models[model_name] = _ModelHealth(self.window)
+        return self._models[model_name]
+
+    def allow(self, model_name):
+        """Return True if a request may be sent to model_name right now"""
+        with self._lock:
+            health = self._health(model_name)
+            if health.state == CLOSED:
+                return True
+            if health.state == OPEN:
+                if time.monotonic() - health.opened_at < self.recovery_timeout:
+                    return False
+                health.state = HALF_OPEN
+            if health.probe_in_flight:
+                return False
+            health.probe_in_flight = True
+            return True
+
+    def record_success(self, model_name, latency, under_deadline=False):
+        with self._lock:
+            health = self._health(model_name)
+            health.state = CLOSED
+            health.consecutive_failures = 0
+            health.opened_at = None
+            health.probe_in_flight = False
+            health.successes += 1
+            health.latencies.append(latency)
+            if under_deadline:
+                health.deadline_latencies.append(latency)
+            health.outcomes.append(True)
+
+    def record_failure(self, model_name, error=''):
+        with self._lock:
+            health = self._health(model_name)
+            health.consecutive_failures += 1
+            health.failures += 1
+            health.probe_in_flight = False
+            health.outcomes.append(False)
+            health.last_error = str(error)[:200]
+            if health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+                health.state = OPEN
+                health.opened_at = time.monotonic()
+
+    def release(self, model_name):
+        """Give back a request allowed through without counting an outcome (e.g. it was never sent)"""
+        with self._lock:
+            self._health(model_name).probe_in_flight = False
+
+    def latency_percentile(self, model_name, percentile, min_samples=10, under_deadline=False):
+        """
+        Recent successful-call latency at percentile, or None until
+        min_samples are recorded; under_deadline only counts calls made
+        under a request deadline
+        """
+        with self._lock:
+            health = self._health(model_name)
+            latencies = sorted(health.deadline_latencies if under_deadline else health.latencies)
+        if len(latencies) < min_samples:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        return latencies[index]
+
+    def reset(self, model_name=None):
+        with self._lock:
+            if model_name is None:
+                self._models.clear()
+            else:
+                self._models.pop(model_name, None)
+
+    def snapshot(self):
+        """Breaker state, recent failure rate and latency for every tracked model"""
+        with self._lock:
+            now = time.monotonic()
+            snapshot = {}
+            for model_name, health in self._models.items():
+                latencies = sorted(health.latencies)
+                outcomes = list(health.outcomes)
+                snapshot[model_name] = {
+                    'state': health.state,
+                    'consecutive_failures': health.consecutive_failures,
+                    'successes': health.successes,
+                    'failures': health.failures,
+                    'recent_failure_rate': round(outcomes.count(False) / len(outcomes), 4) if outcomes else 0,
+                    'recent_avg_latency': round(sum(latencies) / len(latencies), 3) if latencies else None,
+                    'recent_max_latency': round(latencies[-1], 3) if latencies else None,
+                    'retry_in': (
+                        max(0, round(self.recovery_timeout - (now - health.opened_at), 1))
+                        if health.state == OPEN else None
+                    ),
+                    'last_error': health.last_error,
+                }
+            return snapshot
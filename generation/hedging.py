@@ -0,0 +1,45 @@
+"""
+Budget for hedged AI requests
+
+When hedging is enabled, a request whose model has not answered within
+its usual latency is raced against the next healthy model. Every hedge is
+an extra paid call, so hedges are drawn from a token bucket that refills
+by `ratio` tokens per request: at most about `ratio` hedges per request
+over time, with short bursts of up to `burst`.
+"""
+import threading
+
+
+class HedgeBudget:
+    def __init__(self, ratio=0.1, burst=5):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = float(burst)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.denied = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_acquire(self):
+        """Take a token for one hedge; False when the budget is spent"""
+        with self._lock:
+            if self._tokens < 1:
+                self.denied += 1
+                return False
+            self._tokens -= 1
+            self.hedges += 1
+            return True
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges': self.hedges,
+                'denied': self.denied,
+                'hedge_rate': round(self.hedges / self.requests, 4) if self.requests else 0,
+            }
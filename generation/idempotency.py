@@ -0,0 +1,107 @@
+"""
+Idempotency-Key support for AI generation endpoints
+
+The first request with a given key runs normally and its response is
+stored; retries with the same key within AI_IDEMPOTENCY_TTL get that
+response back without another model call or DB write. A retry that
+arrives while the original is still running waits for it, within the
+request's deadline budget, and gets a 409 if it is still running then.
+"""
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .deadline import request_budget
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+POLL_INTERVAL = 0.25  # seconds between checks while waiting on the original request
+
+
+def _sha256(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def _acquire(key_hash, request_hash):
+    now = timezone.now()
+    IdempotencyKey.objects.filter(expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                key_hash=key_hash,
+                request_hash=request_hash,
+                expires_at=now + timedelta(seconds=settings.AI_SINGLE_FLIGHT_LEASE)
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def _replay(record):
+    response = Response(record['response'], status=record['status_code'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_func):
+    """Honor the Idempotency-Key header on a DRF function view"""
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_func(request, *args, **kwargs)
+
+        key_hash = _sha256(f"{request.user.pk}:{request.path}:{key}")
+        request_hash = _sha256(json.dumps(request.data, sort_keys=True, cls=JSONEncoder))
+        # Wait on an in-flight original no longer than this request may run,
+        # so the client gets the 409 before the worker is killed
+        deadline = time.monotonic() + (request_budget(request) or settings.AI_SINGLE_FLIGHT_LEASE)
+
+        while time.monotonic() < deadline:
+            if _acquire(key_hash, request_hash):
+                try:
+                    response = view_func(request, *args, **kwargs)
+                except Exception:
+                    IdempotencyKey.objects.filter(key_hash=key_hash).delete()
+                    raise
+
+                # Server errors are not stored so the client's retry runs again
+                if response.status_code >= 500 or not hasattr(response, 'data'):
+                    IdempotencyKey.objects.filter(key_hash=key_hash).delete()
+                else:
+                    IdempotencyKey.objects.filter(key_hash=key_hash).update(
+                        status_code=response.status_code,
+                        response=json.loads(json.dumps(response.data, cls=JSONEncoder)),
+                        expires_at=timezone.now() + timedelta(seconds=settings.AI_IDEMPOTENCY_TTL)
+                    )
+                return response
+
+            record = IdempotencyKey.objects.filter(key_hash=key_hash).values(
+                'request_hash', 'status_code', 'response', 'expires_at'
+            ).first()
+            if record is None or record['expires_at'] <= timezone.now():
+                continue  # original failed or its holder died; take over
+            if record['request_hash'] != request_hash:
+                return Response(
+                    {'error': f'{HEADER} was already used with a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record['status_code'] is not None:
+                return _replay(record)
+            time.sleep(max(0, min(POLL_INTERVAL, deadline - time.monotonic())))
+
+        return Response(
+            {'error': 'The original request with this Idempotency-Key is still in progress'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    return wrapper
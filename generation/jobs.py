@@ -0,0 +1,290 @@
+"""
+DB-backed queue for AI generation jobs
+
+Views enqueue a GenerationJob and return 202; the run_generation_worker
+management command claims pending jobs, runs them and records the ids of
+the created objects. A claimed job holds a lease, so jobs left running by
+a worker that died are picked up again once the lease expires.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+
+def _quiz_from_note(job, progress):
+    from notes.models import Note
+    from quizzes.services import create_quiz_from_note
+
+    params = job.params
+    note = Note.objects.get(id=params['note_id'], user=job.user)
+    quiz = create_quiz_from_note(
+        job.user, note,
+        num_questions=params.get('num_questions', 5),
+        difficulty=params.get('difficulty', 'medium'),
+        use_cache=params.get('use_cache', True),
+        progress=progress
+    )
+    return {'quiz_id': quiz.id}
+
+
+def _quiz_from_topic(job, progress):
+    from quizzes.services import create_quiz_from_topic
+
+    params = job.params
+    quiz = create_quiz_from_topic(
+        job.user, params['topic'],
+        num_questions=params.get('num_questions', 5),
+        difficulty=params.get('difficulty', 'medium'),
+        subject_name=params.get('subject_name', ''),
+        use_cache=params.get('use_cache', True),
+        progress=progress
+    )
+    return {'quiz_id': quiz.id}
+
+
+def _flashcards_from_note(job, progress):
+    from notes.models import Note
+    from flashcards.services import create_flashcards_from_note
+
+    params = job.params
+    note = Note.objects.get(id=params['note_id'], user=job.user)
+    flashcard_set = create_flashcards_from_note(
+        job.user, note,
+        num_cards=params.get('num_cards', 10),
+        use_cache=params.get('use_cache', True),
+        progress=progress
+    )
+    return {'flashcard_set_id': flashcard_set.id}
+
+
+def _flashcards_from_topic(job, progress):
+    from flashcards.services import create_flashcards_from_topic
+
+    params = job.params
+    flashcard_set = create_flashcards_from_topic(
+        job.user, params['topic'],
+        description=params.get('description', ''),
+        num_cards=params.get('num_cards', 10),
+        subject_name=params.get('subject_name', ''),
+        use_cache=params.get('use_cache', True),
+        progress=progress
+    )
+    return {'flashcard_set_id': flashcard_set.id}
+
+
+def _quiz_regenerate(job, progress):
+    from quizzes.models import Quiz
+    from quizzes.services import regenerate_quiz
+
+    quiz = Quiz.objects.select_related('note').get(id=job.params['quiz_id'], user=job.user)
+    quiz, changes = regenerate_quiz(
+        job.user, quiz,
+        use_cache=job.params.get('use_cache', True),
+        progress=progress
+    )
+    return {'quiz_id': quiz.id, **changes}
+
+
+def _flashcards_regenerate(job, progress):
+    from flashcards.models import FlashcardSet
+    from flashcards.services import regenerate_flashcards
+
+    flashcard_set = FlashcardSet.objects.select_related('note').get(
+        id=job.params['flashcard_set_id'], user=job.user
+    )
+    flashcard_set, changes = regenerate_flashcards(
+        job.user, flashcard_set,
+        use_cache=job.params.get('use_cache', True),
+        progress=progress
+    )
+    return {'flashcard_set_id': flashcard_set.id, **changes}
+
+
+def _notes(job, progress):
+    from notes.services import create_ai_note
+
+    params = job.params
+    note = create_ai_note(
+        job.user, params['topic'],
+        description=params.get('description', ''),
+        guidelines=params.get('guidelines', ''),
+        subject_name=params.get('subject_name', ''),
+        difficulty=params.get('difficulty', 'medium'),
+        use_cache=params.get('use_cache', True),
+        progress=progress
+    )
+    return {'note_id': note.id}
+
+
+def _study_pack(job, progress):
+    from .services import create_study_pack
+
+    params = job.params
+    note, quiz, flashcard_set = create_study_pack(
+        job.user, params['topic'],
+        description=params.get('description', ''),
+        guidelines=params.get('guidelines', ''),
+        subject_name=params.get('subject_name', ''),
+        difficulty=params.get('difficulty', 'medium'),
+        num_questions=params.get('num_questions', 5),
+        num_cards=params.get('num_cards', 10),
+        use_cache=params.get('use_cache', True),
+        progress=progress
+    )
+    return {'note_id': note.id, 'quiz_id': quiz.id, 'flashcard_set_id': flashcard_set.id}
+
+
+def _question_pool(job, progress):
+    from quizzes.models import QuestionPool
+    from quizzes.pool import top_up_pool
+
+    pool = QuestionPool.objects.get(id=job.params['pool_id'])
+    added = top_up_pool(pool, progress=progress)
+    return {'pool_id': pool.id, 'added': added}
+
+
+def _note_drafts(job, progress):
+    from notes.models import Note
+    from .drafts import generate_drafts
+
+    note = Note.objects.get(id=job.params['note_id'])
+    drafts = generate_drafts(note, job.params['content_hash'], progress=progress)
+    return {'note_id': note.id, 'drafts': len(drafts)}
+
+
+JOB_HANDLERS = {
+    'quiz_from_note': _quiz_from_note,
+    'quiz_from_topic': _quiz_from_topic,
+    'flashcards_from_note': _flashcards_from_note,
+    'flashcards_from_topic': _flashcards_from_topic,
+    'quiz_regenerate': _quiz_regenerate,
+    'flashcards_regenerate': _flashcards_regenerate,
+    'notes': _notes,
+    'study_pack': _study_pack,
+    'question_pool': _question_pool,
+    'note_drafts': _note_drafts,
+}
+
+
+def enqueue_job(user, operation, params, priority=0, run_after=None):
+    """
+    Queue a generation job for the worker pool; user is None for system jobs
+
+    Jobs with a lower priority value are claimed first; run_after delays a job.
+    """
+    if operation not in JOB_HANDLERS:
+        raise ValueError(f"Unknown generation operation: {operation}")
+
+    return GenerationJob.objects.create(
+        user=user,
+        operation=operation,
+        params=params,
+        priority=priority,
+        run_after=run_after or timezone.now(),
+        max_attempts=settings.AI_JOB_MAX_ATTEMPTS,
+        message='Queued'
+    )
+
+
+def claim_next_job():
+    """
+    Atomically claim the next runnable job, or return None
+
+    Pending jobs whose backoff has elapsed and running jobs whose lease
+    expired (their worker died) are both claimable, highest priority
+    first. The conditional UPDATE makes sure only one worker wins a
+    given job. An expired job that already used all its attempts is
+    marked failed instead, so a job that kills its worker is not retried
+    forever.
+    """
+    now = timezone.now()
+    runnable = GenerationJob.objects.filter(
+        Q(status='pending', run_after__lte=now) |
+        Q(status='running', lease_expires_at__lt=now)
+    ).order_by('priority', 'run_after', 'id')
+
+    candidates = runnable.values_list('id', 'status', 'lease_expires_at', 'attempts', 'max_attempts')[:10]
+    for job_id, status, lease_expires_at, attempts, max_attempts in candidates:
+        unclaimed = GenerationJob.objects.filter(id=job_id, status=status, lease_expires_at=lease_expires_at)
+        if status == 'running' and attempts >= max_attempts:
+            unclaimed.update(
+                status='failed',
+                message='Failed',
+                error='Worker stopped while running the job',
+                lease_expires_at=None,
+                completed_at=now,
+                updated_at=now
+            )
+            continue
+
+        claimed = unclaimed.update(
+            status='running',
+            progress=10,
+            message='Generating content',
+            lease_expires_at=now + timedelta(seconds=settings.AI_JOB_LEASE_SECONDS),
+            updated_at=now
+        )
+        if claimed:
+            return GenerationJob.objects.select_related('user').get(id=job_id)
+
+    return None
+
+
+def run_job(job):
+    """Run a claimed job, retrying with exponential backoff on failure"""
+    def progress(percent, message):
+        # Reporting progress also renews the lease, so long jobs are not claimed twice
+        now = timezone.now()
+        GenerationJob.objects.filter(id=job.id).update(
+            progress=percent, message=message, updated_at=now,
+            lease_expires_at=now + timedelta(seconds=settings.AI_JOB_LEASE_SECONDS)
+        )
+
+    job.attempts += 1
+    GenerationJob.objects.filter(id=job.id).update(attempts=job.attempts)
+
+    try:
+        result = JOB_HANDLERS[job.operation](job, progress)
+    except Exception as e:
+        logger.warning(f"Generation job {job.id} failed (attempt {job.attempts}/{job.max_attempts}): {e}")
+        job.error = str(e)
+        job.lease_expires_at = None
+
+        # Missing notes or users will not appear on retry
+        if isinstance(e, ObjectDoesNotExist) or job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.message = 'Failed'
+            job.completed_at = timezone.now()
+        else:
+            backoff = settings.AI_JOB_RETRY_BACKOFF * (2 ** (job.attempts - 1))
+            job.status = 'pending'
+            job.progress = 0
+            job.message = f'Retrying in {backoff} seconds'
+            job.run_after = timezone.now() + timedelta(seconds=backoff)
+
+        job.save(update_fields=[
+            'status', 'progress', 'message', 'error', 'run_after', 'lease_expires_at',
+            'completed_at', 'updated_at'
+        ])
+        return job
+
+    job.status = 'succeeded'
+    job.progress = 100
+    job.message = 'Completed'
+    job.result = result
+    job.error = ''
+    job.lease_expires_at = None
+    job.completed_at = timezone.now()
+    job.save(update_fields=[
+        'status', 'progress', 'message', 'result', 'error', 'lease_expires_at',
+        'completed_at', 'updated_at'
+    ])
+    return job
@@ -0,0 +1,94 @@
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from rest_framework.test import APIClient
+
+
+class Command(BaseCommand):
+    help = ('Load-test the generation endpoints end to end (parsing, DB writes, serialization). '
+            'Run with AI_PROVIDER=fake to benchmark without an API key')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=['quiz', 'flashcards', 'notes'], default='quiz')
+        parser.add_argument('--requests', type=int, default=50, help='Total number of requests')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once')
+        parser.add_argument('--items', type=int, default=5, help='Questions or cards per request')
+        parser.add_argument('--allow-gemini', action='store_true',
+                            help='Allow running against the real Gemini provider')
+
+    def handle(self, *args, **options):
+        if settings.AI_PROVIDER != 'fake' and not options['allow_gemini']:
+            raise CommandError('AI_PROVIDER is not "fake"; pass --allow-gemini to benchmark the real API')
+
+        user, _ = get_user_model().objects.get_or_create(
+            username='benchmark', defaults={'email': 'benchmark@example.com'}
+        )
+        self.run_id = uuid.uuid4().hex[:8]
+        self.local = threading.local()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Benchmarking {options['endpoint']} with the {settings.AI_PROVIDER} provider: "
+            f"{options['requests']} requests, concurrency {options['concurrency']}"
+        ))
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(
+                lambda i: self.send(i, user, options), range(options['requests'])
+            ))
+        elapsed = time.monotonic() - started
+
+        latencies = sorted(latency for ok, latency in results if ok)
+        errors = sum(1 for ok, _ in results if not ok)
+        self.stdout.write(f'Completed:   {len(latencies)} ok, {errors} failed in {elapsed:.2f}s')
+        self.stdout.write(f'Throughput:  {len(results) / elapsed:.2f} req/s')
+        if latencies:
+            for label, q in (('p50', 50), ('p95', 95), ('p99', 99)):
+                self.stdout.write(f'Latency {label}: {self.percentile(latencies, q) * 1000:.0f} ms')
+            self.stdout.write(f'Latency mean: {statistics.mean(latencies) * 1000:.0f} ms')
+
+    def client(self, user):
+        """One APIClient per worker thread"""
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user)
+            self.local.client = client
+        return client
+
+    def send(self, i, user, options):
+        close_old_connections()
+        # A distinct topic per request keeps single-flight coalescing from merging them
+        topic = f'Photosynthesis benchmark {self.run_id}-{i}'
+        endpoint = options['endpoint']
+        if endpoint == 'quiz':
+            url, data = '/api/quizzes/generate-topic/', {'topic': topic, 'num_questions': options['items']}
+        elif endpoint == 'flashcards':
+            url, data = '/api/flashcards/generate-topic/', {'topic': topic, 'num_cards': options['items']}
+        else:
+            url, data = '/api/notes/generate-ai/', {'topic': topic}
+        data['use_cache'] = False
+
+        started = time.monotonic()
+        try:
+            response = self.client(user).post(url, data, format='json')
+            ok = response.status_code < 400
+            if not ok:
+                self.stderr.write(f'Request {i}: HTTP {response.status_code}')
+        except Exception as e:
+            ok = False
+            self.stderr.write(f'Request {i}: {e}')
+        finally:
+            close_old_connections()
+        return ok, time.monotonic() - started
+
+    def percentile(self, values, q):
+        index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+        return values[index]
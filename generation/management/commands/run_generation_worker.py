@@ -0,0 +1,69 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from generation.jobs import claim_next_job, run_job
+from studybuddy.ai_service import warm_up
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of workers that process queued AI generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker threads')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Process the jobs that are runnable now, then exit')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.once = options['once']
+        self.poll_interval = options['poll_interval']
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Starting {options['workers']} generation worker(s)..."
+        ))
+
+        if settings.AI_WARM_UP:
+            try:
+                warm_up()
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'AI service warm-up failed: {e}'))
+
+        threads = [
+            threading.Thread(target=self.work, name=f'generation-worker-{i + 1}', daemon=True)
+            for i in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping workers; running jobs will be retried once their lease expires')
+            self.stop.set()
+
+    def work(self):
+        while not self.stop.is_set():
+            close_old_connections()
+            try:
+                job = claim_next_job()
+                if job is None:
+                    if self.once:
+                        break
+                    self.stop.wait(self.poll_interval)
+                    continue
+
+                job = run_job(job)
+                self.stdout.write(f'Job {job.id} ({job.operation}): {job.status}')
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Worker error: {e}'))
+                time.sleep(self.poll_interval)
+            finally:
+                close_old_connections()
@@ -0,0 +1,158 @@
+"""
+In-process metrics for AI generation calls
+
+GeminiAIService records one entry per logical model call (including
+fallbacks and retries), plus parse outcomes and cache lookups. Values are
+aggregated into fixed-bucket histograms per operation and model, exposed
+to staff on /api/ai/metrics/. Counts are per process and reset on restart.
+"""
+import random
+import threading
+import time
+from collections import Counter, deque
+
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64]  # in seconds
+TOKEN_BUCKETS = [64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768]
+
+
+def sampled(rate):
+    """True for roughly `rate` of calls; used to sample verbose debug logging"""
+    return rate > 0 and random.random() < rate
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; percentiles are reported as bucket upper
+    bounds, or as ">last bound" for the overflow bucket
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, percentile):
+        if not self.count:
+            return None
+        rank = self.count * percentile / 100
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.buckets[i] if i < len(self.buckets) else f'>{self.buckets[-1]}'
+        return f'>{self.buckets[-1]}'
+
+    def snapshot(self):
+        labels = [f'le_{bound}' for bound in self.buckets] + ['inf']
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class _CallMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.time_to_first_token = Histogram(LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.response_tokens = Histogram(TOKEN_BUCKETS)
+        self.fallback_depth = Counter()
+        self.attempts = Counter()
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'latency': self.latency.snapshot(),
+            'time_to_first_token': self.time_to_first_token.snapshot(),
+            'prompt_tokens': self.prompt_tokens.snapshot(),
+            'response_tokens': self.response_tokens.snapshot(),
+            'fallback_depth': dict(sorted(self.fallback_depth.items())),
+            'attempts': dict(sorted(self.attempts.items())),
+        }
+
+
+class GenerationMetrics:
+    """Thread-safe registry of per-call AI metrics"""
+
+    def __init__(self, recent=50):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._parses = {}
+        self._cache = {}
+        self._recent = deque(maxlen=recent)
+        self.started_at = time.time()
+
+    def record_call(self, operation, model_name, fallback_depth, attempts, prompt_tokens,
+                    response_tokens, latency, time_to_first_token=None, streamed=False, error=''):
+        """Record one logical model call; model_name is empty when every model failed"""
+        with self._lock:
+            metrics = self._calls.setdefault((operation, model_name or 'none'), _CallMetrics())
+            metrics.calls += 1
+            metrics.latency.observe(latency)
+            metrics.prompt_tokens.observe(prompt_tokens)
+            metrics.attempts[attempts] += 1
+            if error:
+                metrics.errors += 1
+            else:
+                metrics.response_tokens.observe(response_tokens)
+                metrics.fallback_depth[fallback_depth] += 1
+            if time_to_first_token is not None:
+                metrics.time_to_first_token.observe(time_to_first_token)
+
+            self._recent.append({
+                'at': round(time.time(), 3),
+                'operation': operation,
+                'model': model_name,
+                'streamed': streamed,
+                'fallback_depth': fallback_depth,
+                'attempts': attempts,
+                'prompt_tokens': prompt_tokens,
+                'response_tokens': response_tokens,
+                'latency': round(latency, 3),
+                'time_to_first_token': round(time_to_first_token, 3) if time_to_first_token is not None else None,
+                'error': error[:200],
+            })
+
+    def record_parse(self, kind, outcome):
+        """outcome is one of 'full', 'salvaged' or 'failed'"""
+        with self._lock:
+            self._parses.setdefault(kind, Counter())[outcome] += 1
+
+    def record_cache(self, operation, hit):
+        with self._lock:
+            self._cache.setdefault(operation, Counter())['hits' if hit else 'misses'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._parses.clear()
+            self._cache.clear()
+            self._recent.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            calls = {}
+            for (operation, model_name), metrics in sorted(self._calls.items()):
+                calls.setdefault(operation, {})[model_name] = metrics.snapshot()
+            return {
+                'since': self.started_at,
+                'calls': calls,
+                'parse': {kind: dict(counts) for kind, counts in self._parses.items()},
+                'cache': {operation: dict(counts) for operation, counts in self._cache.items()},
+                'recent': list(self._recent),
+            }
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIResponseCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('operation', models.CharField(max_length=50)),
+                ('model_name', models.CharField(blank=True, max_length=100)),
+                ('payload', models.JSONField()),
+                ('size', models.IntegerField(default=0)),
+                ('hits', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-last_accessed'],
+                'indexes': [models.Index(fields=['last_accessed'], name='generation__last_ac_acb553_idx'), models.Index(fields=['expires_at'], name='generation__expires_3110ad_idx')],
+            },
+        ),
+    ]
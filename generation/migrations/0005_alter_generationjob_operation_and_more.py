@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generation', '0004_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='generationjob',
+            name='operation',
+            field=models.CharField(choices=[('quiz_from_note', 'Quiz from note'), ('quiz_from_topic', 'Quiz from topic'), ('flashcards_from_note', 'Flashcards from note'), ('flashcards_from_topic', 'Flashcards from topic'), ('notes', 'Notes'), ('question_pool', 'Question pool top-up')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='generationjob',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='generation_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generation', '0005_alter_generationjob_operation_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='generationjob',
+            name='operation',
+            field=models.CharField(choices=[('quiz_from_note', 'Quiz from note'), ('quiz_from_topic', 'Quiz from topic'), ('flashcards_from_note', 'Flashcards from note'), ('flashcards_from_topic', 'Flashcards from topic'), ('notes', 'Notes'), ('study_pack', 'Study pack'), ('question_pool', 'Question pool top-up')], max_length=30),
+        ),
+    ]
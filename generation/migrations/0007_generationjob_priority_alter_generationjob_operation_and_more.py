@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generation', '0006_alter_generationjob_operation'),
+        ('notes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='priority',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='generationjob',
+            name='operation',
+            field=models.CharField(choices=[('quiz_from_note', 'Quiz from note'), ('quiz_from_topic', 'Quiz from topic'), ('flashcards_from_note', 'Flashcards from note'), ('flashcards_from_topic', 'Flashcards from topic'), ('notes', 'Notes'), ('study_pack', 'Study pack'), ('question_pool', 'Question pool top-up'), ('note_drafts', 'Speculative note drafts')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='GenerationDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('quiz', 'Quiz'), ('flashcards', 'Flashcards')], max_length=10)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('num_items', models.IntegerField()),
+                ('difficulty', models.CharField(blank=True, max_length=10)),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generation_drafts', to='notes.note')),
+            ],
+            options={
+                'unique_together': {('note', 'kind', 'content_hash', 'num_items', 'difficulty')},
+            },
+        ),
+    ]
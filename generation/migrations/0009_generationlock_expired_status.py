@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generation', '0008_alter_generationjob_operation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='generationlock',
+            name='status',
+            field=models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('expired', 'Deadline exceeded')], default='running', max_length=10),
+        ),
+    ]
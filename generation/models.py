@@ -0,0 +1,143 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class AIResponseCache(models.Model):
+    """Parsed AI generation results keyed by a hash of prompt, models and config"""
+    key = models.CharField(max_length=64, unique=True)
+    operation = models.CharField(max_length=50)
+    model_name = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField()
+    size = models.IntegerField(default=0)  # serialized payload size in bytes
+    hits = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.operation} - {self.key[:12]}"
+
+    class Meta:
+        ordering = ['-last_accessed']
+        indexes = [
+            models.Index(fields=['last_accessed']),
+            models.Index(fields=['expires_at']),
+        ]
+
+
+class GenerationJob(models.Model):
+    """A queued AI generation request processed by the run_generation_worker command"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    OPERATION_CHOICES = [
+        ('quiz_from_note', 'Quiz from note'),
+        ('quiz_from_topic', 'Quiz from topic'),
+        ('flashcards_from_note', 'Flashcards from note'),
+        ('flashcards_from_topic', 'Flashcards from topic'),
+        ('quiz_regenerate', 'Quiz regeneration'),
+        ('flashcards_regenerate', 'Flashcard set regeneration'),
+        ('notes', 'Notes'),
+        ('study_pack', 'Study pack'),
+        ('question_pool', 'Question pool top-up'),
+        ('note_drafts', 'Speculative note drafts'),
+    ]
+
+    # Empty for system jobs such as question pool top-ups
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='generation_jobs',
+                             null=True, blank=True)
+    operation = models.CharField(max_length=30, choices=OPERATION_CHOICES)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    priority = models.SmallIntegerField(default=0)  # lower runs first; speculative work uses 10
+    progress = models.IntegerField(default=0)  # 0-100%
+    message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)  # ids of the created objects
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        owner = self.user.username if self.user else 'system'
+        return f"{owner} - {self.operation} - {self.status}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+
+class GenerationDraft(models.Model):
+    """
+    Quiz questions or flashcards generated speculatively after a note was
+    saved, served by the generate endpoints while the note is unchanged
+    """
+    KIND_CHOICES = [
+        ('quiz', 'Quiz'),
+        ('flashcards', 'Flashcards'),
+    ]
+
+    note = models.ForeignKey('notes.Note', on_delete=models.CASCADE, related_name='generation_drafts')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    content_hash = models.CharField(max_length=64)  # sha256 of the note title and content
+    num_items = models.IntegerField()
+    difficulty = models.CharField(max_length=10, blank=True)  # quizzes only
+    payload = models.JSONField()  # items in the AI response format
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.note_id} - {self.kind} - {self.content_hash[:12]}"
+
+    class Meta:
+        unique_together = ['note', 'kind', 'content_hash', 'num_items', 'difficulty']
+
+
+class GenerationLock(models.Model):
+    """
+    Shared in-flight marker for single-flight coalescing of identical
+    generation requests across gunicorn workers
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('expired', 'Deadline exceeded'),
+    ]
+
+    key = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} - {self.status}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """Stored first response for an Idempotency-Key, replayed to client retries"""
+    key_hash = models.CharField(max_length=64, unique=True)  # sha256 of user, path and header value
+    request_hash = models.CharField(max_length=64)  # sha256 of the request body
+    status_code = models.SmallIntegerField(null=True, blank=True)  # null while the original is in flight
+    response = models.JSONField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key_hash[:12]} - {self.status_code or 'in flight'}"
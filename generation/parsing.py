@@ -0,0 +1,177 @@
+"""
+Parsing and validation of AI-generated quiz questions and flashcards
+"""
+import json
+import re
+import threading
+from collections import Counter
+
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+
+def validate_question(item):
+    """Return True if item is a usable multiple-choice question"""
+    if not isinstance(item, dict):
+        return False
+    if not isinstance(item.get('question_text'), str) or not item['question_text'].strip():
+        return False
+
+    choices = item.get('choices')
+    if not isinstance(choices, list) or len(choices) < 2:
+        return False
+    for choice in choices:
+        if not isinstance(choice, dict) or not isinstance(choice.get('text'), str) or not choice['text'].strip():
+            return False
+        if not isinstance(choice.get('is_correct'), bool):
+            return False
+
+    return sum(1 for choice in choices if choice['is_correct']) == 1
+
+
+def validate_flashcard(item):
+    """Return True if item has a non-empty front and back"""
+    if not isinstance(item, dict):
+        return False
+    for field in ('front_text', 'back_text'):
+        if not isinstance(item.get(field), str) or not item[field].strip():
+            return False
+    return item.get('hint') is None or isinstance(item.get('hint'), str)
+
+
+def valid_items(items, validator, what):
+    """Items that pass validator; raises ValueError when none does, so nothing empty gets saved"""
+    valid = [item for item in items or [] if validator(item)]
+    if not valid:
+        raise ValueError(f"No valid {what} in the AI response")
+    return valid
+
+
+class IncrementalArrayParser:
+    """
+    Pull complete objects out of a JSON array while the document is still arriving
+
+    Feed the parser text chunks from a streamed response; each call
+    returns the objects of the `"<key>": [...]` array that closed in
+    that chunk (or of the first bare array when key is None). Markdown
+    fences and text around the JSON are ignored.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key) if key else r'\[')
+        self.buffer = ''
+        self.pos = 0
+        self.in_array = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.item_start = None
+        self.errors = 0
+
+    def feed(self, text):
+        self.buffer += text
+        items = []
+
+        if not self.in_array:
+            match = self._key_pattern.search(self.buffer)
+            if not match:
+                return items
+            self.in_array = True
+            self.pos = match.end()
+
+        buffer = self.buffer
+        while self.pos < len(buffer) and not self.finished:
+            char = buffer[self.pos]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0:
+                    self.item_start = self.pos
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0:
+                    # End of the outer array
+                    self.finished = True
+                else:
+                    self.depth -= 1
+                    if self.depth == 0:
+                        item = self._decode(buffer[self.item_start:self.pos + 1])
+                        if item is not None:
+                            items.append(item)
+                        self.item_start = None
+
+            self.pos += 1
+
+        return items
+
+    def _decode(self, fragment):
+        try:
+            return json.loads(fragment)
+        except json.JSONDecodeError:
+            pass
+        try:
+            # Models occasionally leave trailing commas inside objects
+            return json.loads(_TRAILING_COMMA.sub(r'\1', fragment))
+        except json.JSONDecodeError:
+            self.errors += 1
+            return None
+
+
+def salvage_items(text, key, validator):
+    """
+    Recover every complete, valid object of the `key` array from a
+    truncated or slightly malformed response
+    """
+    parser = IncrementalArrayParser(key)
+    items = parser.feed(text)
+    if not parser.in_array:
+        # Some models drop the wrapper object and return a bare array
+        parser = IncrementalArrayParser(None)
+        items = parser.feed(text)
+    return [item for item in items if validator(item)]
+
+
+def salvage_string(text, key):
+    """Value of the `"key": "..."` string in a possibly truncated response, or '' if it is incomplete"""
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(key), text)
+    if not match:
+        return ''
+    try:
+        value, end = json.JSONDecoder().raw_decode(text, match.end() - 1)
+    except json.JSONDecodeError:
+        return ''
+    return value
+
+
+class ParseStats:
+    """Thread-safe counters describing how AI responses were parsed"""
+
+    FIELDS = [
+        'full_parses',          # response parsed as valid JSON
+        'salvaged_responses',   # invalid JSON, but items were recovered instead of regenerating
+        'salvaged_items',
+        'dropped_items',        # items that failed schema validation
+        'failed_parses',        # nothing usable in the response
+        'followup_calls',       # extra calls made to request only the missing items
+    ]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            self._counts[field] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return {field: self._counts[field] for field in self.FIELDS}
@@ -0,0 +1,240 @@
+"""
+AI provider backends used by GeminiAIService
+
+A provider turns (model name, prompt, generation config) into text. The
+Gemini provider talks to Google's API; the fake provider produces
+schema-valid quiz, flashcard and notes output locally with configurable
+latency and failure rates, so the generation pipeline can be load-tested
+and run in CI without an API key or network access.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .text import CHARS_PER_TOKEN
+
+
+class BaseProvider:
+    """Interface every AI provider implements"""
+    name = ''
+
+    def warm_up(self, model_names):
+        """Prepare clients for model_names ahead of the first request"""
+
+    def generate(self, model_name, prompt, generation_config, timeout=None):
+        """Return the full response text for prompt, giving up after timeout seconds if set"""
+        raise NotImplementedError
+
+    def stream(self, model_name, prompt, generation_config):
+        """Yield response text chunks for prompt as they are produced"""
+        raise NotImplementedError
+
+
+class GeminiProvider(BaseProvider):
+    name = 'gemini'
+    MAX_TIMED_CALLS = 16
+
+    def __init__(self, api_key):
+        import google.generativeai as genai
+
+        if not api_key:
+            raise Exception("GEMINI_API_KEY is not configured")
+
+        self.genai = genai
+        genai.configure(api_key=api_key)
+        # One GenerativeModel per model name, built once and reused across requests
+        self._models = {}
+        self._models_lock = threading.Lock()
+        # Runs calls made under a deadline, see generate()
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_TIMED_CALLS, thread_name_prefix='gemini-call')
+
+    def _get_model(self, model_name):
+        """Return the pooled GenerativeModel for model_name, building it on first use"""
+        model = self._models.get(model_name)
+        if model is None:
+            with self._models_lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self.genai.GenerativeModel(model_name)
+                    self._models[model_name] = model
+        return model
+
+    def warm_up(self, model_names):
+        for model_name in model_names:
+            self._get_model(model_name)
+
+    def _generate(self, model_name, prompt, generation_config):
+        response = self._get_model(model_name).generate_content(
+            prompt,
+            generation_config=self.genai.types.GenerationConfig(**generation_config)
+        )
+        return response.text
+
+    def generate(self, model_name, prompt, generation_config, timeout=None):
+        if not timeout:
+            return self._generate(model_name, prompt, generation_config)
+        # The pinned SDK takes no per-request timeout, so the caller stops waiting
+        # instead; an abandoned call finishes in the pool and its result is dropped
+        future = self._executor.submit(self._generate, model_name, prompt, generation_config)
+        return future.result(timeout=timeout)
+
+    def stream(self, model_name, prompt, generation_config):
+        response = self._get_model(model_name).generate_content(
+            prompt,
+            generation_config=self.genai.types.GenerationConfig(**generation_config),
+            stream=True
+        )
+        for chunk in response:
+            yield chunk.text
+
+
+class FakeProvider(BaseProvider):
+    """
+    Deterministic local stand-in for load testing
+
+    Output depends only on the prompt. Latency is drawn from a log-normal
+    distribution around `latency_median` seconds; `failure_rate` and
+    `truncate_rate` inject errors and responses cut off mid-JSON.
+    `model_overrides` maps model names to per-model values of these knobs.
+    """
+    name = 'fake'
+
+    DEFAULTS = {
+        'latency_median': 1.0,     # seconds
+        'latency_sigma': 0.5,      # log-normal spread; 0 gives a constant latency
+        'first_token_ratio': 0.2,  # share of the latency spent before the first streamed chunk
+        'failure_rate': 0.0,
+        'truncate_rate': 0.0,
+        'chunk_chars': 80,
+        'seed': 0,
+    }
+
+    def __init__(self, options=None, model_overrides=None):
+        self.options = {**self.DEFAULTS, **(options or {})}
+        self.model_overrides = model_overrides or {}
+        self._random = random.Random(self.options['seed'])
+        self._lock = threading.Lock()
+
+    def _option(self, model_name, key):
+        return self.model_overrides.get(model_name, {}).get(key, self.options[key])
+
+    def _draw(self, model_name):
+        """Sample (latency, fails, truncates) for one call"""
+        with self._lock:
+            median = self._option(model_name, 'latency_median')
+            sigma = self._option(model_name, 'latency_sigma')
+            latency = median * self._random.lognormvariate(0, sigma) if sigma else median
+            fails = self._random.random() < self._option(model_name, 'failure_rate')
+            truncates = self._random.random() < self._option(model_name, 'truncate_rate')
+        return latency, fails, truncates
+
+    def _count(self, prompt, pattern, default):
+        match = re.search(pattern, prompt)
+        return int(match.group(1)) if match else default
+
+    def _title(self, prompt):
+        match = re.search(r'(?:\*\*TOPIC:\*\*|Title:)\s*(.+)', prompt)
+        return match.group(1).strip() if match else 'the topic'
+
+    def _questions(self, prompt, rng, title):
+        num_questions = self._count(prompt, r'exactly (\d+) multiple-choice', 5)
+        questions = []
+        for i in range(num_questions):
+            correct = rng.randrange(4)
+            questions.append({
+                'question_text': f"Question {i + 1} about {title}: which statement is accurate "
+                                 f"(variant {rng.randrange(10 ** 6)})?",
+                'choices': [
+                    {'text': f"Statement {chr(65 + j)} on {title}", 'is_correct': j == correct}
+                    for j in range(4)
+                ],
+                'explanation': f"Statement {chr(65 + correct)} reflects the key idea of {title}.",
+            })
+        return questions
+
+    def _flashcards(self, prompt, rng, title):
+        num_cards = self._count(prompt, r'exactly (\d+) high-quality flashcards', 10)
+        return [
+            {
+                'front_text': f"Key concept {i + 1} of {title} (variant {rng.randrange(10 ** 6)})",
+                'back_text': f"An explanation of concept {i + 1} as it applies to {title}.",
+                'hint': f"Think about part {i + 1}",
+            }
+            for i in range(num_cards)
+        ]
+
+    def _notes(self, rng, title):
+        sections = '\n\n'.join(
+            f"## Section {i + 1}\n\n- **Point {i + 1}.1**: detail about {title}\n"
+            f"- **Point {i + 1}.2**: example {rng.randrange(10 ** 6)}"
+            for i in range(5)
+        )
+        return f"# {title}\n\n{sections}\n\n## Summary\n\nKey takeaways about {title}."
+
+    def render(self, prompt):
+        """Schema-valid response text for prompt, the same on every call"""
+        rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        title = self._title(prompt)
+
+        if '"notes"' in prompt:
+            return json.dumps({
+                'notes': self._notes(rng, title),
+                'questions': self._questions(prompt, rng, title),
+                'flashcards': self._flashcards(prompt, rng, title),
+            }, indent=2)
+        if '"questions"' in prompt:
+            questions = self._questions(prompt, rng, title)
+            return '```json\n' + json.dumps({'questions': questions}, indent=2) + '\n```'
+        if '"flashcards"' in prompt:
+            return json.dumps({'flashcards': self._flashcards(prompt, rng, title)}, indent=2)
+        return self._notes(rng, title)
+
+    def _response(self, prompt, generation_config, truncates):
+        """Rendered text, cut short when truncation is drawn or it exceeds max_output_tokens"""
+        text = self.render(prompt)
+        if truncates:
+            text = text[:len(text) * 2 // 3]
+        max_tokens = generation_config.get('max_output_tokens')
+        return text[:max_tokens * CHARS_PER_TOKEN] if max_tokens else text
+
+    def generate(self, model_name, prompt, generation_config, timeout=None):
+        latency, fails, truncates = self._draw(model_name)
+        if timeout is not None and latency > timeout:
+            time.sleep(max(timeout, 0))
+            raise TimeoutError(f"Fake provider timed out for {model_name} after {timeout:.1f}s")
+        time.sleep(latency)
+        if fails:
+            raise Exception(f"Fake provider failure for {model_name}")
+        return self._response(prompt, generation_config, truncates)
+
+    def stream(self, model_name, prompt, generation_config):
+        latency, fails, truncates = self._draw(model_name)
+        first_token = latency * self._option(model_name, 'first_token_ratio')
+        time.sleep(first_token)
+        if fails:
+            raise Exception(f"Fake provider failure for {model_name}")
+
+        text = self._response(prompt, generation_config, truncates)
+        size = self.options['chunk_chars']
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        delay = (latency - first_token) / max(len(chunks), 1)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(delay)
+            yield chunk
+
+
+def get_provider(name=None):
+    """Build the provider selected by settings.AI_PROVIDER"""
+    name = name or settings.AI_PROVIDER
+    if name == 'gemini':
+        return GeminiProvider(settings.GEMINI_API_KEY)
+    if name == 'fake':
+        return FakeProvider(settings.AI_FAKE_PROVIDER, settings.AI_FAKE_MODEL_OVERRIDES)
+    raise Exception(f"Unknown AI provider: {name}")
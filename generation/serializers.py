@@ -0,0 +1,12 @@
+from rest_framework import serializers
+from .models import GenerationJob
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GenerationJob
+        fields = [
+            'id', 'operation', 'status', 'progress', 'message', 'result', 'error',
+            'attempts', 'max_attempts', 'created_at', 'updated_at', 'completed_at'
+        ]
+        read_only_fields = fields
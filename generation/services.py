@@ -0,0 +1,65 @@
+"""
+Study pack generation: notes, a quiz and flashcards from one model call
+"""
+from django.db import transaction
+
+from .coalesce import coalesce_key, single_flight
+
+
+def create_study_pack(user, topic, description='', guidelines='', subject_name='', difficulty='medium',
+                      num_questions=5, num_cards=10, use_cache=True, progress=None):
+    """
+    Generate a study pack about a topic and save it as a note with a quiz
+    and a flashcard set attached
+
+    Returns (note, quiz, flashcard_set). Identical concurrent requests
+    share one generation and receive the same objects.
+    """
+    from notes.models import Note
+    from quizzes.models import Quiz
+    from flashcards.models import FlashcardSet
+
+    def generate():
+        note, quiz, flashcard_set = _create_study_pack(
+            user, topic, description, guidelines, subject_name, difficulty,
+            num_questions, num_cards, use_cache, progress
+        )
+        return {'note_id': note.id, 'quiz_id': quiz.id, 'flashcard_set_id': flashcard_set.id}
+
+    key = coalesce_key(user, 'study_pack', topic, description, guidelines, subject_name, difficulty,
+                       num_questions, num_cards, use_cache)
+    ids = single_flight(key, generate)
+    return (
+        Note.objects.get(id=ids['note_id']),
+        Quiz.objects.get(id=ids['quiz_id']),
+        FlashcardSet.objects.get(id=ids['flashcard_set_id']),
+    )
+
+
+def _create_study_pack(user, topic, description='', guidelines='', subject_name='', difficulty='medium',
+                       num_questions=5, num_cards=10, use_cache=True, progress=None):
+    """Generate a study pack about a topic and save the note, quiz and flashcard set together"""
+    from studybuddy.ai_service import ai_service
+    from notes.services import save_ai_note
+    from quizzes.services import save_note_quiz
+    from flashcards.services import save_note_flashcards
+
+    pack = ai_service.generate_study_pack(
+        topic=topic,
+        description=description,
+        guidelines=guidelines,
+        num_questions=num_questions,
+        num_cards=num_cards,
+        difficulty=difficulty,
+        use_cache=use_cache
+    )
+
+    if progress:
+        progress(80, 'Saving study pack')
+
+    with transaction.atomic():
+        note = save_ai_note(user, topic, pack['notes'], subject_name=subject_name, difficulty=difficulty)
+        quiz = save_note_quiz(user, note, pack['questions'], difficulty=difficulty)
+        flashcard_set = save_note_flashcards(user, note, pack['flashcards'])
+
+    return note, quiz, flashcard_set
@@ -0,0 +1,647 @@
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from .cache import AIResponseCacheStore, make_cache_key
+from .coalesce import single_flight
+from .deadline import DeadlineExceeded, check_budget, deadline, request_budget
+from .drafts import DRAFT_NUM_QUESTIONS, DRAFT_PRIORITY, content_hash, generate_drafts, request_drafts, take_draft
+from .health import ModelCircuitBreaker
+from .hedging import HedgeBudget
+from .idempotency import _acquire, _sha256, idempotent
+from .jobs import JOB_HANDLERS, claim_next_job, enqueue_job, run_job
+from .models import AIResponseCache, GenerationDraft, GenerationJob, GenerationLock
+from .parsing import (
+    IncrementalArrayParser, salvage_items, salvage_string, valid_items, validate_flashcard, validate_question
+)
+from .text import chunk_content
+from .utils import item_count
+from notes.models import Note
+
+# Deterministic, instant stand-in for the model API
+fake_ai = override_settings(AI_PROVIDER='fake', AI_FAKE_PROVIDER={'latency_median': 0.0, 'latency_sigma': 0.0})
+
+
+class AIResponseCacheTests(TestCase):
+    def test_keys_are_content_addressed(self):
+        config = {'temperature': 0.7}
+
+        key = make_cache_key('flashcards', 'prompt', ['model'], config)
+
+        self.assertEqual(key, make_cache_key('flashcards', 'prompt', ['model'], dict(config)))
+        self.assertNotEqual(key, make_cache_key('flashcards', 'other prompt', ['model'], config))
+        self.assertNotEqual(key, make_cache_key('flashcards', 'prompt', ['model'], {'temperature': 0.2}))
+
+    def test_entries_expire(self):
+        store = AIResponseCacheStore()
+        store.set('key', 'flashcards', [1, 2])
+        self.assertEqual(store.get('key'), [1, 2])
+
+        AIResponseCache.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertIsNone(store.get('key'))
+
+    @override_settings(AI_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        store = AIResponseCacheStore()
+        store.set('first', 'flashcards', 1)
+        store.set('second', 'flashcards', 2)
+        AIResponseCache.objects.filter(key='first').update(last_accessed=timezone.now() - timedelta(hours=1))
+        store.get('first')  # now the most recently used
+
+        store.set('third', 'flashcards', 3)
+
+        self.assertEqual(set(AIResponseCache.objects.values_list('key', flat=True)), {'first', 'third'})
+
+    @override_settings(AI_CACHE_MAX_ENTRY_BYTES=10)
+    def test_oversized_payloads_are_not_stored(self):
+        AIResponseCacheStore().set('key', 'notes', 'x' * 100)
+
+        self.assertFalse(AIResponseCache.objects.exists())
+
+    @fake_ai
+    def test_repeated_requests_are_served_from_cache(self):
+        from studybuddy.ai_service import GeminiAIService
+
+        service = GeminiAIService()
+        note = '# Cells\n\nThe nucleus stores DNA.'
+        cards = service.generate_flashcards(note, 'Cells', num_cards=3)
+
+        with mock.patch.object(service.provider, 'generate', wraps=service.provider.generate) as generate:
+            self.assertEqual(service.generate_flashcards(note, 'Cells', num_cards=3), cards)
+            service.generate_flashcards(note, 'Cells', num_cards=3, use_cache=False)
+
+        self.assertEqual(generate.call_count, 1)
+
+
+class ModelCircuitBreakerTests(TestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = ModelCircuitBreaker(failure_threshold=2, recovery_timeout=60)
+
+        breaker.record_failure('model', 'boom')
+        self.assertTrue(breaker.allow('model'))
+        breaker.record_failure('model', 'boom')
+
+        self.assertFalse(breaker.allow('model'))
+        self.assertEqual(breaker.snapshot()['model']['state'], 'open')
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker = ModelCircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure('model')
+
+        self.assertTrue(breaker.allow('model'))
+        self.assertFalse(breaker.allow('model'))
+
+        breaker.record_success('model', 1.0)
+        self.assertTrue(breaker.allow('model'))
+        self.assertEqual(breaker.snapshot()['model']['state'], 'closed')
+
+    def test_failed_probe_reopens(self):
+        breaker = ModelCircuitBreaker(failure_threshold=3, recovery_timeout=0)
+        for _ in range(3):
+            breaker.record_failure('model')
+        breaker.allow('model')
+
+        breaker.record_failure('model')
+
+        self.assertEqual(breaker.snapshot()['model']['state'], 'open')
+
+    def test_released_probe_frees_the_slot(self):
+        breaker = ModelCircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure('model')
+        breaker.allow('model')
+
+        breaker.release('model')
+
+        self.assertTrue(breaker.allow('model'))
+
+
+@override_settings(AI_JOB_LEASE_SECONDS=600, AI_JOB_MAX_ATTEMPTS=2)
+class JobQueueTests(TestCase):
+    def test_higher_priority_jobs_are_claimed_first(self):
+        low = enqueue_job(None, 'note_drafts', {}, priority=10)
+        high = enqueue_job(None, 'question_pool', {})
+
+        self.assertEqual(claim_next_job().id, high.id)
+        self.assertEqual(claim_next_job().id, low.id)
+        self.assertIsNone(claim_next_job())
+
+    def test_expired_jobs_are_reclaimed_until_attempts_run_out(self):
+        job = enqueue_job(None, 'note_drafts', {})
+        expired = timezone.now() - timedelta(seconds=1)
+        GenerationJob.objects.filter(id=job.id).update(status='running', attempts=1, lease_expires_at=expired)
+        self.assertEqual(claim_next_job().id, job.id)
+
+        GenerationJob.objects.filter(id=job.id).update(attempts=2, lease_expires_at=expired)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_progress_renews_the_lease(self):
+        enqueue_job(None, 'note_drafts', {})
+        job = claim_next_job()
+        GenerationJob.objects.filter(id=job.id).update(lease_expires_at=timezone.now())
+        leases = []
+
+        def handler(job, progress):
+            progress(50, 'Halfway')
+            leases.append(GenerationJob.objects.get(id=job.id).lease_expires_at)
+            return {}
+
+        with mock.patch.dict(JOB_HANDLERS, {'note_drafts': handler}):
+            run_job(job)
+
+        self.assertGreater(leases[0], timezone.now() + timedelta(seconds=500))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+
+    def test_async_requests_are_queued_and_polled(self):
+        user = User.objects.create_user(username='student', password='password')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post('/api/quizzes/generate-topic/', {'topic': 'Cells', 'async': True}, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        job = client.get(f"/api/ai/jobs/{response.data['id']}/")
+        self.assertEqual(job.data['status'], 'pending')
+        self.assertEqual(job.data['operation'], 'quiz_from_topic')
+        other = User.objects.create_user(username='other', password='password')
+        client.force_authenticate(other)
+        self.assertEqual(client.get(f"/api/ai/jobs/{response.data['id']}/").status_code, 404)
+
+
+class IncrementalArrayParserTests(TestCase):
+    def test_items_are_returned_as_their_objects_close(self):
+        parser = IncrementalArrayParser('flashcards')
+
+        self.assertEqual(parser.feed('```json\n{"flashcards": [{"front_text": "A", '), [])
+        self.assertEqual(parser.feed('"back_text": "1"}, {"front_text": "B"'), [{'front_text': 'A', 'back_text': '1'}])
+        self.assertEqual(parser.feed(', "back_text": "2"}]}\n```'), [{'front_text': 'B', 'back_text': '2'}])
+        self.assertTrue(parser.finished)
+
+    def test_brackets_and_quotes_inside_strings_are_ignored(self):
+        parser = IncrementalArrayParser('flashcards')
+
+        items = parser.feed('{"flashcards": [{"front_text": "a \\"quoted\\" {x} [y]", "back_text": "]"}]}')
+
+        self.assertEqual(items, [{'front_text': 'a "quoted" {x} [y]', 'back_text': ']'}])
+
+    def test_trailing_commas_are_tolerated(self):
+        parser = IncrementalArrayParser('flashcards')
+
+        items = parser.feed('{"flashcards": [{"front_text": "A", "back_text": "1",}]}')
+
+        self.assertEqual(items, [{'front_text': 'A', 'back_text': '1'}])
+        self.assertEqual(parser.errors, 0)
+
+
+class SalvageTests(TestCase):
+    def test_complete_items_are_recovered_from_a_truncated_response(self):
+        text = '{"flashcards": [{"front_text": "A", "back_text": "1"}, {"front_text": "B", "back_t'
+
+        self.assertEqual(salvage_items(text, 'flashcards', validate_flashcard), [{'front_text': 'A', 'back_text': '1'}])
+
+    def test_bare_arrays_are_accepted(self):
+        text = '[{"front_text": "A", "back_text": "1"}]'
+
+        self.assertEqual(len(salvage_items(text, 'flashcards', validate_flashcard)), 1)
+
+    def test_invalid_items_are_dropped(self):
+        text = '{"flashcards": [{"front_text": "A", "back_text": ""}, {"front_text": "B", "back_text": "2"}]}'
+
+        self.assertEqual(salvage_items(text, 'flashcards', validate_flashcard), [{'front_text': 'B', 'back_text': '2'}])
+
+    def test_questions_need_exactly_one_correct_choice(self):
+        text = '''{"questions": [
+            {"question_text": "Q1", "choices": [{"text": "a", "is_correct": true}, {"text": "b", "is_correct": true}]},
+            {"question_text": "Q2", "choices": [{"text": "a", "is_correct": true}, {"text": "b", "is_correct": false}]}
+        ]}'''
+
+        self.assertEqual([item['question_text'] for item in salvage_items(text, 'questions', validate_question)], ['Q2'])
+
+    def test_valid_items_requires_one_valid_item(self):
+        card = {'front_text': 'A', 'back_text': '1'}
+
+        self.assertEqual(valid_items([card, {'front_text': ''}], validate_flashcard, 'flashcards'), [card])
+        with self.assertRaises(ValueError):
+            valid_items([{'front_text': ''}], validate_flashcard, 'flashcards')
+
+
+class ChunkContentTests(TestCase):
+    def test_short_content_is_one_chunk(self):
+        self.assertEqual(chunk_content('# A\n\nShort note.', 100), ['# A\n\nShort note.'])
+
+    def test_sections_are_kept_together(self):
+        content = '\n'.join(f'# Section {i}\n\n' + 'word ' * 40 for i in range(6))
+
+        chunks = chunk_content(content, 60)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith('# Section'))
+        self.assertEqual(sum(chunk.count('# Section') for chunk in chunks), 6)
+
+    def test_oversized_sections_are_split_within_budget(self):
+        content = '# Long\n\n' + '\n\n'.join('sentence ' * 30 for _ in range(10))
+
+        chunks = chunk_content(content, 50)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), 50 * 4)
+
+    @fake_ai
+    def test_long_notes_are_generated_chunk_by_chunk(self):
+        from studybuddy.ai_service import GeminiAIService
+
+        service = GeminiAIService()
+        service.chunk_token_budget = 60
+        content = '\n'.join(f'# Section {i}\n\n' + f'Fact {i} about cells. ' * 10 for i in range(4))
+
+        with mock.patch.object(service.provider, 'generate', wraps=service.provider.generate) as generate:
+            cards = service.generate_flashcards(content, 'Cells', num_cards=6, use_cache=False)
+
+        self.assertEqual(len(cards), 6)
+        self.assertGreater(generate.call_count, 1)
+
+
+class SingleFlightTests(TestCase):
+    def lock(self, **fields):
+        return GenerationLock.objects.create(
+            key='key', expires_at=timezone.now() + timedelta(seconds=60), **fields
+        )
+
+    def test_result_is_shared_while_it_lingers(self):
+        calls = []
+
+        def generate():
+            calls.append(1)
+            return {'id': 1}
+
+        self.assertEqual(single_flight('key', generate), {'id': 1})
+        self.assertEqual(single_flight('key', generate), {'id': 1})
+        self.assertEqual(len(calls), 1)
+
+    def test_waiters_reraise_the_holders_failure(self):
+        self.lock(status='failed', error='model down')
+
+        with self.assertRaisesMessage(Exception, 'model down'):
+            single_flight('key', lambda: 1)
+
+    def test_waiters_reraise_deadline_failures_as_such(self):
+        self.lock(status='expired', error='Request deadline exceeded')
+
+        with self.assertRaises(DeadlineExceeded):
+            single_flight('key', lambda: 1)
+
+    def test_lock_of_a_dead_holder_is_taken_over(self):
+        GenerationLock.objects.create(key='key', expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(single_flight('key', lambda: 2), 2)
+
+    def test_leader_deadline_failure_is_recorded(self):
+        def generate():
+            raise DeadlineExceeded('out of time')
+
+        with self.assertRaises(DeadlineExceeded):
+            single_flight('key', generate)
+        self.assertEqual(GenerationLock.objects.get(key='key').status, 'expired')
+
+    def test_results_do_not_linger_when_asked(self):
+        calls = []
+
+        def generate():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(single_flight('key', generate, linger=0), 1)
+        self.assertEqual(single_flight('key', generate, linger=0), 2)
+
+    def test_fresh_requests_are_not_served_a_cached_requests_result(self):
+        from quizzes.services import create_quiz_from_topic
+
+        user = User.objects.create_user(username='student', password='password')
+        question = {
+            'question_text': 'Where is DNA kept?',
+            'explanation': '',
+            'choices': [{'text': 'Nucleus', 'is_correct': True}, {'text': 'Membrane', 'is_correct': False}],
+        }
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            ai_service.generate_quiz_from_topic.return_value = [question]
+            cached = create_quiz_from_topic(user, 'Cells', num_questions=1)
+            fresh = create_quiz_from_topic(user, 'Cells', num_questions=1, use_cache=False)
+
+        self.assertNotEqual(fresh.id, cached.id)
+        self.assertEqual(ai_service.generate_quiz_from_topic.call_count, 2)
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        self.factory = APIRequestFactory()
+        self.calls = 0
+        self.status = 201
+
+        @api_view(['POST'])
+        @idempotent
+        def view(request):
+            self.calls += 1
+            return Response({'call': self.calls}, status=self.status)
+
+        self.view = view
+
+    def post(self, data, key='key-1', **headers):
+        request = self.factory.post('/generate/', data, format='json', HTTP_IDEMPOTENCY_KEY=key, **headers)
+        force_authenticate(request, self.user)
+        return self.view(request)
+
+    def test_retries_get_the_stored_response(self):
+        first = self.post({'topic': 'cells'})
+        retry = self.post({'topic': 'cells'})
+
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.calls, 1)
+
+    def test_reusing_a_key_for_another_request_is_rejected(self):
+        self.post({'topic': 'cells'})
+
+        self.assertEqual(self.post({'topic': 'atoms'}).status_code, 422)
+
+    def test_server_errors_are_not_stored(self):
+        self.status = 500
+        self.post({'topic': 'cells'})
+        self.status = 201
+
+        self.assertEqual(self.post({'topic': 'cells'}).status_code, 201)
+        self.assertEqual(self.calls, 2)
+
+    def test_wait_on_the_original_is_bounded_by_the_request_budget(self):
+        key_hash = _sha256(f"{self.user.pk}:/generate/:key-1")
+        _acquire(key_hash, _sha256(json.dumps({'topic': 'cells'}, sort_keys=True)))
+
+        started = time.monotonic()
+        response = self.post({'topic': 'cells'}, HTTP_X_REQUEST_TIMEOUT='0.5')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(self.calls, 0)
+
+
+class ItemCountTests(TestCase):
+    def test_counts_are_converted_and_clamped(self):
+        self.assertEqual(item_count('3', 30), 3)
+        self.assertEqual(item_count(500, 30), 30)
+        self.assertEqual(item_count(0, 30), 1)
+        with self.assertRaises(ValueError):
+            item_count('many', 30)
+
+
+class HedgeBudgetTests(TestCase):
+    def test_bursts_are_capped_and_refill_per_request(self):
+        budget = HedgeBudget(ratio=0.5, burst=2)
+
+        self.assertTrue(budget.try_acquire())
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+        budget.record_request()
+        self.assertFalse(budget.try_acquire())
+        budget.record_request()
+        self.assertTrue(budget.try_acquire())
+        self.assertEqual(budget.snapshot()['denied'], 2)
+
+
+@fake_ai
+@override_settings(AI_HEDGE_ENABLED=True, AI_HEDGE_DEFAULT_DELAY=0.05,
+                   AI_FAKE_MODEL_OVERRIDES={'gemini-2.5-flash': {'latency_median': 0.3}})
+class HedgedRequestTests(TestCase):
+    def setUp(self):
+        from studybuddy.ai_service import GeminiAIService
+
+        self.service = GeminiAIService()
+
+    def test_slow_model_is_raced_against_the_next(self):
+        _, model_name = self.service._generate_with_fallback('Write notes about cells')
+
+        self.assertEqual(model_name, self.service.model_names[1])
+        self.assertEqual(self.service.hedge_budget.snapshot()['hedges'], 1)
+
+    def test_no_hedge_token_is_spent_without_a_model_to_race(self):
+        self.service.model_names = self.service.model_names[:1]
+
+        _, model_name = self.service._generate_with_fallback('Write notes about cells')
+
+        self.assertEqual(model_name, 'gemini-2.5-flash')
+        self.assertEqual(self.service.hedge_budget.snapshot()['hedges'], 0)
+        self.assertEqual(self.service.hedge_budget.snapshot()['denied'], 0)
+
+    def test_exhausted_budget_sends_no_hedge(self):
+        while self.service.hedge_budget.try_acquire():
+            pass
+
+        _, model_name = self.service._generate_with_fallback('Write notes about cells')
+
+        self.assertEqual(model_name, 'gemini-2.5-flash')
+
+
+@fake_ai
+class AIMetricsTests(TestCase):
+    def setUp(self):
+        from studybuddy.ai_service import GeminiAIService
+
+        self.service = GeminiAIService()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='password', is_staff=True))
+
+    def get_metrics(self):
+        with mock.patch('studybuddy.ai_service.ai_service', self.service):
+            return self.client.get('/api/ai/metrics/')
+
+    def test_calls_are_recorded_per_operation_and_model(self):
+        self.service.generate_flashcards('# Cells\n\nThe nucleus stores DNA.', 'Cells', num_cards=2)
+
+        metrics = self.get_metrics().data
+
+        model_metrics = metrics['calls']['flashcards']['gemini-2.5-flash']
+        self.assertEqual(model_metrics['calls'], 1)
+        self.assertEqual(model_metrics['errors'], 0)
+        self.assertEqual(model_metrics['fallback_depth'], {0: 1})
+        self.assertEqual(metrics['parse']['flashcards'], {'full': 1})
+        self.assertEqual(metrics['cache']['flashcards'], {'misses': 1})
+        self.assertEqual(metrics['recent'][0]['operation'], 'flashcards')
+
+    def test_delete_resets_the_counters(self):
+        self.service.generate_flashcards('# Cells\n\nThe nucleus stores DNA.', 'Cells', num_cards=2)
+
+        with mock.patch('studybuddy.ai_service.ai_service', self.service):
+            self.assertEqual(self.client.delete('/api/ai/metrics/').status_code, 204)
+
+        self.assertEqual(self.get_metrics().data['calls'], {})
+
+    def test_metrics_are_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user(username='student', password='password'))
+
+        self.assertEqual(self.get_metrics().status_code, 403)
+
+
+@fake_ai
+class StudyPackTests(TestCase):
+    def setUp(self):
+        from studybuddy.ai_service import GeminiAIService
+
+        self.service = GeminiAIService()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, data):
+        with mock.patch('studybuddy.ai_service.ai_service', self.service), \
+                mock.patch.object(self.service.provider, 'generate', wraps=self.service.provider.generate) as generate:
+            return self.client.post('/api/ai/study-pack/', data, format='json'), generate
+
+    def test_note_quiz_and_flashcards_come_from_one_call(self):
+        response, generate = self.post({'topic': 'Cells', 'num_questions': 3, 'num_cards': 4})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(generate.call_count, 1)
+        note = Note.objects.get(id=response.data['note']['id'])
+        self.assertEqual(note.quizzes.get().id, response.data['quiz']['id'])
+        self.assertEqual(note.flashcard_sets.get().id, response.data['flashcard_set']['id'])
+        self.assertEqual(len(response.data['quiz']['questions']), 3)
+        self.assertEqual(len(response.data['flashcard_set']['flashcards']), 4)
+
+    def test_non_numeric_counts_are_rejected(self):
+        response, generate = self.post({'topic': 'Cells', 'num_cards': 'lots'})
+
+        self.assertEqual(response.status_code, 400)
+        generate.assert_not_called()
+
+    def test_truncated_strings_are_not_salvaged(self):
+        self.assertEqual(salvage_string('{"title": "Cells", "notes": "# Nuc', 'title'), 'Cells')
+        self.assertEqual(salvage_string('{"title": "Cells", "notes": "# Nuc', 'notes'), '')
+
+
+class DeadlineTests(TestCase):
+    def test_check_budget(self):
+        check_budget(100)
+        with deadline(1):
+            check_budget(0.5)
+            with self.assertRaises(DeadlineExceeded):
+                check_budget(5)
+
+    def test_nested_deadlines_only_shorten(self):
+        with deadline(1):
+            with deadline(100):
+                with self.assertRaises(DeadlineExceeded):
+                    check_budget(5)
+
+    @override_settings(AI_REQUEST_TIMEOUT=25)
+    def test_request_budget_is_capped(self):
+        factory = APIRequestFactory()
+
+        @api_view(['GET'])
+        @permission_classes([AllowAny])
+        def view(request):
+            return Response(request_budget(request))
+
+        def budget(**headers):
+            return view(factory.get('/', **headers)).data
+
+        self.assertEqual(budget(), 25)
+        self.assertEqual(budget(HTTP_X_REQUEST_TIMEOUT='5'), 5)
+        self.assertEqual(budget(HTTP_X_REQUEST_TIMEOUT='500'), 25)
+        self.assertEqual(budget(HTTP_X_REQUEST_TIMEOUT='soon'), 25)
+
+    @fake_ai
+    def test_models_the_budget_cannot_cover_are_skipped(self):
+        from studybuddy.ai_service import GeminiAIService
+
+        service = GeminiAIService()
+        slow, fast = service.model_names[:2]
+        for _ in range(10):
+            service.breaker.record_success(fast, 60.0)
+            service.breaker.record_success(slow, 30.0, under_deadline=True)
+
+        with deadline(5):
+            _, model_name = service._generate_with_fallback('Generate notes about cells')
+
+        self.assertEqual(model_name, fast)
+
+    def test_deadline_latency_is_tracked_separately(self):
+        breaker = ModelCircuitBreaker()
+        for _ in range(10):
+            breaker.record_success('model', 30.0)
+            breaker.record_success('model', 1.0, under_deadline=True)
+
+        self.assertEqual(breaker.latency_percentile('model', 50, under_deadline=True), 1.0)
+        self.assertEqual(breaker.latency_percentile('model', 100), 30.0)
+
+
+@override_settings(AI_SPECULATIVE_DRAFTS=True)
+class GenerationDraftTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        self.note = Note.objects.create(user=self.user, title='Cells', content='# Nucleus\n\nThe nucleus stores DNA.')
+
+    def generate_drafts(self):
+        question = {
+            'question_text': 'Where is DNA kept?',
+            'explanation': '',
+            'choices': [{'text': 'Nucleus', 'is_correct': True}, {'text': 'Membrane', 'is_correct': False}],
+        }
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            ai_service.generate_quiz_questions.return_value = [question] * DRAFT_NUM_QUESTIONS
+            ai_service.generate_flashcards.return_value = [{'front_text': 'Nucleus', 'back_text': 'Stores DNA'}]
+            return generate_drafts(self.note, content_hash(self.note))
+
+    def test_a_burst_of_saves_queues_one_job(self):
+        request_drafts(self.note)
+        self.note.content += '\n\nIt has a double membrane.'
+        request_drafts(self.note)
+
+        job = GenerationJob.objects.get(operation='note_drafts')
+        self.assertEqual(job.params['content_hash'], content_hash(self.note))
+        self.assertEqual(job.priority, DRAFT_PRIORITY)
+
+    def test_drafts_are_served_once(self):
+        from quizzes.services import create_quiz_from_note
+
+        self.generate_drafts()
+
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            quiz = create_quiz_from_note(self.user, self.note)
+            ai_service.generate_quiz_questions.assert_not_called()
+        self.assertEqual(quiz.questions.count(), DRAFT_NUM_QUESTIONS)
+        self.assertIsNone(take_draft(self.note, 'quiz', DRAFT_NUM_QUESTIONS, 'medium'))
+        self.assertIsNotNone(take_draft(self.note, 'flashcards', 10))
+
+    def test_drafts_for_other_settings_are_not_served(self):
+        self.generate_drafts()
+
+        self.assertIsNone(take_draft(self.note, 'quiz', 3, 'medium'))
+        self.assertIsNone(take_draft(self.note, 'quiz', DRAFT_NUM_QUESTIONS, 'hard'))
+
+    def test_edits_make_drafts_stale(self):
+        self.generate_drafts()
+        self.note.content += '\n\nIt has a double membrane.'
+        self.note.save()
+
+        self.assertIsNone(take_draft(self.note, 'quiz', DRAFT_NUM_QUESTIONS, 'medium'))
+        self.generate_drafts()
+        self.assertEqual(set(GenerationDraft.objects.values_list('content_hash', flat=True)), {content_hash(self.note)})
+
+    def test_notes_edited_after_queueing_are_skipped(self):
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            self.assertEqual(generate_drafts(self.note, 'outdated hash'), [])
+            ai_service.generate_quiz_questions.assert_not_called()
+
@@ -0,0 +1,118 @@
+"""
+Text helpers for sizing and splitting note content before it is sent to the model
+"""
+import hashlib
+import re
+
+# Rough average for English prose with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+_HEADING = re.compile(r'^(?=#{1,6}\s)', re.MULTILINE)
+_NON_WORD = re.compile(r'\W+')
+_HTML_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+_IMAGE = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+_LINK = re.compile(r'\[([^\]]+)\]\((?:https?://|/)[^)]*\)')
+_RULE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$', re.MULTILINE)
+_INVISIBLE = re.compile('[\u200b\u200c\u200d\u2060\ufeff\xad]')
+_INNER_SPACES = re.compile(r'(?<=\S)[ \t]{2,}')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def estimate_tokens(text):
+    """Cheap local token estimate; avoids a count_tokens round-trip"""
+    return (len(text or '') + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_sections(content):
+    """Split markdown into sections, each starting at a heading"""
+    return [section for section in _HEADING.split(content or '') if section.strip()]
+
+
+def _split_oversized(section, max_chars):
+    """Break a section that alone exceeds the budget on paragraphs, then hard cuts"""
+    pieces = []
+    current = ''
+    for paragraph in section.split('\n\n'):
+        while len(paragraph) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            pieces.append(current)
+            current = ''
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_content(content, max_tokens):
+    """
+    Split content into chunks of at most max_tokens, keeping markdown
+    sections together where possible
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = ''
+    for section in split_sections(content):
+        for piece in (_split_oversized(section, max_chars) if len(section) > max_chars else [section]):
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current.strip())
+                current = ''
+            current += piece if not current else '\n' + piece
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+
+def compact_text(text):
+    """
+    Strip markup and whitespace that cost prompt tokens without carrying
+    content: HTML comments, images, link targets, horizontal rules,
+    invisible characters, runs of spaces and blank lines. Indentation
+    and headings are kept so the markdown structure survives.
+    """
+    text = (text or '').replace('\r\n', '\n').replace('\r', '\n')
+    text = _HTML_COMMENT.sub('', text)
+    text = _IMAGE.sub('', text)
+    text = _LINK.sub(r'\1', text)
+    text = _RULE.sub('', text)
+    text = _INVISIBLE.sub('', text)
+    text = '\n'.join(_INNER_SPACES.sub(' ', line.rstrip()) for line in text.split('\n'))
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+def normalize_text(text):
+    """Lowercased, punctuation-free form of text used to spot duplicate items"""
+    return _NON_WORD.sub(' ', (text or '').lower()).strip()
+
+
+def section_fingerprint(section):
+    """Hash of a section's normalized text; whitespace and punctuation edits keep the fingerprint"""
+    return hashlib.sha256(normalize_text(section).encode('utf-8')).hexdigest()
+
+
+def _significant_words(text):
+    return {word for word in normalize_text(text).split() if len(word) > 3}
+
+
+def section_index(content):
+    """(fingerprint, text, significant words) for each markdown section of content"""
+    return [
+        (section_fingerprint(section), section, _significant_words(section))
+        for section in split_sections(content)
+    ]
+
+
+def match_section(text, index):
+    """
+    Fingerprint of the indexed section sharing the most words with a
+    generated item's text (the earliest section on a tie), or '' when
+    the index is empty
+    """
+    if not index:
+        return ''
+    words = _significant_words(text)
+    return max(index, key=lambda entry: len(words & entry[2]))[0]
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('status/', views.ai_status, name='ai-status'),
+    path('metrics/', views.ai_metrics, name='ai-metrics'),
+    path('study-pack/', views.generate_study_pack, name='generate-study-pack'),
+    path('jobs/', views.GenerationJobListView.as_view(), name='generation-job-list'),
+    path('jobs/<int:pk>/', views.GenerationJobDetailView.as_view(), name='generation-job-detail'),
+]
@@ -0,0 +1,73 @@
+"""
+Helpers shared by the AI generation endpoints
+"""
+import json
+import logging
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+def request_flag(request, name, default=False):
+    """Read a boolean flag from the request body or the query string"""
+    value = request.data.get(name, request.query_params.get(name, default))
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def request_count(request, name, default):
+    """Positive item count from the request body, or None when it is not a whole number"""
+    value = request.data.get(name, default)
+    if isinstance(value, bool):
+        return None
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        return None
+    return count if count > 0 else None
+
+
+def item_count(value, limit):
+    """Requested number of questions or cards as an int trimmed to 1..limit"""
+    count = int(value)
+    if count > limit:
+        logger.info(f"Trimming requested item count from {count} to {limit}")
+    return max(1, min(count, limit))
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n"
+
+
+def sse_response(events):
+    """Wrap an iterator of SSE messages in an unbuffered streaming response"""
+    from django.http import StreamingHttpResponse
+
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx-style proxies from buffering the stream
+    return response
+
+
+def sse_item_stream(items, item_event, serialize_item, serialize_done):
+    """SSE messages for each item as it is saved, then a `done` (or `error`) event"""
+    try:
+        for item in items:
+            yield sse_event(item_event, serialize_item(item))
+        yield sse_event('done', serialize_done())
+    except Exception as e:
+        yield sse_event('error', {'error': str(e)})
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets SSE clients send `Accept: text/event-stream`; plain responses become one `error` event"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event('error', data).encode(self.charset)
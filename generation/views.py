@@ -0,0 +1,138 @@
+from rest_framework import generics, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from .models import GenerationJob
+from .serializers import GenerationJobSerializer
+from .jobs import enqueue_job
+from .deadline import DeadlineExceeded, deadline_response, with_deadline
+from .idempotency import idempotent
+from .services import create_study_pack
+from .utils import request_count, request_flag
+
+
+def enqueue_response(request, operation, params):
+    """Queue a generation job and return 202 with its id for polling"""
+    job = enqueue_job(request.user, operation, params)
+    return Response(GenerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class GenerationJobListView(generics.ListAPIView):
+    """List AI generation jobs for the authenticated user"""
+    serializer_class = GenerationJobSerializer
+    permission_classes = [IsAuthenticated]
+    filterset_fields = ['status', 'operation']
+
+    def get_queryset(self):
+        return GenerationJob.objects.filter(user=self.request.user)
+
+
+class GenerationJobDetailView(generics.RetrieveAPIView):
+    """Poll the status, progress and result of an AI generation job"""
+    serializer_class = GenerationJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return GenerationJob.objects.filter(user=self.request.user)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def ai_status(request):
+    """Get AI service cache, model health, hedging and parsing statistics (staff only)"""
+    from studybuddy.ai_service import ai_service
+
+    return Response({
+        'cache': ai_service.cache.stats(),
+        'models': ai_service.breaker.snapshot(),
+        'hedging': ai_service.hedge_budget.snapshot(),
+        'parsing': ai_service.parse_stats.snapshot(),
+    })
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def ai_metrics(request):
+    """
+    Get per-call AI metrics for this process (staff only)
+
+    Latency, time to first token, prompt and response token histograms
+    per operation and model, plus parse outcomes and cache hit counts.
+    DELETE resets the counters.
+    """
+    from studybuddy.ai_service import ai_service
+
+    if request.method == 'DELETE':
+        ai_service.metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    return Response(ai_service.metrics.snapshot())
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+@with_deadline
+def generate_study_pack(request):
+    """
+    Generate notes, a quiz and flashcards on a topic with one AI call
+    (pass async=true to queue a job and poll it)
+    """
+    from notes.serializers import NoteSerializer
+    from quizzes.serializers import QuizSerializer
+    from flashcards.serializers import FlashcardSetSerializer
+
+    topic = request.data.get('topic')
+    description = request.data.get('description', '')
+    guidelines = request.data.get('guidelines', '')
+    subject_name = request.data.get('subject', '') or request.data.get('subject_name', '')
+    difficulty = request.data.get('difficulty', 'medium')
+    num_questions = request_count(request, 'num_questions', 5)
+    num_cards = request_count(request, 'num_cards', 10)
+    use_cache = request_flag(request, 'use_cache', default=True)
+
+    if not topic:
+        return Response({'error': 'Topic is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if num_questions is None:
+        return Response({'error': 'num_questions must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if num_cards is None:
+        return Response({'error': 'num_cards must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request_flag(request, 'async'):
+        return enqueue_response(request, 'study_pack', {
+            'topic': topic,
+            'description': description,
+            'guidelines': guidelines,
+            'subject_name': subject_name,
+            'difficulty': difficulty,
+            'num_questions': num_questions,
+            'num_cards': num_cards,
+            'use_cache': use_cache,
+        })
+
+    try:
+        note, quiz, flashcard_set = create_study_pack(
+            request.user, topic,
+            description=description,
+            guidelines=guidelines,
+            subject_name=subject_name,
+            difficulty=difficulty,
+            num_questions=num_questions,
+            num_cards=num_cards,
+            use_cache=use_cache
+        )
+        return Response({
+            'note': NoteSerializer(note).data,
+            'quiz': QuizSerializer(quiz).data,
+            'flashcard_set': FlashcardSetSerializer(flashcard_set).data,
+        }, status=status.HTTP_201_CREATED)
+
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to generate study pack: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
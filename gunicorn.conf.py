@@ -0,0 +1,17 @@
+"""
+Gunicorn configuration, picked up automatically from the working directory
+"""
+
+
+def post_worker_init(worker):
+    """Runs in each worker after fork, once the Django app is loaded"""
+    from django.conf import settings
+
+    if not settings.AI_WARM_UP:
+        return
+    try:
+        from studybuddy.ai_service import warm_up
+        warm_up()
+    except Exception as e:
+        # A missing or invalid key should not stop the worker serving other endpoints
+        worker.log.warning(f"AI service warm-up failed in worker {worker.pid}: {e}")
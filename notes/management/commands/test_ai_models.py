@@ -1,11 +1,28 @@
+import json
+
 from django.core.management.base import BaseCommand
 from studybuddy.ai_service import ai_service
+from generation.benchmark import KINDS, benchmark_models
 
 
 class Command(BaseCommand):
-    help = 'Test which Gemini AI models are available and working'
+    help = ('Test which Gemini AI models are available and working. '
+            'With --benchmark, measure latency and output quality per model '
+            '(set AI_PROVIDER=fake to run without an API key)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--benchmark', action='store_true',
+                            help='Benchmark each model with representative prompts')
+        parser.add_argument('--samples', type=int, default=5, help='Calls per model and prompt kind')
+        parser.add_argument('--concurrency', type=int, default=8, help='Model calls in flight at once')
+        parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+        parser.add_argument('--models', nargs='+', help='Models to benchmark (default: all configured)')
+        parser.add_argument('--output', help='Write the benchmark results as JSON to this file')
 
     def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark(options)
+
         self.stdout.write(self.style.SUCCESS('Testing Gemini AI models...'))
         
         try:
@@ -53,3 +70,40 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR(f'Error testing models: {e}')
             )
+
+    def benchmark(self, options):
+        self.stdout.write(self.style.SUCCESS(
+            f"Benchmarking models with the {ai_service.provider.name} provider: "
+            f"{options['samples']} samples per kind, concurrency {options['concurrency']}"
+        ))
+        report = benchmark_models(
+            ai_service,
+            model_names=options['models'],
+            kinds=options['kinds'],
+            samples=options['samples'],
+            concurrency=options['concurrency']
+        )
+
+        self.stdout.write(
+            f"\n{'model':<24}{'p50':>8}{'p95':>8}{'tok/s':>8}{'parsed':>8}{'salvaged':>10}{'errors':>8}"
+        )
+        for model_name, summary in report['models'].items():
+            self.stdout.write(
+                f"{model_name:<24}"
+                f"{self.seconds(summary['latency_p50']):>8}"
+                f"{self.seconds(summary['latency_p95']):>8}"
+                f"{summary['tokens_per_second'] or '-':>8}"
+                f"{summary['parse_success_rate']:>8.0%}"
+                f"{summary['salvage_rate']:>10.0%}"
+                f"{summary['errors']:>8}"
+            )
+        self.stdout.write(f"\nSuggested model order: {', '.join(report['suggested_model_order'])}")
+        self.stdout.write(f"Finished in {report['elapsed']}s")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+
+    def seconds(self, value):
+        return '-' if value is None else f'{value:.2f}s'
@@ -0,0 +1,58 @@
+"""
+AI note generation shared by the note views and background generation jobs
+"""
+from .models import Note, Subject
+from generation.coalesce import coalesce_key, single_flight
+
+
+def create_ai_note(user, topic, description='', guidelines='', subject_name='', difficulty='medium',
+                   use_cache=True, progress=None):
+    """
+    Generate study notes about a topic with AI and save them as a new note
+
+    Identical concurrent requests share one generation and receive the same note.
+    """
+    key = coalesce_key(user, 'notes', topic, description, guidelines, subject_name, difficulty, use_cache)
+    note_id = single_flight(key, lambda: _create_ai_note(
+        user, topic, description, guidelines, subject_name, difficulty, use_cache, progress
+    ).id)
+    return Note.objects.get(id=note_id)
+
+
+def _create_ai_note(user, topic, description='', guidelines='', subject_name='', difficulty='medium',
+                   use_cache=True, progress=None):
+    """Generate study notes about a topic with AI and save them as a new note"""
+    from studybuddy.ai_service import ai_service
+
+    # Generate notes content using AI
+    notes_content = ai_service.generate_notes(
+        topic=topic,
+        description=description,
+        guidelines=guidelines,
+        use_cache=use_cache
+    )
+
+    if progress:
+        progress(80, 'Saving note')
+
+    return save_ai_note(user, topic, notes_content, subject_name=subject_name, difficulty=difficulty)
+
+
+def save_ai_note(user, topic, notes_content, subject_name='', difficulty='medium'):
+    """Save AI-generated markdown as a new note"""
+    # Get or create subject if provided
+    subject = None
+    if subject_name.strip():
+        subject, created = Subject.objects.get_or_create(
+            name=subject_name.strip(),
+            defaults={'description': f'Subject for {subject_name.strip()}'}
+        )
+
+    # Create the note
+    return Note.objects.create(
+        title=f"AI Generated Notes: {topic}",
+        content=notes_content,
+        user=user,
+        subject=subject,
+        difficulty=difficulty
+    )
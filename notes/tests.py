@@ -1,3 +1,45 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from unittest import mock
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Note
+
+
+class NoteStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stream(self, chunks):
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            ai_service.stream_notes.return_value = chunks
+            response = self.client.post('/api/notes/generate-ai/stream/', {'topic': 'Cells'}, format='json')
+            return response, b''.join(response.streaming_content).decode()
+
+    def test_chunks_are_streamed_then_the_note_is_saved(self):
+        response, body = self.stream(iter(['# Cells\n\n', 'The nucleus stores DNA.']))
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertTrue(body.startswith('event: chunk\ndata: {"text": "# Cells\\n\\n"}\n\n'))
+        self.assertEqual(body.count('event: chunk'), 2)
+        self.assertIn('event: done', body)
+        self.assertEqual(Note.objects.get(user=self.user).content, '# Cells\n\nThe nucleus stores DNA.')
+
+    def test_failure_is_an_error_event_and_saves_nothing(self):
+        def chunks():
+            yield '# Cells'
+            raise ValueError('model failed')
+
+        _, body = self.stream(chunks())
+
+        self.assertIn('event: error\ndata: {"error": "Failed to generate notes: model failed"}', body)
+        self.assertNotIn('event: done', body)
+        self.assertFalse(Note.objects.exists())
+
+    def test_missing_topic_is_rejected_before_streaming(self):
+        response = self.client.post('/api/notes/generate-ai/stream/', {}, format='json')
+
+        self.assertEqual(response.status_code, 400)
@@ -9,4 +9,5 @@ urlpatterns = [
     path('tags/', views.TagListCreateView.as_view(), name='tag-list-create'),
     path('stats/', views.user_notes_stats, name='notes-stats'),
     path('generate-ai/', views.generate_notes_with_ai, name='generate-notes-ai'),
+    path('generate-ai/stream/', views.generate_notes_stream, name='generate-notes-ai-stream'),
 ]
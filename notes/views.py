@@ -1,11 +1,18 @@
 from rest_framework import generics, filters, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 from .models import Note, Subject, Tag
 from .serializers import NoteSerializer, NoteListSerializer, SubjectSerializer, TagSerializer
+from .services import create_ai_note, save_ai_note
+from generation.utils import request_flag, sse_event, sse_response, EventStreamRenderer
+from generation.views import enqueue_response
+from generation.idempotency import idempotent
+from generation.deadline import DeadlineExceeded, deadline_response, with_deadline
+from generation.drafts import content_hash, request_drafts
 
 
 class NoteListCreateView(generics.ListCreateAPIView):
@@ -25,6 +32,9 @@ class NoteListCreateView(generics.ListCreateAPIView):
             return NoteListSerializer
         return NoteSerializer
 
+    def perform_create(self, serializer):
+        request_drafts(serializer.save())
+
 
 class NoteDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a specific note"""
@@ -34,6 +44,13 @@ class NoteDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Note.objects.filter(user=self.request.user).select_related('subject').prefetch_related('tags')
 
+    def perform_update(self, serializer):
+        previous = content_hash(serializer.instance)
+        note = serializer.save()
+        # Favoriting or retagging does not change what would be generated
+        if content_hash(note) != previous:
+            request_drafts(note)
+
 
 class SubjectListCreateView(generics.ListCreateAPIView):
     """List all subjects or create a new subject"""
@@ -90,48 +107,89 @@ def user_notes_stats(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
+@with_deadline
 def generate_notes_with_ai(request):
     """Generate notes using AI based on topic and optional description/guidelines"""
-    from studybuddy.ai_service import ai_service
-
     topic = request.data.get('topic')
     description = request.data.get('description', '')
     guidelines = request.data.get('guidelines', '')
     subject_name = request.data.get('subject', '') or request.data.get('subject_name', '')
     difficulty = request.data.get('difficulty', 'medium')
+    use_cache = request_flag(request, 'use_cache', default=True)
 
     if not topic:
         return Response({'error': 'Topic is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+    if request_flag(request, 'async'):
+        return enqueue_response(request, 'notes', {
+            'topic': topic,
+            'description': description,
+            'guidelines': guidelines,
+            'subject_name': subject_name,
+            'difficulty': difficulty,
+            'use_cache': use_cache,
+        })
+
     try:
-        # Generate notes content using AI
-        notes_content = ai_service.generate_notes(
-            topic=topic,
+        note = create_ai_note(
+            request.user, topic,
             description=description,
-            guidelines=guidelines
+            guidelines=guidelines,
+            subject_name=subject_name,
+            difficulty=difficulty,
+            use_cache=use_cache
         )
-
-        # Get or create subject if provided
-        subject = None
-        if subject_name.strip():
-            subject, created = Subject.objects.get_or_create(
-                name=subject_name.strip(),
-                defaults={'description': f'Subject for {subject_name.strip()}'}
-            )
-
-        # Create the note
-        note = Note.objects.create(
-            title=f"AI Generated Notes: {topic}",
-            content=notes_content,
-            user=request.user,
-            subject=subject,
-            difficulty=difficulty
-        )
-
         return Response(NoteSerializer(note).data, status=status.HTTP_201_CREATED)
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return Response(
             {'error': f'Failed to generate notes: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def generate_notes_stream(request):
+    """
+    Stream AI-generated notes as Server-Sent Events
+
+    Emits `chunk` events with markdown text as the model produces it, then
+    a `done` event with the saved note, or an `error` event.
+    """
+    from studybuddy.ai_service import ai_service
+
+    topic = request.data.get('topic')
+    description = request.data.get('description', '')
+    guidelines = request.data.get('guidelines', '')
+    subject_name = request.data.get('subject', '') or request.data.get('subject_name', '')
+    difficulty = request.data.get('difficulty', 'medium')
+    use_cache = request_flag(request, 'use_cache', default=True)
+
+    if not topic:
+        return Response({'error': 'Topic is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    user = request.user
+
+    def event_stream():
+        chunks = []
+        try:
+            for text in ai_service.stream_notes(topic, description, guidelines, use_cache=use_cache):
+                chunks.append(text)
+                yield sse_event('chunk', {'text': text})
+
+            # Persist the note once the stream has completed
+            note = save_ai_note(
+                user, topic, ''.join(chunks).strip(),
+                subject_name=subject_name,
+                difficulty=difficulty
+            )
+            yield sse_event('done', NoteSerializer(note).data)
+        except Exception as e:
+            yield sse_event('error', {'error': f'Failed to generate notes: {str(e)}'})
+
+    return sse_response(event_stream())
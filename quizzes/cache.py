@@ -0,0 +1,38 @@
+"""
+Per-version cache of quiz questions and answer keys
+
+Quiz content rarely changes after generation, so the serialized
+questions of the detail payload and the answer key used for grading are
+cached under the quiz's content_version. Any change to a question or
+choice bumps the version (see the signal receivers in quizzes/models.py),
+which moves readers to new keys; entries for old versions are never read
+again and expire. Quiz fields and the subject are not cached, as they
+change without touching the questions.
+
+Versioned keys never go stale, so any Django cache backend is safe,
+including the default per-process local-memory cache.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Quiz
+
+
+def _cache_key(quiz_id, version, part):
+    return f"quiz:{quiz_id}:v{version}:{part}"
+
+
+def cached_content(quiz_id, version, part, build):
+    """Return the cached `part` of the quiz at `version`, building and storing it on a miss"""
+    key = _cache_key(quiz_id, version, part)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, settings.QUIZ_CONTENT_CACHE_TTL)
+    return value
+
+
+def bump_content_version(quiz_id, **fields):
+    """Move a quiz to a new content version, updating `fields` in the same query"""
+    Quiz.objects.filter(id=quiz_id).update(content_version=F('content_version') + 1, **fields)
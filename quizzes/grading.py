@@ -0,0 +1,101 @@
+"""
+Set-based grading of quiz submissions
+
+The quiz's answer key is loaded in one query, or from the per-version
+content cache for a quiz that was graded before, and every submitted
+(question_id, choice_id) pair is checked against it in memory. The
+attempt, its answers, the user's quiz summary and the stats updates are
+written in one transaction, so grading costs the same number of queries whatever the
+quiz length.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .cache import cached_content
+from .models import Choice, QuizAttempt, UserAnswer
+from .stats import add_attempt
+from analytics.utils import track_quiz_completion
+
+
+def load_answer_key(quiz):
+    """{question_id: {choice_id: is_correct}} for every question of the quiz"""
+    return cached_content(quiz.id, quiz.content_version, 'answer_key', lambda: _query_answer_key(quiz))
+
+
+def _query_answer_key(quiz):
+    key = {}
+    for choice_id, question_id, is_correct in Choice.objects.filter(
+        question__quiz=quiz, question__retired=False
+    ).values_list('id', 'question_id', 'is_correct'):
+        key.setdefault(question_id, {})[choice_id] = is_correct
+    return key
+
+
+def grade_answers(answer_key, answers):
+    """
+    Check submitted answers against the answer key
+
+    Returns [(question_id, choice_id, is_correct)] for the valid answers.
+    Pairs naming another quiz's question or a choice of another question
+    are ignored, as is any repeat answer to the same question.
+    """
+    graded = []
+    seen = set()
+    for answer in answers:
+        question_id = answer['question_id']
+        choice_id = answer['choice_id']
+        choices = answer_key.get(question_id)
+        if choices is None or choice_id not in choices or question_id in seen:
+            continue
+        seen.add(question_id)
+        graded.append((question_id, choice_id, choices[choice_id]))
+    return graded
+
+
+def _count_quiz_taken(user):
+    from accounts.models import UserProfile
+
+    updated = UserProfile.objects.filter(user=user).update(
+        total_quizzes_taken=F('total_quizzes_taken') + 1
+    )
+    if not updated:
+        UserProfile.objects.create(user=user, total_quizzes_taken=1)
+
+
+def submit_attempt(user, quiz, answers, time_taken):
+    """
+    Grade a submission and record it as a QuizAttempt with its answers
+
+    Every attempt is added to the user's quiz summary. Submissions
+    without a single valid answer are stored with a score of 0 and are
+    left out of the analytics and the profile's quiz count.
+    """
+    answer_key = load_answer_key(quiz)
+    graded = grade_answers(answer_key, answers)
+    correct_count = sum(1 for _, _, is_correct in graded if is_correct)
+
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(
+            user=user,
+            quiz=quiz,
+            total_questions=len(graded) or len(answer_key),
+            correct_answers=correct_count,
+            score=round(correct_count / len(graded) * 100, 2) if graded else 0,
+            time_taken=time_taken
+        )
+        UserAnswer.objects.bulk_create([
+            UserAnswer(
+                attempt=attempt,
+                question_id=question_id,
+                selected_choice_id=choice_id,
+                is_correct=is_correct
+            )
+            for question_id, choice_id, is_correct in graded
+        ])
+        add_attempt(user, attempt, quiz.difficulty)
+
+        if graded:
+            track_quiz_completion(user, attempt)
+            _count_quiz_taken(user)
+
+    return attempt
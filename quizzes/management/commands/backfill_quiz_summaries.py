@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from quizzes.stats import rebuild_summary
+
+
+class Command(BaseCommand):
+    help = "Rebuild every user's quiz summary from their quiz attempts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Only rebuild the summary of this user (repeatable)')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(quiz_attempts__isnull=False).distinct()
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+
+        rebuilt = 0
+        for user in users.iterator():
+            summary = rebuild_summary(user)
+            rebuilt += 1
+            self.stdout.write(f'{user.username}: {summary.attempts} attempts')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} quiz summaries'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_questionpool_pooledquestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='source_section',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='source_sections',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
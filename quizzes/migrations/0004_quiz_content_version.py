@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_question_source_section_quiz_source_sections'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='content_version',
+            field=models.IntegerField(default=1),
+        ),
+    ]
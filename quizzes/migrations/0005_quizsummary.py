@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_quiz_content_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('total_score', models.FloatField(default=0.0)),
+                ('best_score', models.FloatField(default=0.0)),
+                ('total_time', models.IntegerField(default=0)),
+                ('easy_attempts', models.IntegerField(default=0)),
+                ('easy_score', models.FloatField(default=0.0)),
+                ('medium_attempts', models.IntegerField(default=0)),
+                ('medium_score', models.FloatField(default=0.0)),
+                ('hard_attempts', models.IntegerField(default=0)),
+                ('hard_score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_quizattempt_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='retired',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from notes.models import Note, Subject
 
@@ -18,6 +21,10 @@ class Quiz(models.Model):
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default='medium')
     time_limit = models.IntegerField(default=300)  # in seconds
     total_questions = models.IntegerField(default=5)
+    # Fingerprints of the note sections the questions were generated from (see regenerate_quiz)
+    source_sections = models.JSONField(default=list, blank=True)
+    # Bumped on every change to the quiz's questions or choices; keys the cached payloads in quizzes/cache.py
+    content_version = models.IntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -27,13 +34,26 @@ class Quiz(models.Model):
         ordering = ['-created_at']
 
 
+class CurrentQuestionManager(models.Manager):
+    """Questions still part of their quiz, leaving out retired ones"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(retired=False)
+
+
 class Question(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions')
     question_text = models.TextField()
     explanation = models.TextField(blank=True)
     order = models.IntegerField(default=0)
+    source_section = models.CharField(max_length=64, blank=True)  # fingerprint of the note section it covers
+    # Replaced by regenerate_quiz but kept because past attempts answered it
+    retired = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = models.Manager()
+    current = CurrentQuestionManager()
+
     def __str__(self):
         return f"Q{self.order}: {self.question_text[:50]}..."
 
@@ -54,6 +74,39 @@ class Choice(models.Model):
         ordering = ['order']
 
 
+class QuestionPool(models.Model):
+    """Shared bank of AI-generated questions for a topic and difficulty, reused across users"""
+    topic = models.CharField(max_length=200)  # as first requested
+    topic_key = models.CharField(max_length=200)  # normalized topic used for lookups
+    difficulty = models.CharField(max_length=10, choices=Quiz.DIFFICULTY_CHOICES, default='medium')
+    requests = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.topic} ({self.difficulty})"
+
+    class Meta:
+        unique_together = ['topic_key', 'difficulty']
+
+
+class PooledQuestion(models.Model):
+    """Question template in a QuestionPool, copied into a Quiz when served"""
+    pool = models.ForeignKey(QuestionPool, on_delete=models.CASCADE, related_name='questions')
+    question_text = models.TextField()
+    text_hash = models.CharField(max_length=64)  # hash of the normalized text, to skip duplicates
+    explanation = models.TextField(blank=True)
+    choices = models.JSONField()  # [{"text": ..., "is_correct": ...}]
+    served_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.question_text[:50]
+
+    class Meta:
+        unique_together = ['pool', 'text_hash']
+
+
 class QuizAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_attempts')
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempts')
@@ -68,6 +121,29 @@ class QuizAttempt(models.Model):
 
     class Meta:
         ordering = ['-completed_at']
+        indexes = [
+            models.Index(fields=['user', '-completed_at', '-id']),  # attempt history pages
+        ]
+
+
+class QuizSummary(models.Model):
+    """Running totals of a user's quiz attempts, kept up to date by grading (see quizzes/stats.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='quiz_summary')
+    attempts = models.IntegerField(default=0)
+    total_score = models.FloatField(default=0.0)
+    best_score = models.FloatField(default=0.0)
+    total_time = models.IntegerField(default=0)  # in seconds
+    # Per quiz difficulty
+    easy_attempts = models.IntegerField(default=0)
+    easy_score = models.FloatField(default=0.0)
+    medium_attempts = models.IntegerField(default=0)
+    medium_score = models.FloatField(default=0.0)
+    hard_attempts = models.IntegerField(default=0)
+    hard_score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.attempts} attempts"
 
 
 class UserAnswer(models.Model):
@@ -81,3 +157,43 @@ class UserAnswer(models.Model):
 
     class Meta:
         unique_together = ['attempt', 'question']
+
+
+def _deleted_with(origin, model):
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def bump_quiz_version_for_question(sender, instance, origin=None, **kwargs):
+    """Invalidate the cached quiz payloads when a question changes"""
+    if _deleted_with(origin, Quiz):
+        return
+    Quiz.objects.filter(id=instance.quiz_id).update(content_version=F('content_version') + 1)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def bump_quiz_version_for_choice(sender, instance, origin=None, **kwargs):
+    """Invalidate the cached quiz payloads when a choice changes"""
+    # Deleting a question bumps the version once for all of its choices
+    if _deleted_with(origin, Quiz) or _deleted_with(origin, Question):
+        return
+    Quiz.objects.filter(questions=instance.question_id).update(content_version=F('content_version') + 1)
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def drop_quiz_summary(sender, instance, origin=None, **kwargs):
+    """Deleted attempts cannot be taken out of a running maximum; the summary is rebuilt on next read"""
+    # Deleting a quiz drops the summaries once for all of its attempts; a user's summary goes with them
+    if _deleted_with(origin, Quiz) or _deleted_with(origin, User):
+        return
+    QuizSummary.objects.filter(user_id=instance.user_id).delete()
+
+
+@receiver(pre_delete, sender=Quiz)
+def drop_quiz_summaries_for_quiz(sender, instance, origin=None, **kwargs):
+    """Drop the summaries of everyone who attempted a quiz about to be deleted with its attempts"""
+    if _deleted_with(origin, User):
+        return
+    QuizSummary.objects.filter(user__quiz_attempts__quiz=instance).delete()
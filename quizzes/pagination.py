@@ -0,0 +1,73 @@
+"""
+Keyset pagination for quiz attempt history
+
+Page-number pagination counts all of the user's attempts on every page
+and reads deep pages with a growing OFFSET. Keyset pagination instead
+orders by (completed_at, id), newest first, and starts each page right
+after the last row of the previous one, so every page costs one indexed
+query. The `next` link carries that position as an opaque cursor; there
+are no page numbers or totals.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    timestamp_field = 'completed_at'
+
+    def encode_cursor(self, item):
+        position = f"{getattr(item, self.timestamp_field).isoformat()}|{item.pk}"
+        return base64.urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            timestamp, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split('|')
+            return datetime.fromisoformat(timestamp), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        queryset = queryset.order_by(f'-{self.timestamp_field}', '-pk')
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            timestamp, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f'{self.timestamp_field}__lt': timestamp}) |
+                Q(**{self.timestamp_field: timestamp, 'pk__lt': pk})
+            )
+
+        # One extra row tells whether there is a next page
+        items = list(queryset[:self.page_size + 1])
+        self.has_next = len(items) > self.page_size
+        self.page = items[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
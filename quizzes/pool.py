@@ -0,0 +1,144 @@
+"""
+Shared question pool for topic quizzes
+
+Topic-only questions do not depend on any user data, so questions
+generated for "Photosynthesis / medium" are kept in a QuestionPool and
+copied into later quizzes on the same topic. Quizzes are served from the
+pool when it holds enough questions; the model is only called
+synchronously on a cold miss. Pools for topics that are requested
+repeatedly are topped up in the background by the generation worker.
+"""
+import hashlib
+import logging
+import random
+
+from django.conf import settings
+from django.db.models import F
+
+from generation.text import normalize_text
+from .models import QuestionPool, PooledQuestion
+
+logger = logging.getLogger(__name__)
+
+# Most recent pool questions listed in top-up prompts so the model avoids repeats
+MAX_EXCLUDED_QUESTIONS = 50
+
+
+def _topic_key(topic):
+    return normalize_text(topic)[:200]
+
+
+def _text_hash(question_text):
+    return hashlib.sha256(normalize_text(question_text).encode('utf-8')).hexdigest()
+
+
+def get_pool(topic, difficulty):
+    """Return the pool for topic and difficulty, creating it if needed"""
+    pool, created = QuestionPool.objects.get_or_create(
+        topic_key=_topic_key(topic),
+        difficulty=difficulty,
+        defaults={'topic': topic.strip()[:200]}
+    )
+    return pool
+
+
+def add_to_pool(pool, questions_data):
+    """Store generated questions in the pool, skipping ones it already holds"""
+    PooledQuestion.objects.bulk_create([
+        PooledQuestion(
+            pool=pool,
+            question_text=question_data['question_text'],
+            text_hash=_text_hash(question_data['question_text']),
+            explanation=question_data.get('explanation', ''),
+            choices=[
+                {'text': choice['text'], 'is_correct': choice['is_correct']}
+                for choice in question_data['choices']
+            ]
+        )
+        for question_data in questions_data
+    ], ignore_conflicts=True)
+
+
+def take_questions(pool, num_questions):
+    """
+    Sample num_questions from the pool, or return None if it holds too few
+
+    The least-served questions are preferred so repeat requests see
+    different quizzes. Returns question dicts in the AI response format.
+    """
+    candidates = list(pool.questions.values('id', 'served_count'))
+    if len(candidates) < num_questions:
+        return None
+
+    random.shuffle(candidates)
+    candidates.sort(key=lambda candidate: candidate['served_count'])
+    ids = [candidate['id'] for candidate in candidates[:num_questions]]
+
+    PooledQuestion.objects.filter(id__in=ids).update(served_count=F('served_count') + 1)
+    questions = list(PooledQuestion.objects.filter(id__in=ids))
+    random.shuffle(questions)
+    return [
+        {
+            'question_text': question.question_text,
+            'explanation': question.explanation,
+            'choices': question.choices,
+        }
+        for question in questions
+    ]
+
+
+def record_request(pool):
+    """Count a request for the pool's topic and schedule a top-up when it runs low"""
+    QuestionPool.objects.filter(id=pool.id).update(requests=F('requests') + 1)
+    pool.refresh_from_db(fields=['requests'])
+
+    if pool.requests < settings.AI_QUESTION_POOL_MIN_REQUESTS:
+        return
+    if pool.questions.count() >= settings.AI_QUESTION_POOL_MIN_SIZE:
+        return
+    request_top_up(pool)
+
+
+def request_top_up(pool):
+    """Queue a background top-up unless one is already pending or running"""
+    from generation.models import GenerationJob
+    from generation.jobs import enqueue_job
+
+    in_flight = GenerationJob.objects.filter(
+        operation='question_pool',
+        status__in=['pending', 'running'],
+        params__pool_id=pool.id
+    ).exists()
+    if not in_flight:
+        enqueue_job(None, 'question_pool', {'pool_id': pool.id})
+
+
+def top_up_pool(pool, progress=None):
+    """Generate questions until the pool reaches its target size; returns the number added"""
+    from studybuddy.ai_service import ai_service
+
+    target = settings.AI_QUESTION_POOL_TARGET_SIZE
+    batch_size = settings.AI_QUESTION_POOL_BATCH_SIZE
+    start = pool.questions.count()
+    size = start
+
+    while size < target:
+        existing = pool.questions.order_by('-created_at').values('question_text')[:MAX_EXCLUDED_QUESTIONS]
+        questions_data = ai_service.generate_quiz_from_topic(
+            topic=pool.topic,
+            num_questions=min(batch_size, target - size),
+            difficulty=pool.difficulty,
+            use_cache=False,
+            exclude=list(existing)
+        )
+        add_to_pool(pool, questions_data)
+
+        previous, size = size, pool.questions.count()
+        if size == previous:
+            # The model only repeated questions the pool already has
+            break
+        if progress:
+            progress(10 + 80 * (size - start) // max(target - start, 1), f'Pool has {size} questions')
+
+    logger.info(f"Topped up question pool {pool}: {start} -> {size} questions")
+    return size - start
@@ -18,7 +18,7 @@ class QuestionSerializer(serializers.ModelSerializer):
 
 
 class QuizSerializer(serializers.ModelSerializer):
-    questions = QuestionSerializer(many=True, read_only=True)
+    questions = serializers.SerializerMethodField()
     subject = SubjectSerializer(read_only=True)
     
     class Meta:
@@ -29,6 +29,11 @@ class QuizSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at']
 
+    def get_questions(self, quiz):
+        # Filtered in Python so a prefetched quiz.questions is reused
+        questions = [question for question in quiz.questions.all() if not question.retired]
+        return QuestionSerializer(questions, many=True).data
+
 
 class QuizListSerializer(serializers.ModelSerializer):
     """Simplified serializer for listing quizzes"""
@@ -99,19 +104,26 @@ class UserAnswerSerializer(serializers.ModelSerializer):
         fields = ['question', 'selected_choice', 'is_correct']
 
 
-class QuizAttemptSerializer(serializers.ModelSerializer):
-    answers = UserAnswerSerializer(many=True, read_only=True)
+class QuizAttemptListSerializer(serializers.ModelSerializer):
+    """Attempt without its answers, for history listings"""
     quiz = QuizListSerializer(read_only=True)
-    
+
     class Meta:
         model = QuizAttempt
         fields = [
-            'id', 'quiz', 'score', 'total_questions', 'correct_answers', 
-            'time_taken', 'completed_at', 'answers'
+            'id', 'quiz', 'score', 'total_questions', 'correct_answers',
+            'time_taken', 'completed_at'
         ]
         read_only_fields = ['id', 'completed_at']
 
 
+class QuizAttemptSerializer(QuizAttemptListSerializer):
+    answers = UserAnswerSerializer(many=True, read_only=True)
+
+    class Meta(QuizAttemptListSerializer.Meta):
+        fields = QuizAttemptListSerializer.Meta.fields + ['answers']
+
+
 class QuizSubmissionSerializer(serializers.Serializer):
     quiz_id = serializers.IntegerField()
     answers = serializers.ListField(
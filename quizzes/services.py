@@ -0,0 +1,352 @@
+"""
+AI quiz generation shared by the quiz views and background generation jobs
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import Quiz, Question, Choice, UserAnswer
+from .cache import bump_content_version
+from .pool import add_to_pool, get_pool, record_request, take_questions
+from generation.coalesce import coalesce_key, single_flight
+from generation.drafts import take_draft
+from generation.parsing import valid_items, validate_question
+from generation.text import match_section, section_index
+from generation.utils import item_count
+from notes.models import Subject
+
+
+def _question_source(question_data):
+    """Text used to match a generated question to the note section it covers"""
+    correct = ' '.join(choice['text'] for choice in question_data['choices'] if choice['is_correct'])
+    return f"{question_data['question_text']} {question_data.get('explanation', '')} {correct}"
+
+
+def _bulk_create_questions(quiz, questions_data, first_order=1, sections=None):
+    """
+    Save generated questions and their choices with one INSERT each;
+    sections is the note's section_index, if any
+
+    bulk_create skips the signals that bump the quiz's content version,
+    so callers adding to a quiz that may already be cached bump it.
+    """
+    questions = Question.objects.bulk_create([
+        Question(
+            quiz=quiz,
+            question_text=question_data['question_text'],
+            explanation=question_data.get('explanation', ''),
+            order=first_order + i,
+            source_section=match_section(_question_source(question_data), sections)
+        )
+        for i, question_data in enumerate(questions_data)
+    ])
+    Choice.objects.bulk_create([
+        Choice(
+            question=question,
+            choice_text=choice_data['text'],
+            is_correct=choice_data['is_correct'],
+            order=j + 1
+        )
+        for question, question_data in zip(questions, questions_data)
+        for j, choice_data in enumerate(question_data['choices'])
+    ])
+    return questions
+
+
+def build_quiz(questions_data, sections=None, **fields):
+    """
+    Save generated questions as a new quiz created with `fields`
+
+    The payload is validated before anything is written; invalid
+    questions are dropped and ValueError is raised when none is left.
+    The quiz, its questions and their choices are written in one
+    transaction with three INSERTs, however long the quiz.
+    """
+    questions_data = valid_items(questions_data, validate_question, 'questions')
+    with transaction.atomic():
+        quiz = Quiz.objects.create(total_questions=len(questions_data), **fields)
+        _bulk_create_questions(quiz, questions_data, sections=sections)
+    return quiz
+
+
+def create_quiz_from_note(user, note, num_questions=5, difficulty='medium', use_cache=True, progress=None):
+    """
+    Generate questions for a note with AI and save them as a new quiz
+
+    A speculative draft for the unchanged note is used when there is one;
+    otherwise identical concurrent requests share one generation and
+    receive the same quiz.
+    """
+    num_questions = item_count(num_questions, settings.AI_MAX_QUESTIONS)
+    questions_data = take_draft(note, 'quiz', num_questions, difficulty) if use_cache else None
+    if questions_data:
+        return save_note_quiz(user, note, questions_data, difficulty=difficulty)
+
+    key = coalesce_key(
+        user, 'quiz_from_note', note.id, note.title, note.content, num_questions, difficulty, use_cache
+    )
+    quiz_id = single_flight(key, lambda: _create_quiz_from_note(
+        user, note, num_questions, difficulty, use_cache, progress
+    ).id)
+    return Quiz.objects.get(id=quiz_id)
+
+
+def _create_quiz_from_note(user, note, num_questions=5, difficulty='medium', use_cache=True, progress=None):
+    """Generate questions for a note with AI and save them as a new quiz"""
+    from studybuddy.ai_service import ai_service
+
+    # Generate questions using AI
+    questions_data = ai_service.generate_quiz_questions(
+        note_content=note.content,
+        note_title=note.title,
+        num_questions=num_questions,
+        difficulty=difficulty,
+        use_cache=use_cache
+    )
+
+    if progress:
+        progress(80, 'Saving quiz')
+
+    return save_note_quiz(user, note, questions_data, difficulty=difficulty)
+
+
+def save_note_quiz(user, note, questions_data, difficulty='medium'):
+    """Save AI-generated questions as a new quiz on note"""
+    sections = section_index(note.content)
+    return build_quiz(
+        questions_data,
+        sections,
+        title=f"Quiz: {note.title}",
+        description=f"AI-generated quiz from note: {note.title}",
+        user=user,
+        note=note,
+        subject=note.subject,
+        difficulty=difficulty,
+        source_sections=[fingerprint for fingerprint, _, _ in sections]
+    )
+
+
+def regenerate_quiz(user, quiz, use_cache=True, progress=None):
+    """
+    Bring a note's quiz up to date after the note was edited
+
+    The note is compared section by section with the sections the quiz
+    was generated from. Questions whose source section is unchanged are
+    kept, questions from edited or removed sections are dropped, and the
+    model is only asked for replacements covering the changed sections.
+    Dropped questions that past attempts answered are retired rather than
+    deleted, so those attempts keep their answers.
+
+    Returns (quiz, {'kept': n, 'removed': n, 'added': n}). Identical
+    concurrent requests share one regeneration.
+    """
+    note = quiz.note
+    key = coalesce_key(user, 'quiz_regenerate', quiz.id, note.title, note.content, use_cache)
+    # No linger: a later request must regenerate again and report its own changes
+    changes = single_flight(key, lambda: _regenerate_quiz(quiz, use_cache, progress), linger=0)
+    quiz.refresh_from_db()
+    return quiz, changes
+
+
+def _regenerate_quiz(quiz, use_cache=True, progress=None):
+    from studybuddy.ai_service import ai_service
+
+    note = quiz.note
+    sections = section_index(note.content)
+    current = {fingerprint for fingerprint, _, _ in sections}
+    previous = set(quiz.source_sections)
+    changed = [entry for entry in sections if entry[0] not in previous]
+
+    questions = list(Question.current.filter(quiz=quiz))
+    kept = [question for question in questions if question.source_section in current]
+    removed = [question for question in questions if question.source_section not in current]
+
+    questions_data = []
+    if changed:
+        questions_data = valid_items(ai_service.generate_quiz_questions(
+            note_content='\n\n'.join(text for _, text, _ in changed),
+            note_title=note.title,
+            num_questions=max(len(removed), 1),
+            difficulty=quiz.difficulty,
+            use_cache=use_cache
+        ), validate_question, 'questions')
+
+    if progress:
+        progress(80, 'Saving quiz')
+
+    with transaction.atomic():
+        # Questions answered in past attempts are retired so those attempts keep their answers
+        removed_ids = [question.id for question in removed]
+        answered = set(UserAnswer.objects.filter(question_id__in=removed_ids).values_list('question_id', flat=True))
+        Question.objects.filter(id__in=answered).update(retired=True)
+        Question.objects.filter(id__in=removed_ids).exclude(id__in=answered).delete()
+        for order, question in enumerate(kept, 1):
+            question.order = order
+        Question.objects.bulk_update(kept, ['order'])
+        _bulk_create_questions(quiz, questions_data, len(kept) + 1, changed)
+
+        bump_content_version(
+            quiz.id,
+            total_questions=len(kept) + len(questions_data),
+            source_sections=[fingerprint for fingerprint, _, _ in sections]
+        )
+
+    return {'kept': len(kept), 'removed': len(removed), 'added': len(questions_data)}
+
+
+def _get_subject(subject_name):
+    """Get or create the subject named subject_name, or None if it is blank"""
+    if not subject_name.strip():
+        return None
+    subject, created = Subject.objects.get_or_create(
+        name=subject_name.strip(),
+        defaults={'description': f'Subject for {subject_name.strip()}'}
+    )
+    return subject
+
+
+def _topic_pool(topic, difficulty, use_cache):
+    """Question pool for a topic request, or None when pooling is off or fresh questions were asked for"""
+    if not (use_cache and settings.AI_QUESTION_POOL_ENABLED):
+        return None
+    pool = get_pool(topic, difficulty)
+    record_request(pool)
+    return pool
+
+
+def _save_topic_quiz(user, topic, difficulty, subject_name, questions_data):
+    return build_quiz(
+        questions_data,
+        title=f"Quiz: {topic}",
+        description=f"AI-generated quiz about {topic}",
+        user=user,
+        subject=_get_subject(subject_name),
+        difficulty=difficulty
+    )
+
+
+def create_quiz_from_topic(user, topic, num_questions=5, difficulty='medium', subject_name='',
+                           use_cache=True, progress=None):
+    """
+    Generate questions about a topic with AI and save them as a new quiz
+
+    Questions are sampled from the shared topic pool when it holds enough;
+    otherwise identical concurrent requests share one generation and
+    receive the same quiz.
+    """
+    num_questions = item_count(num_questions, settings.AI_MAX_QUESTIONS)
+    pool = _topic_pool(topic, difficulty, use_cache)
+    if pool:
+        questions_data = take_questions(pool, num_questions)
+        if questions_data:
+            return _save_topic_quiz(user, topic, difficulty, subject_name, questions_data)
+
+    key = coalesce_key(user, 'quiz_from_topic', topic, num_questions, difficulty, subject_name, use_cache)
+    quiz_id = single_flight(key, lambda: _create_quiz_from_topic(
+        user, topic, num_questions, difficulty, subject_name, use_cache, progress, pool
+    ).id)
+    return Quiz.objects.get(id=quiz_id)
+
+
+def _create_quiz_from_topic(user, topic, num_questions=5, difficulty='medium', subject_name='',
+                           use_cache=True, progress=None, pool=None):
+    """Generate questions about a topic with AI and save them as a new quiz"""
+    from studybuddy.ai_service import ai_service
+
+    # Generate questions using AI
+    questions_data = ai_service.generate_quiz_from_topic(
+        topic=topic,
+        num_questions=num_questions,
+        difficulty=difficulty,
+        use_cache=use_cache
+    )
+
+    if progress:
+        progress(80, 'Saving quiz')
+
+    if pool:
+        add_to_pool(pool, questions_data)
+
+    return _save_topic_quiz(user, topic, difficulty, subject_name, questions_data)
+
+
+def _save_streamed_questions(quiz, questions_data, sections=None):
+    """Save each streamed question as soon as it arrives and yield it"""
+    saved = 0
+    try:
+        for question_data in questions_data:
+            saved += 1
+            with transaction.atomic():
+                question, = _bulk_create_questions(quiz, [question_data], saved, sections)
+                bump_content_version(quiz.id)
+            yield question
+    finally:
+        if saved:
+            bump_content_version(quiz.id, total_questions=saved)
+            quiz.total_questions = saved
+        else:
+            quiz.delete()
+
+
+def stream_quiz_from_note(user, note, num_questions=5, difficulty='medium', use_cache=True):
+    """
+    Streaming variant of create_quiz_from_note
+
+    Returns the new quiz and a generator that saves and yields each
+    Question as the model produces it. The quiz is removed again if no
+    question arrives.
+    """
+    from studybuddy.ai_service import ai_service
+
+    num_questions = item_count(num_questions, settings.AI_MAX_QUESTIONS)
+
+    # Resolve the questions first so a failing lookup leaves no empty quiz behind
+    questions_data = take_draft(note, 'quiz', num_questions, difficulty) if use_cache else None
+    if questions_data is None:
+        questions_data = ai_service.stream_quiz_questions(
+            note_content=note.content,
+            note_title=note.title,
+            num_questions=num_questions,
+            difficulty=difficulty,
+            use_cache=use_cache
+        )
+
+    sections = section_index(note.content)
+    quiz = Quiz.objects.create(
+        title=f"Quiz: {note.title}",
+        description=f"AI-generated quiz from note: {note.title}",
+        user=user,
+        note=note,
+        subject=note.subject,
+        difficulty=difficulty,
+        total_questions=0,
+        source_sections=[fingerprint for fingerprint, _, _ in sections]
+    )
+    return quiz, _save_streamed_questions(quiz, questions_data, sections)
+
+
+def stream_quiz_from_topic(user, topic, num_questions=5, difficulty='medium', subject_name='', use_cache=True):
+    """Streaming variant of create_quiz_from_topic; see stream_quiz_from_note"""
+    from studybuddy.ai_service import ai_service
+
+    num_questions = item_count(num_questions, settings.AI_MAX_QUESTIONS)
+
+    # Resolve the questions first so a failing lookup leaves no empty quiz behind
+    pool = _topic_pool(topic, difficulty, use_cache)
+    questions_data = take_questions(pool, num_questions) if pool else None
+    if questions_data is None:
+        questions_data = ai_service.stream_quiz_from_topic(
+            topic=topic,
+            num_questions=num_questions,
+            difficulty=difficulty,
+            use_cache=use_cache
+        )
+
+    quiz = Quiz.objects.create(
+        title=f"Quiz: {topic}",
+        description=f"AI-generated quiz about {topic}",
+        user=user,
+        subject=_get_subject(subject_name),
+        difficulty=difficulty,
+        total_questions=0
+    )
+    return quiz, _save_streamed_questions(quiz, questions_data)
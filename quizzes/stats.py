@@ -0,0 +1,80 @@
+"""
+Per-user quiz statistics kept in a QuizSummary row
+
+Grading adds each attempt to the user's summary with a single UPDATE, so
+quiz_stats reads one row instead of aggregating every attempt. A missing
+summary (a new user, or one dropped because attempts were deleted) is
+rebuilt from the attempts with one aggregate query.
+"""
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Greatest
+
+from .models import Quiz, QuizSummary
+
+DIFFICULTIES = [value for value, _ in Quiz.DIFFICULTY_CHOICES]
+
+
+def rebuild_summary(user):
+    """Recompute the user's summary from their attempts"""
+    aggregates = {
+        'attempts': Count('id'),
+        'total_score': Sum('score'),
+        'best_score': Max('score'),
+        'total_time': Sum('time_taken'),
+    }
+    for difficulty in DIFFICULTIES:
+        in_difficulty = Q(quiz__difficulty=difficulty)
+        aggregates[f'{difficulty}_attempts'] = Count('id', filter=in_difficulty)
+        aggregates[f'{difficulty}_score'] = Sum('score', filter=in_difficulty)
+
+    totals = user.quiz_attempts.aggregate(**aggregates)
+    summary, _ = QuizSummary.objects.update_or_create(
+        user=user,
+        defaults={field: value or 0 for field, value in totals.items()}
+    )
+    return summary
+
+
+def add_attempt(user, attempt, difficulty):
+    """Add a newly recorded attempt at a quiz of `difficulty` to the user's summary"""
+    updates = {
+        'attempts': F('attempts') + 1,
+        'total_score': F('total_score') + attempt.score,
+        'best_score': Greatest('best_score', Value(attempt.score)),
+        'total_time': F('total_time') + attempt.time_taken,
+    }
+    if difficulty in DIFFICULTIES:
+        updates[f'{difficulty}_attempts'] = F(f'{difficulty}_attempts') + 1
+        updates[f'{difficulty}_score'] = F(f'{difficulty}_score') + attempt.score
+
+    if not QuizSummary.objects.filter(user=user).update(**updates):
+        # The attempt is already saved, so the rebuild counts it
+        rebuild_summary(user)
+
+
+def get_summary(user):
+    """The user's summary, rebuilt first if there is none"""
+    try:
+        return QuizSummary.objects.get(user=user)
+    except QuizSummary.DoesNotExist:
+        return rebuild_summary(user)
+
+
+def summary_stats(summary):
+    """The aggregate part of the quiz_stats response"""
+    by_difficulty = {}
+    for difficulty in DIFFICULTIES:
+        attempts = getattr(summary, f'{difficulty}_attempts')
+        if attempts:
+            by_difficulty[difficulty] = {
+                'count': attempts,
+                'average_score': round(getattr(summary, f'{difficulty}_score') / attempts, 2)
+            }
+
+    return {
+        'total_quizzes_taken': summary.attempts,
+        'average_score': summary.total_score / summary.attempts if summary.attempts else 0,
+        'best_score': summary.best_score,
+        'total_time_spent': summary.total_time,
+        'quizzes_by_difficulty': by_difficulty,
+    }
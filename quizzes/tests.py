@@ -1,3 +1,525 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from unittest import mock
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Quiz, Question, Choice, QuizAttempt, QuizSummary
+from .pool import add_to_pool, get_pool, record_request, take_questions, top_up_pool
+from .services import build_quiz, create_quiz_from_topic, regenerate_quiz, save_note_quiz
+from generation.models import GenerationJob
+from notes.models import Note, Subject
+
+
+class SubmitQuizTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_quiz(self, num_questions):
+        quiz = Quiz.objects.create(title='Quiz', user=self.user, total_questions=num_questions)
+        answers = []
+        for i in range(num_questions):
+            question = Question.objects.create(quiz=quiz, question_text=f'Question {i}', order=i + 1)
+            correct = Choice.objects.create(question=question, choice_text='Right', is_correct=True, order=1)
+            wrong = Choice.objects.create(question=question, choice_text='Wrong', is_correct=False, order=2)
+            # Every other answer is wrong
+            answers.append({'question_id': question.id, 'choice_id': (correct if i % 2 == 0 else wrong).id})
+        return quiz, answers
+
+    def submit(self, quiz, answers):
+        return self.client.post('/api/quizzes/submit/', {
+            'quiz_id': quiz.id,
+            'answers': answers,
+            'time_taken': 120,
+        }, format='json')
+
+    def test_grades_answers(self):
+        quiz, answers = self.make_quiz(4)
+
+        response = self.submit(quiz, answers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['correct_answers'], 2)
+        self.assertEqual(response.data['total_questions'], 4)
+        self.assertEqual(response.data['score'], 50.0)
+        self.assertEqual(len(response.data['answers']), 4)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.total_quizzes_taken, 1)
+
+    def test_ignores_invalid_and_repeated_answers(self):
+        quiz, answers = self.make_quiz(2)
+        other_quiz, other_answers = self.make_quiz(1)
+        answers += [
+            answers[0],  # repeat
+            other_answers[0],  # question from another quiz
+            {'question_id': answers[0]['question_id'], 'choice_id': other_answers[0]['choice_id']},
+        ]
+
+        response = self.submit(quiz, answers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_questions'], 2)
+        self.assertEqual(response.data['correct_answers'], 1)
+
+    def test_no_valid_answers_scores_zero(self):
+        quiz, _ = self.make_quiz(3)
+
+        response = self.submit(quiz, [{'question_id': 0, 'choice_id': 0}])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['score'], 0)
+        self.assertEqual(response.data['total_questions'], 3)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.total_quizzes_taken, 0)
+
+    def test_query_count_does_not_grow_with_quiz_length(self):
+        # The first attempt of the day also creates the analytics rows
+        self.submit(*self.make_quiz(1))
+
+        counts = []
+        for num_questions in (5, 50):
+            quiz, answers = self.make_quiz(num_questions)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.submit(quiz, answers)
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(QuizAttempt.objects.filter(user=self.user).count(), 3)
+
+
+class QuizContentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.quiz = Quiz.objects.create(title='Quiz', user=self.user, total_questions=1)
+        self.question = Question.objects.create(quiz=self.quiz, question_text='Question', order=1)
+        self.choice = Choice.objects.create(question=self.question, choice_text='Right', is_correct=True, order=1)
+
+    def test_detail_is_served_from_cache(self):
+        self.client.get(f'/api/quizzes/{self.quiz.id}/')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/quizzes/{self.quiz.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['questions'][0]['question_text'], 'Question')
+        self.assertEqual(len(queries), 1)
+
+    def test_content_changes_invalidate_cache(self):
+        self.client.get(f'/api/quizzes/{self.quiz.id}/')
+
+        self.choice.choice_text = 'Edited'
+        self.choice.save()
+        Question.objects.create(quiz=self.quiz, question_text='Another', order=2)
+        response = self.client.get(f'/api/quizzes/{self.quiz.id}/')
+
+        self.assertEqual(response.data['questions'][0]['choices'][0]['choice_text'], 'Edited')
+        self.assertEqual(len(response.data['questions']), 2)
+
+    def test_quiz_fields_and_subject_are_not_cached(self):
+        subject = Subject.objects.create(name='Bio')
+        self.quiz.subject = subject
+        self.quiz.save()
+        self.client.get(f'/api/quizzes/{self.quiz.id}/')
+
+        subject.name = 'Biology'
+        subject.save()
+        Quiz.objects.filter(id=self.quiz.id).update(title='Renamed')
+        response = self.client.get(f'/api/quizzes/{self.quiz.id}/')
+
+        self.assertEqual(response.data['subject']['name'], 'Biology')
+        self.assertEqual(response.data['title'], 'Renamed')
+        self.assertEqual(len(response.data['questions']), 1)
+
+    def test_other_users_quiz_is_not_served(self):
+        self.client.get(f'/api/quizzes/{self.quiz.id}/')
+        other = User.objects.create_user(username='other', password='password')
+        self.client.force_authenticate(other)
+
+        response = self.client.get(f'/api/quizzes/{self.quiz.id}/')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class BuildQuizTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+
+    def questions_data(self, count):
+        return [
+            {
+                'question_text': f'Question {i}',
+                'explanation': '',
+                'choices': [{'text': 'Right', 'is_correct': True}, {'text': 'Wrong', 'is_correct': False}],
+            }
+            for i in range(count)
+        ]
+
+    def test_query_count_does_not_grow_with_quiz_length(self):
+        counts = []
+        for count in (5, 30):
+            with CaptureQueriesContext(connection) as queries:
+                quiz = build_quiz(self.questions_data(count), title='Quiz', user=self.user)
+            counts.append(len(queries))
+            self.assertEqual(quiz.questions.count(), count)
+            self.assertEqual(Choice.objects.filter(question__quiz=quiz).count(), count * 2)
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_invalid_questions_are_dropped(self):
+        questions_data = self.questions_data(2) + [{'question_text': 'No choices', 'choices': []}]
+
+        quiz = build_quiz(questions_data, title='Quiz', user=self.user)
+
+        self.assertEqual(quiz.total_questions, 2)
+        self.assertEqual(list(quiz.questions.values_list('order', flat=True)), [1, 2])
+
+    def test_payload_without_valid_questions_saves_nothing(self):
+        with self.assertRaises(ValueError):
+            build_quiz([{'question_text': 'No choices', 'choices': []}], title='Quiz', user=self.user)
+
+        self.assertFalse(Quiz.objects.exists())
+
+
+class QuizStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def take_quiz(self, difficulty, correct):
+        quiz = Quiz.objects.create(title=difficulty, user=self.user, difficulty=difficulty, total_questions=1)
+        question = Question.objects.create(quiz=quiz, question_text='Question', order=1)
+        choice = Choice.objects.create(question=question, choice_text='Choice', is_correct=correct, order=1)
+        self.client.post('/api/quizzes/submit/', {
+            'quiz_id': quiz.id,
+            'answers': [{'question_id': question.id, 'choice_id': choice.id}],
+            'time_taken': 60,
+        }, format='json')
+        return quiz
+
+    def test_stats_follow_graded_attempts(self):
+        self.take_quiz('easy', True)
+        self.take_quiz('easy', False)
+        self.take_quiz('hard', True)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/quizzes/stats/')
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(response.data['total_quizzes_taken'], 3)
+        self.assertAlmostEqual(response.data['average_score'], 200 / 3)
+        self.assertEqual(response.data['best_score'], 100)
+        self.assertEqual(response.data['total_time_spent'], 180)
+        self.assertEqual(response.data['quizzes_by_difficulty'], {
+            'easy': {'count': 2, 'average_score': 50.0},
+            'hard': {'count': 1, 'average_score': 100.0},
+        })
+        self.assertEqual(len(response.data['recent_attempts']), 3)
+
+    def test_deleting_attempts_rebuilds_summary(self):
+        best = self.take_quiz('medium', True)
+        self.take_quiz('medium', False)
+
+        best.delete()
+        response = self.client.get('/api/quizzes/stats/')
+
+        self.assertEqual(response.data['total_quizzes_taken'], 1)
+        self.assertEqual(response.data['best_score'], 0)
+        self.assertEqual(QuizSummary.objects.get(user=self.user).attempts, 1)
+
+    def test_deleting_one_attempt_rebuilds_summary(self):
+        quiz = self.take_quiz('easy', True)
+        self.take_quiz('easy', False)
+
+        QuizAttempt.objects.get(quiz=quiz).delete()
+        response = self.client.get('/api/quizzes/stats/')
+
+        self.assertEqual(response.data['total_quizzes_taken'], 1)
+        self.assertEqual(response.data['best_score'], 0)
+
+
+class QuizAttemptListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.quiz = Quiz.objects.create(title='Quiz', user=self.user, total_questions=1)
+        question = Question.objects.create(quiz=self.quiz, question_text='Question', order=1)
+        self.choice = Choice.objects.create(question=question, choice_text='Right', is_correct=True, order=1)
+        self.question = question
+
+    def add_attempts(self, count):
+        for _ in range(count):
+            attempt = QuizAttempt.objects.create(
+                user=self.user, quiz=self.quiz, score=100, total_questions=1, correct_answers=1, time_taken=30
+            )
+            attempt.answers.create(question=self.question, selected_choice=self.choice, is_correct=True)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_answers_are_opt_in(self):
+        self.add_attempts(1)
+
+        response = self.client.get('/api/quizzes/attempts/')
+        self.assertNotIn('answers', response.data['results'][0])
+
+        response = self.client.get('/api/quizzes/attempts/?include=answers')
+        self.assertEqual(len(response.data['results'][0]['answers']), 1)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for url in ('/api/quizzes/attempts/?include=answers',
+                    '/api/quizzes/attempts/?pagination=cursor&include=answers'):
+            self.add_attempts(2)
+            few, _ = self.count_queries(url)
+            self.add_attempts(10)
+            many, _ = self.count_queries(url)
+            self.assertEqual(few, many)
+
+    def test_cursor_pagination_visits_every_attempt_once(self):
+        self.add_attempts(45)
+
+        seen = []
+        url = '/api/quizzes/attempts/?pagination=cursor'
+        while url:
+            response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            seen += [attempt['id'] for attempt in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_cursor_pagination_rejects_ordering(self):
+        self.add_attempts(1)
+
+        response = self.client.get('/api/quizzes/attempts/?pagination=cursor&ordering=score')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.data)
+        self.assertEqual(self.client.get('/api/quizzes/attempts/?ordering=score').status_code, 200)
+
+    def test_cursor_pagination_breaks_timestamp_ties_on_id(self):
+        self.add_attempts(25)
+        QuizAttempt.objects.update(completed_at=timezone.now())
+
+        first = self.client.get('/api/quizzes/attempts/?pagination=cursor')
+        second = self.client.get(first.data['next'])
+
+        seen = [attempt['id'] for attempt in first.data['results'] + second.data['results']]
+        self.assertEqual(seen, sorted(QuizAttempt.objects.values_list('id', flat=True), reverse=True))
+        self.assertIsNone(second.data['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/quizzes/attempts/?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class RegenerateQuizTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.note = Note.objects.create(
+            user=self.user, title='Cells',
+            content='# Nucleus\n\nThe nucleus stores genetic material.\n\n# Membrane\n\nThe membrane controls transport.'
+        )
+        self.quiz = save_note_quiz(self.user, self.note, [
+            self.question_data('What does the nucleus store?', 'genetic material'),
+            self.question_data('What does the membrane control?', 'transport'),
+        ])
+
+    def question_data(self, text, answer):
+        return {
+            'question_text': text,
+            'explanation': '',
+            'choices': [{'text': answer, 'is_correct': True}, {'text': 'nothing', 'is_correct': False}],
+        }
+
+    def regenerate(self):
+        self.note.content = self.note.content.replace('genetic material', 'DNA')
+        self.note.save()
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            ai_service.generate_quiz_questions.return_value = [self.question_data('Where is DNA kept?', 'nucleus')]
+            return regenerate_quiz(self.user, Quiz.objects.get(id=self.quiz.id), use_cache=False)
+
+    def test_answered_questions_are_retired(self):
+        nucleus_question = self.quiz.questions.get(order=1)
+        attempt = QuizAttempt.objects.create(
+            user=self.user, quiz=self.quiz, score=100, total_questions=1, correct_answers=1, time_taken=30
+        )
+        attempt.answers.create(question=nucleus_question, selected_choice=nucleus_question.choices.first(),
+                               is_correct=True)
+
+        quiz, changes = self.regenerate()
+
+        self.assertEqual(changes, {'kept': 1, 'removed': 1, 'added': 1})
+        self.assertEqual(attempt.answers.count(), 1)
+        self.assertTrue(Question.objects.get(id=nucleus_question.id).retired)
+        self.assertEqual([question.question_text for question in Question.current.filter(quiz=quiz)],
+                         ['What does the membrane control?', 'Where is DNA kept?'])
+        self.assertEqual(quiz.total_questions, 2)
+
+    def test_unanswered_questions_are_deleted(self):
+        nucleus_question = self.quiz.questions.get(order=1)
+
+        self.regenerate()
+
+        self.assertFalse(Question.objects.filter(id=nucleus_question.id).exists())
+
+    def test_repeated_regeneration_reports_its_own_changes(self):
+        self.regenerate()
+
+        _, changes = self.regenerate()
+
+        self.assertEqual(changes, {'kept': 2, 'removed': 0, 'added': 0})
+
+
+class QuizStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.note = Note.objects.create(user=self.user, title='Cells', content='# Nucleus\n\nThe nucleus stores DNA.')
+
+    def question_data(self, text):
+        return {
+            'question_text': text,
+            'explanation': '',
+            'choices': [{'text': 'Right', 'is_correct': True}, {'text': 'Wrong', 'is_correct': False}],
+        }
+
+    def stream(self, questions):
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            ai_service.stream_quiz_from_topic.return_value = questions
+            response = self.client.post('/api/quizzes/generate-topic/stream/', {
+                'topic': 'Cells', 'num_questions': 2, 'use_cache': False,
+            }, format='json')
+            return response, b''.join(response.streaming_content).decode()
+
+    def test_each_question_is_an_event(self):
+        response, body = self.stream(iter([self.question_data('One?'), self.question_data('Two?')]))
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(body.count('event: question\ndata: '), 2)
+        self.assertTrue(body.endswith('\n\n'))
+        self.assertIn('event: done', body)
+        self.assertEqual(Quiz.objects.get(user=self.user).total_questions, 2)
+
+    def test_generation_failure_ends_with_an_error_event(self):
+        def questions():
+            yield self.question_data('One?')
+            raise ValueError('model failed')
+
+        _, body = self.stream(questions())
+
+        self.assertIn('event: question', body)
+        self.assertIn('event: error\ndata: {"error": "model failed"}', body)
+        self.assertNotIn('event: done', body)
+        self.assertEqual(Quiz.objects.get(user=self.user).total_questions, 1)
+
+    def test_note_stream_rejects_non_numeric_count(self):
+        response = self.client.post('/api/quizzes/generate/stream/', {
+            'note_id': self.note.id, 'num_questions': 'abc',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('num_questions', response.data['error'])
+        self.assertFalse(Quiz.objects.exists())
+
+    def test_topic_stream_rejects_non_numeric_count(self):
+        response = self.client.post('/api/quizzes/generate-topic/stream/', {
+            'topic': 'Cells', 'num_questions': 'abc',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Quiz.objects.exists())
+
+
+class QuestionPoolTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.pool = get_pool('Cells', 'medium')
+
+    def questions_data(self, count, start=0):
+        return [
+            {
+                'question_text': f'Question {i}',
+                'explanation': '',
+                'choices': [{'text': 'Right', 'is_correct': True}, {'text': 'Wrong', 'is_correct': False}],
+            }
+            for i in range(start, start + count)
+        ]
+
+    def test_topic_quizzes_are_drawn_from_the_pool(self):
+        add_to_pool(self.pool, self.questions_data(5))
+
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            quiz = create_quiz_from_topic(self.user, 'Cells', num_questions=3)
+
+        ai_service.generate_quiz_from_topic.assert_not_called()
+        self.assertEqual(quiz.questions.count(), 3)
+        self.assertEqual(sum(self.pool.questions.values_list('served_count', flat=True)), 3)
+
+    def test_least_served_questions_are_drawn_first(self):
+        add_to_pool(self.pool, self.questions_data(4))
+
+        first = take_questions(self.pool, 2)
+        second = take_questions(self.pool, 2)
+
+        drawn = {question['question_text'] for question in first + second}
+        self.assertEqual(len(drawn), 4)
+        self.assertIsNone(take_questions(self.pool, 5))
+
+    def test_repeated_questions_are_not_pooled_twice(self):
+        add_to_pool(self.pool, self.questions_data(2))
+        add_to_pool(self.pool, self.questions_data(3))
+
+        self.assertEqual(self.pool.questions.count(), 3)
+
+    @override_settings(AI_QUESTION_POOL_MIN_REQUESTS=2, AI_QUESTION_POOL_MIN_SIZE=5)
+    def test_popular_topics_queue_one_top_up(self):
+        for _ in range(3):
+            record_request(self.pool)
+
+        self.assertEqual(GenerationJob.objects.filter(operation='question_pool').count(), 1)
+
+    @override_settings(AI_QUESTION_POOL_TARGET_SIZE=5, AI_QUESTION_POOL_BATCH_SIZE=2)
+    def test_top_up_fills_the_pool_to_its_target(self):
+        add_to_pool(self.pool, self.questions_data(1))
+
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            ai_service.generate_quiz_from_topic.side_effect = [
+                self.questions_data(2, start=1), self.questions_data(2, start=3)
+            ]
+            added = top_up_pool(self.pool)
+
+        self.assertEqual(added, 4)
+        self.assertEqual(self.pool.questions.count(), 5)
+
+    @override_settings(AI_QUESTION_POOL_TARGET_SIZE=5)
+    def test_top_up_stops_when_the_model_only_repeats(self):
+        add_to_pool(self.pool, self.questions_data(2))
+
+        with mock.patch('studybuddy.ai_service.ai_service') as ai_service:
+            ai_service.generate_quiz_from_topic.return_value = self.questions_data(2)
+            added = top_up_pool(self.pool)
+
+        self.assertEqual(added, 0)
+        self.assertEqual(ai_service.generate_quiz_from_topic.call_count, 1)
@@ -1,15 +1,27 @@
 from rest_framework import generics, filters, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Avg, Count, Max
-from .models import Quiz, Question, Choice, QuizAttempt, UserAnswer
+from .models import Quiz, Question, QuizAttempt
 from .serializers import (
     QuizSerializer, QuizListSerializer, QuizCreateSerializer,
-    QuizAttemptSerializer, QuizSubmissionSerializer
+    QuizAttemptSerializer, QuizAttemptListSerializer, QuizSubmissionSerializer, QuestionSerializer
 )
-from analytics.utils import track_quiz_completion
+from .services import (
+    create_quiz_from_note, create_quiz_from_topic, regenerate_quiz, stream_quiz_from_note, stream_quiz_from_topic
+)
+from .grading import submit_attempt
+from .cache import cached_content
+from .stats import get_summary, summary_stats
+from .pagination import KeysetPagination
+from generation.utils import request_count, request_flag, sse_item_stream, sse_response, EventStreamRenderer
+from generation.views import enqueue_response
+from generation.idempotency import idempotent
+from generation.deadline import DeadlineExceeded, deadline_response, with_deadline
 
 
 class QuizListCreateView(generics.ListCreateAPIView):
@@ -31,7 +43,13 @@ class QuizListCreateView(generics.ListCreateAPIView):
 
 
 class QuizDetailView(generics.RetrieveUpdateDestroyAPIView):
-    """Retrieve, update or delete a specific quiz"""
+    """
+    Retrieve, update or delete a specific quiz
+
+    The serialized questions are cached per content version, so a hot
+    quiz costs one indexed lookup instead of loading its questions and
+    choices. Quiz fields and the subject are always serialized fresh.
+    """
     serializer_class = QuizSerializer
     permission_classes = [IsAuthenticated]
 
@@ -40,18 +58,57 @@ class QuizDetailView(generics.RetrieveUpdateDestroyAPIView):
             'questions__choices'
         )
 
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            quiz = Quiz.objects.select_related('subject').get(id=kwargs['pk'], user=request.user)
+        except Quiz.DoesNotExist:
+            raise NotFound()
+
+        def serialize_questions():
+            return QuestionSerializer(Question.current.filter(quiz=quiz).prefetch_related('choices'), many=True).data
+
+        data = QuizListSerializer(quiz).data
+        data['questions'] = cached_content(quiz.id, quiz.content_version, 'questions', serialize_questions)
+        return Response(data)
+
 
 class QuizAttemptListView(generics.ListAPIView):
-    """List all quiz attempts for the authenticated user"""
-    serializer_class = QuizAttemptSerializer
+    """
+    List all quiz attempts for the authenticated user
+
+    Answers are only included with ?include=answers. ?pagination=cursor
+    switches from page numbers to keyset pagination, newest first, which
+    skips the total count and stays fast on deep pages; follow the `next`
+    link to page through. Cursor pages cannot be reordered with ?ordering=.
+    """
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['quiz']
     ordering_fields = ['completed_at', 'score']
     ordering = ['-completed_at']
 
+    def include_answers(self):
+        return 'answers' in self.request.query_params.get('include', '').split(',')
+
     def get_queryset(self):
-        return QuizAttempt.objects.filter(user=self.request.user).select_related('quiz')
+        queryset = QuizAttempt.objects.filter(user=self.request.user).select_related('quiz__subject')
+        if self.include_answers():
+            queryset = queryset.prefetch_related('answers')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.include_answers():
+            return QuizAttemptSerializer
+        return QuizAttemptListSerializer
+
+    @property
+    def paginator(self):
+        params = self.request.query_params
+        if not hasattr(self, '_paginator') and (params.get('pagination') == 'cursor' or 'cursor' in params):
+            if api_settings.ORDERING_PARAM in params:
+                raise ValidationError({api_settings.ORDERING_PARAM: 'Cursor pagination is always newest first'})
+            self._paginator = KeysetPagination()
+        return super().paginator
 
 
 @api_view(['POST'])
@@ -67,70 +124,11 @@ def submit_quiz(request):
     time_taken = serializer.validated_data['time_taken']
 
     try:
-        quiz = Quiz.objects.get(id=quiz_id, user=request.user)
+        quiz = Quiz.objects.select_related('subject').get(id=quiz_id, user=request.user)
     except Quiz.DoesNotExist:
         return Response({'error': 'Quiz not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    # Create quiz attempt
-    attempt = QuizAttempt.objects.create(
-        user=request.user,
-        quiz=quiz,
-        total_questions=quiz.questions.count(),
-        time_taken=time_taken,
-        score=0,  # Will be calculated
-        correct_answers=0  # Will be calculated
-    )
-
-    correct_count = 0
-    total_questions = 0
-
-    # Process each answer
-    for answer_data in answers:
-        question_id = answer_data['question_id']
-        choice_id = answer_data['choice_id']
-
-        try:
-            question = Question.objects.get(id=question_id, quiz=quiz)
-            choice = Choice.objects.get(id=choice_id, question=question)
-
-            is_correct = choice.is_correct
-            if is_correct:
-                correct_count += 1
-
-            UserAnswer.objects.create(
-                attempt=attempt,
-                question=question,
-                selected_choice=choice,
-                is_correct=is_correct
-            )
-            total_questions += 1
-
-        except (Question.DoesNotExist, Choice.DoesNotExist):
-            continue
-
-    # Calculate and update score
-    if total_questions > 0:
-        score = (correct_count / total_questions) * 100
-        attempt.score = round(score, 2)
-        attempt.correct_answers = correct_count
-        attempt.total_questions = total_questions
-        attempt.save()
-
-        # Update analytics tracking
-        track_quiz_completion(request.user, attempt)
-
-        # Update user profile stats
-        try:
-            profile = request.user.profile
-            profile.total_quizzes_taken += 1
-            profile.save()
-        except AttributeError:
-            # Create profile if it doesn't exist
-            from accounts.models import UserProfile
-            profile = UserProfile.objects.create(
-                user=request.user,
-                total_quizzes_taken=1
-            )
+    attempt = submit_attempt(request.user, quiz, answers, time_taken)
 
     return Response(QuizAttemptSerializer(attempt).data, status=status.HTTP_201_CREATED)
 
@@ -139,33 +137,12 @@ def submit_quiz(request):
 @permission_classes([IsAuthenticated])
 def quiz_stats(request):
     """Get quiz statistics for the authenticated user"""
-    user_attempts = QuizAttempt.objects.filter(user=request.user)
-
-    stats = {
-        'total_quizzes_taken': user_attempts.count(),
-        'average_score': user_attempts.aggregate(avg_score=Avg('score'))['avg_score'] or 0,
-        'best_score': user_attempts.aggregate(max_score=Max('score'))['max_score'] or 0,
-        'total_time_spent': sum(attempt.time_taken for attempt in user_attempts),
-        'quizzes_by_difficulty': {},
-        'recent_attempts': []
-    }
-
-    # Get quiz counts by difficulty
-    from django.db.models import Count
-    difficulty_stats = user_attempts.values('quiz__difficulty').annotate(
-        count=Count('id'),
-        avg_score=Avg('score')
-    )
-
-    for stat in difficulty_stats:
-        difficulty = stat['quiz__difficulty']
-        stats['quizzes_by_difficulty'][difficulty] = {
-            'count': stat['count'],
-            'average_score': round(stat['avg_score'], 2) if stat['avg_score'] else 0
-        }
+    stats = summary_stats(get_summary(request.user))
 
     # Get recent attempts
-    recent_attempts = user_attempts.select_related('quiz').order_by('-completed_at')[:5]
+    recent_attempts = QuizAttempt.objects.filter(user=request.user).select_related('quiz').order_by(
+        '-completed_at'
+    )[:5]
     stats['recent_attempts'] = [
         {
             'quiz_title': attempt.quiz.title,
@@ -181,123 +158,195 @@ def quiz_stats(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
+@with_deadline
 def generate_quiz_from_note(request):
-    """Generate a quiz from a note using AI"""
-    from studybuddy.ai_service import ai_service
+    """Generate a quiz from a note using AI (pass async=true to queue a job and poll it)"""
     from notes.models import Note
 
     note_id = request.data.get('note_id')
-    num_questions = request.data.get('num_questions', 5)
+    num_questions = request_count(request, 'num_questions', 5)
     difficulty = request.data.get('difficulty', 'medium')
+    use_cache = request_flag(request, 'use_cache', default=True)
 
     if not note_id:
         return Response({'error': 'note_id is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+    if num_questions is None:
+        return Response({'error': 'num_questions must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+
     try:
         note = Note.objects.get(id=note_id, user=request.user)
     except Note.DoesNotExist:
         return Response({'error': 'Note not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    if request_flag(request, 'async'):
+        return enqueue_response(request, 'quiz_from_note', {
+            'note_id': note.id,
+            'num_questions': num_questions,
+            'difficulty': difficulty,
+            'use_cache': use_cache,
+        })
+
     try:
-        # Generate questions using AI
-        questions_data = ai_service.generate_quiz_questions(
-            note_content=note.content,
-            note_title=note.title,
+        quiz = create_quiz_from_note(
+            request.user, note,
             num_questions=num_questions,
-            difficulty=difficulty
-        )
-
-        # Create quiz
-        quiz = Quiz.objects.create(
-            title=f"Quiz: {note.title}",
-            description=f"AI-generated quiz from note: {note.title}",
-            user=request.user,
-            note=note,
-            subject=note.subject,
             difficulty=difficulty,
-            total_questions=len(questions_data)
+            use_cache=use_cache
         )
-
-        # Create questions and choices
-        for i, question_data in enumerate(questions_data):
-            question = Question.objects.create(
-                quiz=quiz,
-                question_text=question_data['question_text'],
-                explanation=question_data.get('explanation', ''),
-                order=i + 1
-            )
-
-            for j, choice_data in enumerate(question_data['choices']):
-                Choice.objects.create(
-                    question=question,
-                    choice_text=choice_data['text'],
-                    is_correct=choice_data['is_correct'],
-                    order=j + 1
-                )
-
         return Response(QuizSerializer(quiz).data, status=status.HTTP_201_CREATED)
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
+@with_deadline
 def generate_quiz_from_topic(request):
-    """Generate a quiz from just a topic using AI"""
-    from studybuddy.ai_service import ai_service
-
+    """Generate a quiz from just a topic using AI (pass async=true to queue a job and poll it)"""
     topic = request.data.get('topic')
-    num_questions = request.data.get('num_questions', 5)
+    num_questions = request_count(request, 'num_questions', 5)
     difficulty = request.data.get('difficulty', 'medium')
     subject_name = request.data.get('subject', '') or request.data.get('subject_name', '')
+    use_cache = request_flag(request, 'use_cache', default=True)
 
     if not topic:
         return Response({'error': 'topic is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+    if num_questions is None:
+        return Response({'error': 'num_questions must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request_flag(request, 'async'):
+        return enqueue_response(request, 'quiz_from_topic', {
+            'topic': topic,
+            'num_questions': num_questions,
+            'difficulty': difficulty,
+            'subject_name': subject_name,
+            'use_cache': use_cache,
+        })
+
     try:
-        # Generate questions using AI
-        questions_data = ai_service.generate_quiz_from_topic(
-            topic=topic,
+        quiz = create_quiz_from_topic(
+            request.user, topic,
             num_questions=num_questions,
-            difficulty=difficulty
-        )
-
-        # Get or create subject if provided
-        subject = None
-        if subject_name.strip():
-            from notes.models import Subject
-            subject, created = Subject.objects.get_or_create(
-                name=subject_name.strip(),
-                defaults={'description': f'Subject for {subject_name.strip()}'}
-            )
-
-        # Create quiz
-        quiz = Quiz.objects.create(
-            title=f"Quiz: {topic}",
-            description=f"AI-generated quiz about {topic}",
-            user=request.user,
-            subject=subject,
             difficulty=difficulty,
-            total_questions=len(questions_data)
+            subject_name=subject_name,
+            use_cache=use_cache
         )
+        return Response(QuizSerializer(quiz).data, status=status.HTTP_201_CREATED)
 
-        # Create questions and choices
-        for q_data in questions_data:
-            question = Question.objects.create(
-                quiz=quiz,
-                question_text=q_data['question_text'],
-                explanation=q_data.get('explanation', '')
-            )
-
-            for choice_data in q_data['choices']:
-                Choice.objects.create(
-                    question=question,
-                    choice_text=choice_data['text'],
-                    is_correct=choice_data['is_correct']
-                )
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        return Response(QuizSerializer(quiz).data, status=status.HTTP_201_CREATED)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+@with_deadline
+def regenerate_quiz_from_note(request, pk):
+    """
+    Update a note's quiz after the note was edited, regenerating only the
+    questions from changed sections (pass async=true to queue a job and poll it)
+    """
+    use_cache = request_flag(request, 'use_cache', default=True)
+
+    try:
+        quiz = Quiz.objects.select_related('note').get(id=pk, user=request.user)
+    except Quiz.DoesNotExist:
+        return Response({'error': 'Quiz not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if quiz.note is None:
+        return Response({'error': 'Only quizzes generated from a note can be regenerated'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    if request_flag(request, 'async'):
+        return enqueue_response(request, 'quiz_regenerate', {
+            'quiz_id': quiz.id,
+            'use_cache': use_cache,
+        })
+
+    try:
+        quiz, changes = regenerate_quiz(request.user, quiz, use_cache=use_cache)
+        return Response({**QuizSerializer(quiz).data, 'changes': changes})
+
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _quiz_event_stream(quiz, questions):
+    return sse_response(sse_item_stream(
+        questions, 'question',
+        lambda question: QuestionSerializer(question).data,
+        lambda: QuizSerializer(quiz).data
+    ))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def generate_quiz_from_note_stream(request):
+    """
+    Generate a quiz from a note, streaming each question as Server-Sent Events
+
+    Emits a `question` event as soon as each question is generated and
+    saved, then a `done` event with the full quiz, or an `error` event.
+    """
+    from notes.models import Note
+
+    note_id = request.data.get('note_id')
+    num_questions = request_count(request, 'num_questions', 5)
+    difficulty = request.data.get('difficulty', 'medium')
+
+    if not note_id:
+        return Response({'error': 'note_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if num_questions is None:
+        return Response({'error': 'num_questions must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        note = Note.objects.get(id=note_id, user=request.user)
+    except Note.DoesNotExist:
+        return Response({'error': 'Note not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    quiz, questions = stream_quiz_from_note(
+        request.user, note,
+        num_questions=num_questions,
+        difficulty=difficulty,
+        use_cache=request_flag(request, 'use_cache', default=True)
+    )
+    return _quiz_event_stream(quiz, questions)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def generate_quiz_from_topic_stream(request):
+    """Generate a quiz from a topic, streaming each question as Server-Sent Events"""
+    topic = request.data.get('topic')
+    num_questions = request_count(request, 'num_questions', 5)
+    difficulty = request.data.get('difficulty', 'medium')
+    subject_name = request.data.get('subject', '') or request.data.get('subject_name', '')
+
+    if not topic:
+        return Response({'error': 'topic is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if num_questions is None:
+        return Response({'error': 'num_questions must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    quiz, questions = stream_quiz_from_topic(
+        request.user, topic,
+        num_questions=num_questions,
+        difficulty=difficulty,
+        subject_name=subject_name,
+        use_cache=request_flag(request, 'use_cache', default=True)
+    )
+    return _quiz_event_stream(quiz, questions)
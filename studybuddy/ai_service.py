@@ -1,15 +1,38 @@
-import google.generativeai as genai
+import contextvars
 import json
 import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from django.conf import settings
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
 from typing import List, Dict, Any, Optional
+from generation.cache import AIResponseCacheStore, make_cache_key
+from generation.deadline import DeadlineExceeded, check_budget, time_left
+from generation.health import ModelCircuitBreaker
+from generation.hedging import HedgeBudget
+from generation.metrics import GenerationMetrics, sampled
+from generation.providers import get_provider
+from generation.text import chunk_content, compact_text, estimate_tokens, normalize_text
+from generation.utils import item_count
+from generation.parsing import (
+    IncrementalArrayParser, ParseStats, salvage_items, salvage_string, validate_question, validate_flashcard
+)
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
 class GeminiAIService:
+    # Rough output tokens per generated item for Gemini flash models
+    ITEM_OUTPUT_TOKENS = {'questions': 200, 'flashcards': 100}
+    OUTPUT_OVERHEAD_TOKENS = 64   # JSON wrapper and fences
+    OUTPUT_HEADROOM = 1.25
+    # Floor leaves room for the reasoning tokens thinking models count against the budget
+    MIN_OUTPUT_TOKENS = 1024
+    NOTES_OUTPUT_TOKENS = 3000    # notes section of a study pack
+
     def __init__(self):
         # List of models in order of preference (best to fallback)
         self.model_names = [
@@ -19,81 +42,369 @@ class GeminiAIService:
             'gemini-1.5-flash',      # Older but reliable
             'gemini-pro'             # Final fallback
         ]
-        self.current_model = None
-        self._initialize_model()
+        # Generation configuration for better results
+        self.generation_config = {
+            'temperature': 0.7,  # Balanced creativity and consistency
+            'top_p': 0.8,        # Focus on most likely tokens
+            'top_k': 40,         # Limit vocabulary for more focused responses
+            'max_output_tokens': 4096,  # Allow for longer responses
+            'candidate_count': 1,
+        }
+        # Ceiling for item responses; each call is budgeted from its item count (see _output_budget)
+        self.max_output_tokens = settings.AI_MAX_OUTPUT_TOKENS
+        self.max_questions = settings.AI_MAX_QUESTIONS
+        self.max_flashcards = settings.AI_MAX_FLASHCARDS
+        self.cache = AIResponseCacheStore()
+        self.parse_stats = ParseStats()
+        self.metrics = GenerationMetrics()
+        # Share of responses whose payload is logged at DEBUG level
+        self.log_sample_rate = settings.AI_LOG_SAMPLE_RATE
+        # Extra calls allowed to top up a truncated quiz or deck
+        self.max_followup_calls = settings.AI_MAX_FOLLOWUP_CALLS
+        # Notes longer than this are split and generated chunk by chunk in parallel
+        self.chunk_token_budget = settings.AI_CHUNK_TOKEN_BUDGET
+        self.chunk_max_workers = settings.AI_CHUNK_MAX_WORKERS
+        # Budget a call needs under a request deadline until the model has latency history
+        self.min_call_seconds = settings.AI_MIN_CALL_SECONDS
+        self.breaker = ModelCircuitBreaker(
+            failure_threshold=settings.AI_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.AI_BREAKER_RECOVERY_SECONDS
+        )
+        # Race slow models against the next healthy one (see _hedged_pass)
+        self.hedge_enabled = settings.AI_HEDGE_ENABLED
+        self.hedge_percentile = settings.AI_HEDGE_PERCENTILE
+        self.hedge_default_delay = settings.AI_HEDGE_DEFAULT_DELAY
+        self.hedge_min_delay = settings.AI_HEDGE_MIN_DELAY
+        self.hedge_budget = HedgeBudget(settings.AI_HEDGE_MAX_RATIO, settings.AI_HEDGE_BURST)
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=settings.AI_HEDGE_MAX_WORKERS, thread_name_prefix='ai-hedge'
+        )
+        # Building the provider imports and configures the vendor SDK
+        self.provider = get_provider()
+        logger.info(f"Initialized AI service with the {self.provider.name} provider")
 
-    def _initialize_model(self):
-        """Initialize with the best available model"""
-        for model_name in self.model_names:
+    def warm_up(self):
+        """Build model clients ahead of the first request"""
+        self.provider.warm_up(self.model_names)
+
+    def _output_budget(self, key: str, count: int) -> int:
+        """max_output_tokens sized for `count` items of the `key` array instead of the fixed default"""
+        estimate = (self.OUTPUT_OVERHEAD_TOKENS + count * self.ITEM_OUTPUT_TOKENS[key]) * self.OUTPUT_HEADROOM
+        return max(self.MIN_OUTPUT_TOKENS, min(int(estimate), self.max_output_tokens))
+
+    def _config(self, max_output_tokens: Optional[int] = None) -> Dict[str, Any]:
+        if max_output_tokens is None:
+            return self.generation_config
+        return {**self.generation_config, 'max_output_tokens': max_output_tokens}
+
+    def _typical_latency(self, model_name: str) -> float:
+        """
+        Median recent latency of model_name under a request deadline, or
+        min_call_seconds before it has history
+
+        Streams and background jobs run without a deadline and can take
+        far longer, so their calls are left out.
+        """
+        observed = self.breaker.latency_percentile(model_name, 50, under_deadline=True)
+        return self.min_call_seconds if observed is None else observed
+
+    def _call_model(self, model_name: str, prompt: str, generation_config: Dict[str, Any]) -> str:
+        """
+        Run prompt on one model, recording the outcome with the circuit breaker
+
+        Under a request deadline the call is only started when the budget
+        covers the model's typical latency, and is cut off when it runs out.
+        """
+        try:
+            check_budget(self._typical_latency(model_name), f"a call to {model_name}")
+        except DeadlineExceeded:
+            self.breaker.release(model_name)
+            raise
+
+        started = time.monotonic()
+        try:
+            text = self.provider.generate(model_name, prompt, generation_config, timeout=time_left())
+        except Exception as e:
+            left = time_left()
+            if left is not None and left <= 0:
+                # Cut off by the caller's budget; not the model's fault
+                self.breaker.release(model_name)
+                raise DeadlineExceeded(f"Request deadline exceeded while waiting on {model_name}") from e
+            self.breaker.record_failure(model_name, e)
+            raise
+        if not text:
+            self.breaker.record_failure(model_name, 'empty response')
+            raise Exception(f"Empty response from model: {model_name}")
+        self.breaker.record_success(model_name, time.monotonic() - started, under_deadline=time_left() is not None)
+        return text
+
+    def _next_allowed_model(self, models):
+        """Next model from the iterator whose circuit lets a request through"""
+        # Skip models whose circuit is open; they cost no latency here
+        return next((model_name for model_name in models if self.breaker.allow(model_name)), None)
+
+    def _sequential_pass(self, prompt: str, generation_config: Dict[str, Any], attempt: int):
+        """
+        Try each model in turn; returns ((text, model_name) or None, number of model calls)
+
+        A model the remaining budget cannot cover is skipped for the next,
+        possibly faster one; DeadlineExceeded is raised once the budget is
+        spent or no model fits it.
+        """
+        models = iter(self.model_names)
+        calls = 0
+        expired = None
+        while True:
+            model_name = self._next_allowed_model(models)
+            if model_name is None:
+                if expired:
+                    raise expired
+                return None, calls
+
+            calls += 1
             try:
-                self.current_model = genai.GenerativeModel(model_name)
-                logger.info(f"Successfully initialized Gemini AI with model: {model_name}")
-                break
+                return (self._call_model(model_name, prompt, generation_config), model_name), calls
+            except DeadlineExceeded as e:
+                left = time_left()
+                if left is None or left <= 0:
+                    raise
+                expired = e
             except Exception as e:
-                logger.warning(f"Failed to initialize model {model_name}: {e}")
-                continue
+                logger.warning(f"Model {model_name} failed (attempt {attempt + 1}): {e}")
 
-        if not self.current_model:
-            raise Exception("Failed to initialize any Gemini model")
+    def _hedge_delay(self, model_name: str) -> float:
+        """How long to wait on model_name before hedging to the next model"""
+        observed = self.breaker.latency_percentile(model_name, self.hedge_percentile)
+        if observed is None:
+            return self.hedge_default_delay
+        return max(observed, self.hedge_min_delay)
 
-    def _generate_with_fallback(self, prompt: str, max_retries: int = 3):
-        """Generate content with model fallback on failure"""
-        # Generation configuration for better results
-        generation_config = genai.types.GenerationConfig(
-            temperature=0.7,  # Balanced creativity and consistency
-            top_p=0.8,       # Focus on most likely tokens
-            top_k=40,        # Limit vocabulary for more focused responses
-            max_output_tokens=4096,  # Allow for longer responses
-            candidate_count=1
-        )
+    def _hedged_pass(self, prompt: str, generation_config: Dict[str, Any], attempt: int):
+        """
+        Like _sequential_pass, but a model that is slower than its usual
+        latency is raced against the next healthy model
 
-        for attempt in range(max_retries):
-            for model_name in self.model_names:
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(
-                        prompt,
-                        generation_config=generation_config
-                    )
-
-                    if response.text:
-                        if model_name != self.model_names[0]:
-                            logger.info(f"Successfully used fallback model: {model_name}")
-                        return response
-                    else:
-                        logger.warning(f"Empty response from model: {model_name}")
-
-                except Exception as e:
-                    logger.warning(f"Model {model_name} failed (attempt {attempt + 1}): {e}")
+        The first valid response wins; the loser keeps running in the pool
+        and its result is discarded. At most one hedge is sent per pass,
+        and only while the hedge budget allows.
+        """
+        models = iter(self.model_names)
+        pending = {}
+        calls = 0
+        hedged = False
+        expired = None
+        upcoming = None  # next healthy model, let through by its breaker but not started yet
+
+        def next_model():
+            nonlocal upcoming
+            if upcoming is None:
+                upcoming = self._next_allowed_model(models)
+            return upcoming
+
+        def launch():
+            nonlocal calls, upcoming
+            model_name = next_model()
+            if model_name is not None:
+                upcoming = None
+                # Calls run in a copy of this context so they see the request deadline
+                future = self._hedge_executor.submit(
+                    contextvars.copy_context().run, self._call_model, model_name, prompt, generation_config
+                )
+                pending[future] = model_name
+                calls += 1
+            return model_name is not None
+
+        self.hedge_budget.record_request()
+        if not launch():
+            return None, calls
+
+        try:
+            while pending:
+                timeout = None
+                if not hedged and len(pending) == 1:
+                    timeout = self._hedge_delay(next(iter(pending.values())))
+                left = time_left()
+                if left is not None:
+                    timeout = max(0, left if timeout is None else min(timeout, left))
+
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    check_budget(what="the models in flight to answer")
+                    # Only spend a hedge token when there is a model left to race
+                    if next_model() is not None and self.hedge_budget.try_acquire():
+                        logger.info(f"Hedging slow model {next(iter(pending.values()))} after {timeout:.2f}s")
+                        hedged = launch()
                     continue
 
+                for future in done:
+                    model_name = pending.pop(future)
+                    try:
+                        return (future.result(), model_name), calls
+                    except DeadlineExceeded as e:
+                        expired = e
+                    except Exception as e:
+                        logger.warning(f"Model {model_name} failed (attempt {attempt + 1}): {e}")
+
+                if not pending:
+                    # Every model in flight failed or did not fit the budget: fall back to the next one
+                    if not launch() and expired:
+                        raise expired
+        finally:
+            if upcoming is not None:
+                # Give back a half-open probe slot taken for a hedge that was never sent
+                self.breaker.release(upcoming)
+
+        return None, calls
+
+    def _generate_with_fallback(self, prompt: str, operation: str = 'generate',
+                                max_output_tokens: Optional[int] = None, max_retries: int = 3):
+        """Generate content with model fallback on failure, returning (text, model_name)"""
+        generation_config = self._config(max_output_tokens)
+        started = time.monotonic()
+        total_calls = 0
+        error = "All models failed to generate content after multiple attempts"
+
+        for attempt in range(max_retries):
+            try:
+                if self.hedge_enabled:
+                    result, calls = self._hedged_pass(prompt, generation_config, attempt)
+                else:
+                    result, calls = self._sequential_pass(prompt, generation_config, attempt)
+            except DeadlineExceeded as e:
+                logger.warning(f"Giving up on {operation}: {e}")
+                self._record_call(operation, prompt, started, total_calls, error=str(e))
+                raise
+            total_calls += calls
+
+            if result:
+                text, model_name = result
+                if model_name != self.model_names[0]:
+                    logger.info(f"Successfully used fallback model: {model_name}")
+                self._record_call(operation, prompt, started, total_calls, model_name, text)
+                return result
+
+            if not calls:
+                error = "All models are temporarily unavailable (circuit open)"
+                break
+
             if attempt < max_retries - 1:
                 logger.info(f"Retrying generation (attempt {attempt + 2}/{max_retries})")
 
-        raise Exception("All models failed to generate content after multiple attempts")
+        self._record_call(operation, prompt, started, total_calls, error=error)
+        raise Exception(error)
+
+    def _record_call(self, operation: str, prompt: str, started: float, attempts: int, model_name: str = '',
+                     text: str = '', first_token_at: Optional[float] = None, error: str = ''):
+        """Add one logical model call to the metrics; streamed calls pass first_token_at"""
+        self.metrics.record_call(
+            operation,
+            model_name,
+            fallback_depth=self.model_names.index(model_name) if model_name else None,
+            attempts=attempts,
+            prompt_tokens=estimate_tokens(prompt),
+            response_tokens=estimate_tokens(text),
+            latency=time.monotonic() - started,
+            time_to_first_token=first_token_at - started if first_token_at is not None else None,
+            streamed=first_token_at is not None,
+            error=error
+        )
+
+    def _stream_with_fallback(self, prompt: str, operation: str = 'stream',
+                              max_output_tokens: Optional[int] = None):
+        """
+        Stream content, yielding (model_name, text) chunks
+
+        Models are only switched before the first chunk arrives; once text
+        has been sent to the caller a failure is raised instead.
+        """
+        generation_config = self._config(max_output_tokens)
+        request_started = time.monotonic()
+        calls = 0
+        for model_name in self.model_names:
+            if not self.breaker.allow(model_name):
+                continue
+
+            calls += 1
+            started = time.monotonic()
+            try:
+                chunks = iter(self.provider.stream(model_name, prompt, generation_config))
+                first_text = next((text for text in chunks if text), None)
+            except Exception as e:
+                self.breaker.record_failure(model_name, e)
+                logger.warning(f"Model {model_name} failed to start streaming: {e}")
+                continue
+
+            if first_text is None:
+                self.breaker.record_failure(model_name, 'empty response')
+                logger.warning(f"Empty streamed response from model: {model_name}")
+                continue
+
+            first_token_at = time.monotonic()
+            received = [first_text]
+            try:
+                yield model_name, first_text
+                for text in chunks:
+                    if text:
+                        received.append(text)
+                        yield model_name, text
+            except GeneratorExit:
+                # The caller stopped reading early; the model itself was healthy
+                self.breaker.record_success(model_name, time.monotonic() - started)
+                self._record_call(operation, prompt, request_started, calls, model_name,
+                                  ''.join(received), first_token_at)
+                raise
+            except Exception as e:
+                self.breaker.record_failure(model_name, e)
+                self._record_call(operation, prompt, request_started, calls, model_name,
+                                  ''.join(received), first_token_at, error=str(e))
+                raise
+
+            self.breaker.record_success(model_name, time.monotonic() - started)
+            self._record_call(operation, prompt, request_started, calls, model_name,
+                              ''.join(received), first_token_at)
+            return
+
+        self._record_call(operation, prompt, request_started, calls, error="All models failed to stream content")
+        raise Exception("All models failed to stream content")
 
     def test_models(self):
-        """Test which models are available and working"""
-        working_models = []
+        """Test which models are available and working, probing them concurrently"""
         test_prompt = "Generate a simple test response: Hello World"
 
-        for model_name in self.model_names:
+        def probe(model_name):
             try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(test_prompt)
-                if response.text:
-                    working_models.append(model_name)
+                text = self.provider.generate(model_name, test_prompt, self.generation_config)
+                if text:
                     logger.info(f"✓ Model {model_name} is working")
-                else:
-                    logger.warning(f"✗ Model {model_name} returned empty response")
+                    return True
+                logger.warning(f"✗ Model {model_name} returned empty response")
             except Exception as e:
                 logger.warning(f"✗ Model {model_name} failed: {e}")
+            return False
+
+        with ThreadPoolExecutor(max_workers=len(self.model_names)) as pool:
+            working = list(pool.map(probe, self.model_names))
+        return [model_name for model_name, ok in zip(self.model_names, working) if ok]
+
+    def _cache_key(self, operation: str, prompt: str) -> str:
+        """Content-addressed key for a rendered prompt under the current models and config"""
+        return make_cache_key(operation, prompt, self.model_names, self.generation_config)
 
-        return working_models
+    def _get_cached(self, operation: str, cache_key: str, use_cache: bool):
+        """Return a cached result, or None when missing or the caller opted out"""
+        if not use_cache:
+            return None
+        cached = self.cache.get(cache_key)
+        self.metrics.record_cache(operation, cached is not None)
+        if cached is not None:
+            logger.info(f"AI cache hit for {operation} ({cache_key[:12]})")
+        return cached
 
     def _clean_json_response(self, response_text: str) -> str:
         """Clean AI response to extract valid JSON"""
-        logger.info(f"Raw AI response: {response_text[:500]}...")  # Log first 500 chars for debugging
+        log_payload = logger.isEnabledFor(logging.DEBUG) and sampled(self.log_sample_rate)
+        if log_payload:
+            logger.debug(f"Raw AI response: {response_text[:500]}...")
 
         # Remove markdown code blocks if present
         if '```json' in response_text:
@@ -128,117 +439,461 @@ class GeminiAIService:
         if json_end > 0:
             response_text = response_text[:json_end]
 
-        logger.info(f"Cleaned JSON: {response_text[:500]}...")  # Log cleaned JSON for debugging
+        if log_payload:
+            logger.debug(f"Cleaned JSON: {response_text[:500]}...")
         return response_text
     
-    def generate_quiz_questions(self, note_content: str, note_title: str,
-                              num_questions: int = 5, difficulty: str = 'medium') -> List[Dict[str, Any]]:
+    def _parse_items(self, response_text: str, key: str, validator) -> List[Dict[str, Any]]:
         """
-        Generate quiz questions from note content using Gemini AI with fallback models
+        Parse the `key` array of a response, keeping only schema-valid items
+
+        Falls back to salvaging complete items when the JSON is truncated
+        (e.g. at max_output_tokens) or slightly malformed.
         """
+        cleaned_response = self._clean_json_response(response_text)
         try:
-            prompt = self._create_quiz_prompt(note_content, note_title, num_questions, difficulty)
-            response = self._generate_with_fallback(prompt)
+            data = json.loads(cleaned_response)
+        except json.JSONDecodeError as e:
+            items = salvage_items(response_text, key, validator)
+            if items:
+                self.parse_stats.incr('salvaged_responses')
+                self.parse_stats.incr('salvaged_items', len(items))
+                self.metrics.record_parse(key, 'salvaged')
+                logger.warning(f"Salvaged {len(items)} {key} from malformed AI response: {e}")
+            else:
+                self.parse_stats.incr('failed_parses')
+                self.metrics.record_parse(key, 'failed')
+                logger.error(f"JSON parsing error: {e}")
+            return items
 
-            if not response.text:
-                raise Exception("Empty response from Gemini API")
+        if not isinstance(data, dict) or not isinstance(data.get(key), list):
+            self.parse_stats.incr('failed_parses')
+            self.metrics.record_parse(key, 'failed')
+            raise Exception("Invalid response format from Gemini API")
 
-            # Clean and parse the JSON response
-            cleaned_response = self._clean_json_response(response.text)
-            questions_data = json.loads(cleaned_response)
-            
-            # Validate the response structure
-            if not isinstance(questions_data, dict) or 'questions' not in questions_data:
-                raise Exception("Invalid response format from Gemini API")
-            
-            return questions_data['questions']
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error: {e}")
-            logger.error(f"Response text: {response.text}")
+        items = [item for item in data[key] if validator(item)]
+        self.parse_stats.incr('full_parses')
+        self.metrics.record_parse(key, 'full')
+        if len(items) < len(data[key]):
+            self.parse_stats.incr('dropped_items', len(data[key]) - len(items))
+        return items
+
+    def _generate_items(self, operation: str, build_prompt, key: str, validator, count: int,
+                        use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Generate `count` validated items of the `key` array
+
+        build_prompt(n) renders the prompt for n items. When a response is
+        cut short, the items already recovered are kept and follow-up calls
+        ask only for the missing ones.
+        """
+        count = int(count)
+        prompt = build_prompt(count)
+        cache_key = self._cache_key(operation, prompt)
+        cached = self._get_cached(operation, cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        response_text, model_name = self._generate_with_fallback(
+            prompt, operation, self._output_budget(key, count)
+        )
+        if not response_text:
+            raise Exception("Empty response from Gemini API")
+
+        items = self._parse_items(response_text, key, validator)
+        if not items:
             raise Exception("Failed to parse AI response")
+
+        followups = 0
+        while len(items) < count and followups < self.max_followup_calls:
+            missing = count - len(items)
+            followups += 1
+            self.parse_stats.incr('followup_calls')
+            logger.info(f"Requesting {missing} missing {key} (follow-up {followups})")
+
+            try:
+                response_text, model_name = self._generate_with_fallback(
+                    build_prompt(missing) + self._exclusion_note(items), operation,
+                    self._output_budget(key, missing)
+                )
+            except DeadlineExceeded as e:
+                # Out of time: keep the items already recovered
+                logger.warning(f"Returning {len(items)} of {count} {key}: {e}")
+                break
+            extra = self._parse_items(response_text, key, validator)
+            if not extra:
+                break
+            items.extend(extra[:missing])
+
+        items = items[:count]
+        self.cache.set(cache_key, operation, items, model_name)
+        return items
+
+    def _generate_items_chunked(self, operation: str, content: str, title: str, build_prompt, key: str,
+                                validator, count: int, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Map-reduce generation for content larger than one prompt budget
+
+        The content is split on markdown headings into chunks of at most
+        chunk_token_budget tokens. build_prompt(content, title, n) renders
+        the prompt for one chunk; chunks run in parallel on a bounded pool,
+        each asked for its share of `count` by size, and the results are
+        merged in note order, deduplicated and trimmed.
+        """
+        count = int(count)
+        cache_key = self._cache_key(operation, build_prompt(content, title, count))
+        cached = self._get_cached(operation, cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        chunks = chunk_content(content, self.chunk_token_budget)
+
+        # Largest-remainder split of `count` proportional to chunk size
+        total_size = sum(len(chunk) for chunk in chunks)
+        exact = [count * len(chunk) / total_size for chunk in chunks]
+        quotas = [math.floor(share) for share in exact]
+        by_remainder = sorted(range(len(chunks)), key=lambda i: exact[i] - quotas[i], reverse=True)
+        for i in by_remainder[:count - sum(quotas)]:
+            quotas[i] += 1
+
+        logger.info(f"Generating {count} {key} from {len(chunks)} chunks in parallel")
+
+        def generate_chunk(index):
+            try:
+                part_title = f"{title} (part {index + 1} of {len(chunks)})"
+                # One extra item per chunk leaves room for duplicates across chunks
+                return self._generate_items(
+                    operation,
+                    lambda n: build_prompt(chunks[index], part_title, n),
+                    key, validator, quotas[index] + 1, use_cache
+                )
+            finally:
+                connections.close_all()
+
+        active = [i for i in range(len(chunks)) if quotas[i]]
+        with ThreadPoolExecutor(max_workers=min(self.chunk_max_workers, len(active))) as pool:
+            # Each chunk runs in a copy of this context so it sees the request deadline
+            futures = {i: pool.submit(contextvars.copy_context().run, generate_chunk, i) for i in active}
+
+        picked = {i: [] for i in active}
+        leftovers = []
+        seen = set()
+        expired = None
+        for i in active:
+            try:
+                items = futures[i].result()
+            except DeadlineExceeded as e:
+                expired = e
+                continue
+            except Exception as e:
+                logger.warning(f"Chunk {i + 1}/{len(chunks)} failed: {e}")
+                continue
+            for item in items:
+                fingerprint = normalize_text(item.get('question_text') or item.get('front_text'))
+                if fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                (picked[i] if len(picked[i]) < quotas[i] else leftovers).append(item)
+
+        merged = [item for i in active for item in picked[i]]
+        merged += leftovers[:count - len(merged)]
+        if not merged:
+            raise expired or Exception("Failed to parse AI response")
+
+        self.cache.set(cache_key, operation, merged)
+        return merged
+
+    def _exclusion_note(self, items: List[Dict[str, Any]]) -> str:
+        """Prompt suffix listing items already generated so follow-up calls don't repeat them"""
+        covered = [item.get('question_text') or item.get('front_text') for item in items]
+        lines = '\n'.join(f"- {text}" for text in covered if text)
+        return f"""
+**ALREADY GENERATED (do not repeat these):**
+{lines}
+"""
+
+    def generate_quiz_questions(self, note_content: str, note_title: str,
+                              num_questions: int = 5, difficulty: str = 'medium',
+                              use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Generate quiz questions from note content using Gemini AI with fallback models
+
+        Pass use_cache=False to skip the response cache lookup; the fresh
+        result still replaces the cached entry.
+        """
+        num_questions = item_count(num_questions, self.max_questions)
+        note_content = compact_text(note_content)
+        try:
+            if estimate_tokens(note_content) > self.chunk_token_budget:
+                return self._generate_items_chunked(
+                    'quiz', note_content, note_title,
+                    lambda content, title, n: self._create_quiz_prompt(content, title, n, difficulty),
+                    'questions', validate_question, num_questions, use_cache
+                )
+
+            return self._generate_items(
+                'quiz',
+                lambda n: self._create_quiz_prompt(note_content, note_title, n, difficulty),
+                'questions', validate_question, num_questions, use_cache
+            )
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error generating quiz questions: {e}")
             raise Exception(f"Failed to generate quiz questions: {str(e)}")
 
-    def generate_quiz_from_topic(self, topic: str, num_questions: int = 5, difficulty: str = 'medium') -> List[Dict[str, Any]]:
+    def generate_quiz_from_topic(self, topic: str, num_questions: int = 5, difficulty: str = 'medium',
+                                 use_cache: bool = True,
+                                 exclude: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
         """
         Generate quiz questions from just a topic using Gemini AI
+
+        exclude lists questions the model should not repeat, e.g. those
+        already in the topic's question pool.
         """
+        num_questions = item_count(num_questions, self.max_questions)
+        exclusion = self._exclusion_note(exclude) if exclude else ''
         try:
             # Use empty content to trigger topic-only generation
-            prompt = self._create_quiz_prompt("", topic, num_questions, difficulty)
-            response = self._generate_with_fallback(prompt)
-
-            if not response.text:
-                raise Exception("Empty response from Gemini API")
-
-            # Clean and parse the JSON response
-            cleaned_response = self._clean_json_response(response.text)
-            questions_data = json.loads(cleaned_response)
-
-            # Validate the response structure
-            if not isinstance(questions_data, dict) or 'questions' not in questions_data:
-                raise Exception("Invalid response format from Gemini API")
-
-            return questions_data['questions']
-
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error: {e}")
-            logger.error(f"Raw response text: {response.text}")
-            logger.error(f"Cleaned response text: {cleaned_response}")
-            raise Exception(f"Failed to parse AI response: {str(e)}")
+            return self._generate_items(
+                'quiz_topic',
+                lambda n: self._create_quiz_prompt("", topic, n, difficulty) + exclusion,
+                'questions', validate_question, num_questions, use_cache
+            )
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error generating quiz from topic: {e}")
             raise Exception(f"Failed to generate quiz from topic: {str(e)}")
 
     def generate_flashcards(self, note_content: str, note_title: str,
-                          num_cards: int = 10) -> List[Dict[str, str]]:
+                          num_cards: int = 10, use_cache: bool = True) -> List[Dict[str, str]]:
         """
         Generate flashcards from note content using Gemini AI with fallback models
         """
+        num_cards = item_count(num_cards, self.max_flashcards)
+        note_content = compact_text(note_content)
         try:
-            prompt = self._create_flashcard_prompt(note_content, note_title, num_cards)
-            response = self._generate_with_fallback(prompt)
-
-            if not response.text:
-                raise Exception("Empty response from Gemini API")
+            if estimate_tokens(note_content) > self.chunk_token_budget:
+                return self._generate_items_chunked(
+                    'flashcards', note_content, note_title,
+                    self._create_flashcard_prompt,
+                    'flashcards', validate_flashcard, num_cards, use_cache
+                )
 
-            # Clean and parse the JSON response
-            cleaned_response = self._clean_json_response(response.text)
-            flashcards_data = json.loads(cleaned_response)
-            
-            # Validate the response structure
-            if not isinstance(flashcards_data, dict) or 'flashcards' not in flashcards_data:
-                raise Exception("Invalid response format from Gemini API")
-            
-            return flashcards_data['flashcards']
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error: {e}")
-            logger.error(f"Response text: {response.text}")
-            raise Exception("Failed to parse AI response")
+            return self._generate_items(
+                'flashcards',
+                lambda n: self._create_flashcard_prompt(note_content, note_title, n),
+                'flashcards', validate_flashcard, num_cards, use_cache
+            )
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error generating flashcards: {e}")
             raise Exception(f"Failed to generate flashcards: {str(e)}")
 
-    def generate_notes(self, topic: str, description: str = "", guidelines: str = "") -> str:
+    def generate_notes(self, topic: str, description: str = "", guidelines: str = "",
+                       use_cache: bool = True) -> str:
         """
         Generate comprehensive notes from a topic using Gemini AI
         """
         try:
             prompt = self._create_notes_prompt(topic, description, guidelines)
-            response = self._generate_with_fallback(prompt)
+            cache_key = self._cache_key('notes', prompt)
+            cached = self._get_cached('notes', cache_key, use_cache)
+            if cached is not None:
+                return cached
 
-            if not response.text:
+            response_text, model_name = self._generate_with_fallback(prompt, 'notes')
+
+            if not response_text:
                 raise Exception("Empty response from Gemini API")
 
-            return response.text.strip()
+            notes_content = response_text.strip()
+            self.cache.set(cache_key, 'notes', notes_content, model_name)
+            return notes_content
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error generating notes: {e}")
             raise Exception(f"Failed to generate notes: {str(e)}")
 
+    def _parse_study_pack(self, response_text: str) -> Dict[str, Any]:
+        """
+        Split a study pack response into notes markdown and validated items,
+        salvaging whatever a truncated or malformed response still holds
+        """
+        try:
+            data = json.loads(self._clean_json_response(response_text))
+        except json.JSONDecodeError:
+            data = None
+
+        if isinstance(data, dict):
+            self.parse_stats.incr('full_parses')
+            self.metrics.record_parse('study_pack', 'full')
+            notes = data.get('notes')
+            questions = data.get('questions')
+            flashcards = data.get('flashcards')
+            return {
+                'notes': notes.strip() if isinstance(notes, str) else '',
+                'questions': [item for item in questions if validate_question(item)]
+                if isinstance(questions, list) else [],
+                'flashcards': [item for item in flashcards if validate_flashcard(item)]
+                if isinstance(flashcards, list) else [],
+            }
+
+        pack = {
+            'notes': salvage_string(response_text, 'notes').strip(),
+            'questions': salvage_items(response_text, 'questions', validate_question),
+            'flashcards': salvage_items(response_text, 'flashcards', validate_flashcard),
+        }
+        if pack['notes']:
+            self.parse_stats.incr('salvaged_responses')
+            self.metrics.record_parse('study_pack', 'salvaged')
+            logger.warning(f"Salvaged study pack with {len(pack['questions'])} questions and "
+                           f"{len(pack['flashcards'])} flashcards from malformed AI response")
+        else:
+            self.parse_stats.incr('failed_parses')
+            self.metrics.record_parse('study_pack', 'failed')
+        return pack
+
+    def generate_study_pack(self, topic: str, description: str = "", guidelines: str = "",
+                            num_questions: int = 5, num_cards: int = 10, difficulty: str = 'medium',
+                            use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Generate notes, quiz questions and flashcards on a topic in one model call
+
+        Returns {'notes': markdown, 'questions': [...], 'flashcards': [...]}.
+        Questions or cards lost to truncation are topped up from the
+        generated notes with the regular quiz and flashcard generators.
+        """
+        num_questions = item_count(num_questions, self.max_questions)
+        num_cards = item_count(num_cards, self.max_flashcards)
+        try:
+            prompt = self._create_study_pack_prompt(
+                topic, description, guidelines, num_questions, num_cards, difficulty
+            )
+            cache_key = self._cache_key('study_pack', prompt)
+            cached = self._get_cached('study_pack', cache_key, use_cache)
+            if cached is not None:
+                return cached
+
+            items_estimate = (
+                self.OUTPUT_OVERHEAD_TOKENS +
+                num_questions * self.ITEM_OUTPUT_TOKENS['questions'] +
+                num_cards * self.ITEM_OUTPUT_TOKENS['flashcards']
+            ) * self.OUTPUT_HEADROOM
+            budget = min(self.max_output_tokens, self.NOTES_OUTPUT_TOKENS + int(items_estimate))
+
+            response_text, model_name = self._generate_with_fallback(prompt, 'study_pack', budget)
+            pack = self._parse_study_pack(response_text)
+            if not pack['notes']:
+                raise Exception("Failed to parse AI response")
+
+            missing = num_questions - len(pack['questions'])
+            if missing > 0:
+                logger.info(f"Requesting {missing} missing study pack questions")
+                pack['questions'] += self.generate_quiz_questions(
+                    pack['notes'], topic, missing, difficulty, use_cache
+                )
+            missing = num_cards - len(pack['flashcards'])
+            if missing > 0:
+                logger.info(f"Requesting {missing} missing study pack flashcards")
+                pack['flashcards'] += self.generate_flashcards(pack['notes'], topic, missing, use_cache)
+
+            pack['questions'] = pack['questions'][:num_questions]
+            pack['flashcards'] = pack['flashcards'][:num_cards]
+            self.cache.set(cache_key, 'study_pack', pack, model_name)
+            return pack
+
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating study pack: {e}")
+            raise Exception(f"Failed to generate study pack: {str(e)}")
+
+    def stream_notes(self, topic: str, description: str = "", guidelines: str = "",
+                     use_cache: bool = True):
+        """
+        Generate notes like generate_notes, yielding markdown chunks as they arrive
+        """
+        prompt = self._create_notes_prompt(topic, description, guidelines)
+        cache_key = self._cache_key('notes', prompt)
+        cached = self._get_cached('notes', cache_key, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        model_name = ''
+        for model_name, text in self._stream_with_fallback(prompt, 'notes'):
+            chunks.append(text)
+            yield text
+
+        notes_content = ''.join(chunks).strip()
+        if not notes_content:
+            raise Exception("Empty response from Gemini API")
+        self.cache.set(cache_key, 'notes', notes_content, model_name)
+
+    def _stream_items(self, operation: str, prompt: str, key: str, validator, limit: int,
+                      use_cache: bool = True):
+        """
+        Yield validated objects of the `key` array as soon as each one is complete
+        """
+        cache_key = self._cache_key(operation, prompt)
+        cached = self._get_cached(operation, cache_key, use_cache)
+        if cached is not None:
+            yield from cached
+            return
+
+        parser = IncrementalArrayParser(key)
+        items = []
+        model_name = ''
+        budget = self._output_budget(key, limit)
+        for model_name, text in self._stream_with_fallback(prompt, operation, budget):
+            for item in parser.feed(text):
+                if not validator(item):
+                    logger.warning(f"Skipping invalid {operation} item from {model_name}")
+                    continue
+                items.append(item)
+                yield item
+                if len(items) >= limit:
+                    break
+            if len(items) >= limit or parser.finished:
+                break
+
+        if not items:
+            self.metrics.record_parse(key, 'failed')
+            raise Exception("Invalid response format from Gemini API")
+        # A stream that stopped before the array closed (and short of limit) was cut off
+        self.metrics.record_parse(key, 'full' if parser.finished or len(items) >= limit else 'salvaged')
+        self.cache.set(cache_key, operation, items, model_name)
+
+    def stream_quiz_questions(self, note_content: str, note_title: str, num_questions: int = 5,
+                              difficulty: str = 'medium', use_cache: bool = True):
+        """Generate quiz questions like generate_quiz_questions, yielding each one as it completes"""
+        num_questions = item_count(num_questions, self.max_questions)
+        prompt = self._create_quiz_prompt(compact_text(note_content), note_title, num_questions, difficulty)
+        yield from self._stream_items('quiz', prompt, 'questions', validate_question,
+                                      num_questions, use_cache)
+
+    def stream_quiz_from_topic(self, topic: str, num_questions: int = 5, difficulty: str = 'medium',
+                               use_cache: bool = True):
+        """Generate topic quiz questions like generate_quiz_from_topic, yielding each one as it completes"""
+        num_questions = item_count(num_questions, self.max_questions)
+        prompt = self._create_quiz_prompt("", topic, num_questions, difficulty)
+        yield from self._stream_items('quiz_topic', prompt, 'questions', validate_question,
+                                      num_questions, use_cache)
+
+    def stream_flashcards(self, note_content: str, note_title: str, num_cards: int = 10,
+                          use_cache: bool = True):
+        """Generate flashcards like generate_flashcards, yielding each card as it completes"""
+        num_cards = item_count(num_cards, self.max_flashcards)
+        prompt = self._create_flashcard_prompt(compact_text(note_content), note_title, num_cards)
+        yield from self._stream_items('flashcards', prompt, 'flashcards', validate_flashcard,
+                                      num_cards, use_cache)
+
     def _create_quiz_prompt(self, content: str, title: str, num_questions: int, difficulty: str) -> str:
         """Create a structured prompt for quiz generation"""
         difficulty_instructions = {
@@ -249,173 +904,142 @@ class GeminiAIService:
 
         # Handle topic-only generation (when content is empty or minimal)
         if not content or len(content.strip()) < 10:
-            prompt = f"""
-You are an expert educational content creator specializing in quiz generation. Your task is to create high-quality multiple-choice questions about the given topic.
-
-**TOPIC:** {title}
-
-**GENERATION REQUIREMENTS:**
-- Generate exactly {num_questions} multiple-choice questions about {title}
-- Difficulty level: {difficulty}
-- {difficulty_instructions.get(difficulty, difficulty_instructions['medium'])}
-- Use your knowledge to create comprehensive questions about this topic
-- Cover different aspects and subtopics related to {title}
-
-**QUESTION STANDARDS:**
-- Each question must have exactly 4 answer choices
-- Only one choice should be correct
-- Questions should cover important concepts related to {title}
-- Use clear, academic language appropriate for the difficulty level
-- Include educational explanations for correct answers
-- Ensure questions test understanding, not just memorization
-- Avoid ambiguous or trick questions
-
-**Required JSON Format:**
-{{
-    "questions": [
-        {{
-            "question_text": "Your question here?",
-            "choices": [
-                {{"text": "Option A", "is_correct": false}},
-                {{"text": "Option B", "is_correct": true}},
-                {{"text": "Option C", "is_correct": false}},
-                {{"text": "Option D", "is_correct": false}}
-            ],
-            "explanation": "Brief explanation of why the correct answer is right."
-        }}
-    ]
-}}
-
-Generate the quiz questions now:
-"""
+            source = f"""**TOPIC:** {title}"""
+            scope = f"""- Generate exactly {num_questions} multiple-choice questions about {title}
+- Cover different aspects and subtopics of {title} using your own knowledge"""
         else:
-            prompt = f"""
-You are an expert educational content creator specializing in quiz generation. Your task is to create high-quality multiple-choice questions based on the provided study material.
-
-**CONTENT TO ANALYZE:**
+            source = f"""**CONTENT TO ANALYZE:**
 Title: {title}
-Content: {content}
+Content: {content}"""
+            scope = f"""- Generate exactly {num_questions} multiple-choice questions
+- Questions must relate directly to the provided content"""
 
-**GENERATION REQUIREMENTS:**
-- Generate exactly {num_questions} multiple-choice questions
-- Difficulty level: {difficulty}
-- {difficulty_instructions.get(difficulty, difficulty_instructions['medium'])}
-
-**QUESTION STANDARDS:**
-- Each question must have exactly 4 answer choices
-- Only one choice should be correct
-- Questions should directly relate to the provided content
-- Use clear, academic language appropriate for the difficulty level
-- Include educational explanations for correct answers
-- Ensure questions test understanding, not just memorization
-- Avoid ambiguous or trick questions
-
-**Required JSON Format:**
-{{
-    "questions": [
-        {{
-            "question_text": "Your question here?",
-            "choices": [
-                {{"text": "Option A", "is_correct": false}},
-                {{"text": "Option B", "is_correct": true}},
-                {{"text": "Option C", "is_correct": false}},
-                {{"text": "Option D", "is_correct": false}}
-            ],
-            "explanation": "Brief explanation of why the correct answer is right."
-        }}
-    ]
-}}
-
-Generate the quiz questions now:
+        return f"""You are an expert educational content creator. Write high-quality multiple-choice quiz questions.
+
+{source}
+
+**REQUIREMENTS:**
+{scope}
+- Difficulty: {difficulty}. {difficulty_instructions.get(difficulty, difficulty_instructions['medium'])}
+- Exactly 4 answer choices per question, exactly one correct
+- Clear academic language; test understanding, not memorization; no ambiguous or trick questions
+- Briefly explain why the correct answer is right
+
+**Respond with JSON only:**
+{{"questions": [{{"question_text": "...?", "choices": [{{"text": "...", "is_correct": false}}, {{"text": "...", "is_correct": true}}, ...], "explanation": "..."}}]}}
 """
-        return prompt
-    
+
     def _create_flashcard_prompt(self, content: str, title: str, num_cards: int) -> str:
         """Create a structured prompt for flashcard generation"""
-        prompt = f"""
-You are an expert educational content creator specializing in flashcard generation for effective learning and retention.
+        return f"""You are an expert educational content creator. Write flashcards for effective learning and retention.
 
 **CONTENT TO ANALYZE:**
 Title: {title}
 Content: {content}
 
-**GENERATION REQUIREMENTS:**
+**REQUIREMENTS:**
 - Generate exactly {num_cards} high-quality flashcards
-- Each flashcard must have a clear front (question/prompt) and back (answer)
-
-**FLASHCARD STANDARDS:**
-- Front: Concise, specific questions or prompts that test key concepts
-- Back: Comprehensive yet concise answers with clear explanations
-- Focus on essential information: definitions, concepts, formulas, processes
-- Create a variety of card types: definitions, explanations, applications, examples
-- Ensure questions are specific and have definitive answers
-- Avoid yes/no questions or overly broad prompts
-- Include helpful hints when appropriate to aid learning
-- Use active recall principles to enhance memory retention
-
-**Required JSON Format:**
-{{
-    "flashcards": [
-        {{
-            "front_text": "Question or prompt here",
-            "back_text": "Answer or explanation here",
-            "hint": "Optional hint (can be empty)"
-        }}
-    ]
-}}
-
-Generate the flashcards now:
+- Front: a concise, specific question or prompt with a definitive answer; no yes/no or overly broad prompts
+- Back: a clear, concise answer or explanation
+- Mix definitions, concepts, formulas, processes, applications and examples
+- Add a short hint where it aids recall, otherwise leave it empty
+
+**Respond with JSON only:**
+{{"flashcards": [{{"front_text": "...", "back_text": "...", "hint": "..."}}]}}
 """
-        return prompt
 
     def _create_notes_prompt(self, topic: str, description: str = "", guidelines: str = "") -> str:
         """Create a structured prompt for notes generation"""
 
-        prompt = f"""
-You are an expert educational content creator and teacher. Your task is to create comprehensive, well-structured study notes on the given topic.
+        prompt = f"""You are an expert educational content creator and teacher. Write comprehensive, well-structured study notes.
+
+**TOPIC:** {topic}
+"""
+
+        if description:
+            prompt += f"""**ADDITIONAL CONTEXT/DESCRIPTION:** {compact_text(description)}
+"""
+
+        if guidelines:
+            prompt += f"""**SPECIFIC GUIDELINES TO FOLLOW:** {compact_text(guidelines)}
+"""
+
+        prompt += f"""
+**REQUIREMENTS:**
+- Cover all important aspects of {topic} accurately: key concepts, definitions, explanations and examples
+- Markdown: ## and ### section headers, bullet and numbered lists, bold key terms, short paragraphs
+- Structure: Introduction/Overview; Key Concepts and Definitions; Main Topics with subsections; Important Details and Examples; Summary/Key Takeaways
+- Flow logically from basic to advanced concepts
+
+Write the study notes now:
+"""
+        return prompt
+
+    def _create_study_pack_prompt(self, topic: str, description: str, guidelines: str,
+                                  num_questions: int, num_cards: int, difficulty: str) -> str:
+        """Create a prompt asking for notes, a quiz and flashcards in one JSON response"""
+        difficulty_instructions = {
+            'easy': 'Focus on basic concepts and definitions. Questions should test recall and understanding.',
+            'medium': 'Include application and analysis questions. Mix recall with problem-solving.',
+            'hard': 'Focus on synthesis, evaluation, and complex problem-solving. Include scenario-based questions.'
+        }
+
+        prompt = f"""You are an expert educational content creator and teacher. Create a study pack: study notes, a multiple-choice quiz and flashcards that all cover the same material.
 
 **TOPIC:** {topic}
 """
 
         if description:
-            prompt += f"""
-**ADDITIONAL CONTEXT/DESCRIPTION:** {description}
+            prompt += f"""**ADDITIONAL CONTEXT/DESCRIPTION:** {compact_text(description)}
 """
 
         if guidelines:
-            prompt += f"""
-**SPECIFIC GUIDELINES TO FOLLOW:** {guidelines}
+            prompt += f"""**SPECIFIC GUIDELINES TO FOLLOW:** {compact_text(guidelines)}
 """
 
         prompt += f"""
+**NOTES:**
+- Comprehensive, accurate markdown notes on {topic}: ## and ### headers, lists, bold key terms, examples
+- Flow from basic to advanced concepts and end with a Summary/Key Takeaways section
+
+**QUIZ:**
+- Generate exactly {num_questions} multiple-choice questions based on the notes
+- Difficulty: {difficulty}. {difficulty_instructions.get(difficulty, difficulty_instructions['medium'])}
+- Exactly 4 answer choices per question, exactly one correct, with a brief explanation
 
-**CONTENT REQUIREMENTS:**
-- Create comprehensive, educational notes covering all important aspects of {topic}
-- Structure the content with clear headings and subheadings
-- Include key concepts, definitions, and explanations
-- Use bullet points and numbered lists for clarity
-- Add examples where appropriate to illustrate concepts
-- Ensure the content is accurate and educationally sound
-- Make the notes suitable for studying and review
-
-**FORMATTING GUIDELINES:**
-- Use markdown formatting for better readability
-- Include clear section headers (##, ###)
-- Use bullet points (-) and numbered lists (1., 2., 3.)
-- Bold important terms and concepts
-- Keep paragraphs concise and focused
-- Ensure logical flow from basic to advanced concepts
-
-**CONTENT STRUCTURE:**
-1. Introduction/Overview
-2. Key Concepts and Definitions
-3. Main Topics (broken down into subsections)
-4. Important Details and Examples
-5. Summary/Key Takeaways
-
-Generate comprehensive study notes now:
+**FLASHCARDS:**
+- Generate exactly {num_cards} high-quality flashcards based on the notes
+- Front: a concise, specific prompt with a definitive answer; back: a clear, concise answer; optional short hint
+
+**Respond with JSON only**, with the notes as a single markdown string:
+{{"notes": "# ...", "questions": [{{"question_text": "...?", "choices": [{{"text": "...", "is_correct": false}}, ...], "explanation": "..."}}], "flashcards": [{{"front_text": "...", "back_text": "...", "hint": "..."}}]}}
 """
         return prompt
 
-# Global instance
-ai_service = GeminiAIService()
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_ai_service() -> GeminiAIService:
+    """Return the shared service, creating it on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = GeminiAIService()
+    return _service
+
+
+def warm_up():
+    """
+    Create the service and its model clients before traffic arrives
+
+    Called from the gunicorn post_worker_init hook so the SDK import is
+    paid per worker at boot rather than by the first generation request.
+    """
+    get_ai_service().warm_up()
+
+
+# Global instance; nothing is imported or configured until it is first used
+ai_service = SimpleLazyObject(get_ai_service)
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+import json
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,6 +57,7 @@ INSTALLED_APPS = [
     'quizzes',
     'flashcards',
     'analytics',
+    'generation',
 ]
 
 MIDDLEWARE = [
@@ -189,7 +191,98 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Gemini API Configuration
-GEMINI_API_KEY = config('GEMINI_API_KEY')
+GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
+
+# AI provider backend (see generation/providers.py): 'gemini', or 'fake' for
+# load testing and CI without an API key
+AI_PROVIDER = config('AI_PROVIDER', default='gemini')
+# Create the AI service in each gunicorn worker at boot (see gunicorn.conf.py)
+# instead of on the first generation request
+AI_WARM_UP = config('AI_WARM_UP', default=True, cast=bool)
+AI_FAKE_PROVIDER = {
+    'latency_median': config('AI_FAKE_LATENCY_MEDIAN', default=1.0, cast=float),  # in seconds
+    'latency_sigma': config('AI_FAKE_LATENCY_SIGMA', default=0.5, cast=float),
+    'failure_rate': config('AI_FAKE_FAILURE_RATE', default=0.0, cast=float),
+    'truncate_rate': config('AI_FAKE_TRUNCATE_RATE', default=0.0, cast=float),
+    'seed': config('AI_FAKE_SEED', default=0, cast=int),
+}
+# Per-model overrides as JSON, e.g. {"gemini-2.5-flash": {"failure_rate": 0.2}}
+AI_FAKE_MODEL_OVERRIDES = config('AI_FAKE_MODEL_OVERRIDES', default='{}', cast=json.loads)
+
+# AI response cache (see generation/cache.py)
+AI_CACHE_ENABLED = config('AI_CACHE_ENABLED', default=True, cast=bool)
+AI_CACHE_TTL = config('AI_CACHE_TTL', default=60 * 60 * 24 * 7, cast=int)  # in seconds
+AI_CACHE_MAX_ENTRIES = config('AI_CACHE_MAX_ENTRIES', default=5000, cast=int)
+AI_CACHE_MAX_ENTRY_BYTES = config('AI_CACHE_MAX_ENTRY_BYTES', default=256 * 1024, cast=int)
+
+# Follow-up calls made to fill in items missing from a truncated AI response
+AI_MAX_FOLLOWUP_CALLS = config('AI_MAX_FOLLOWUP_CALLS', default=2, cast=int)
+
+# Long notes are split on headings into chunks of this many (estimated) tokens
+# and generated in parallel on a bounded thread pool
+AI_CHUNK_TOKEN_BUDGET = config('AI_CHUNK_TOKEN_BUDGET', default=6000, cast=int)
+AI_CHUNK_MAX_WORKERS = config('AI_CHUNK_MAX_WORKERS', default=4, cast=int)
+
+# Identical concurrent generation requests share one in-flight call (see generation/coalesce.py)
+AI_SINGLE_FLIGHT_LEASE = config('AI_SINGLE_FLIGHT_LEASE', default=300, cast=int)  # in seconds
+AI_SINGLE_FLIGHT_LINGER = config('AI_SINGLE_FLIGHT_LINGER', default=10, cast=int)  # in seconds
+
+# Stored responses for Idempotency-Key retries of generation endpoints (see generation/idempotency.py)
+AI_IDEMPOTENCY_TTL = config('AI_IDEMPOTENCY_TTL', default=60 * 60 * 24, cast=int)  # in seconds
+
+# Shared question pool for topic quizzes (see quizzes/pool.py). A pool is
+# topped up in the background once a topic has been requested
+# AI_QUESTION_POOL_MIN_REQUESTS times and holds fewer than MIN_SIZE questions
+AI_QUESTION_POOL_ENABLED = config('AI_QUESTION_POOL_ENABLED', default=True, cast=bool)
+AI_QUESTION_POOL_MIN_REQUESTS = config('AI_QUESTION_POOL_MIN_REQUESTS', default=2, cast=int)
+AI_QUESTION_POOL_MIN_SIZE = config('AI_QUESTION_POOL_MIN_SIZE', default=20, cast=int)
+AI_QUESTION_POOL_TARGET_SIZE = config('AI_QUESTION_POOL_TARGET_SIZE', default=50, cast=int)
+AI_QUESTION_POOL_BATCH_SIZE = config('AI_QUESTION_POOL_BATCH_SIZE', default=10, cast=int)
+
+# Quiz questions and answer keys, cached per content version (see quizzes/cache.py)
+QUIZ_CONTENT_CACHE_TTL = config('QUIZ_CONTENT_CACHE_TTL', default=60 * 60 * 24, cast=int)  # in seconds
+
+# Hedged requests (see GeminiAIService._hedged_pass): when the model has not
+# answered within AI_HEDGE_PERCENTILE of its recent latency, the next healthy
+# model is raced against it. AI_HEDGE_MAX_RATIO caps hedges per request
+AI_HEDGE_ENABLED = config('AI_HEDGE_ENABLED', default=False, cast=bool)
+AI_HEDGE_PERCENTILE = config('AI_HEDGE_PERCENTILE', default=90, cast=float)
+AI_HEDGE_DEFAULT_DELAY = config('AI_HEDGE_DEFAULT_DELAY', default=10.0, cast=float)  # in seconds, until latency is known
+AI_HEDGE_MIN_DELAY = config('AI_HEDGE_MIN_DELAY', default=0.5, cast=float)  # in seconds
+AI_HEDGE_MAX_RATIO = config('AI_HEDGE_MAX_RATIO', default=0.1, cast=float)
+AI_HEDGE_BURST = config('AI_HEDGE_BURST', default=5, cast=int)
+AI_HEDGE_MAX_WORKERS = config('AI_HEDGE_MAX_WORKERS', default=16, cast=int)
+
+# Share of AI responses whose raw payload is logged when DEBUG logging is on
+AI_LOG_SAMPLE_RATE = config('AI_LOG_SAMPLE_RATE', default=0.01, cast=float)
+
+# Output budget ceiling for quiz and flashcard responses; each call is sized
+# from its item count. Larger requested counts are trimmed to these limits
+AI_MAX_OUTPUT_TOKENS = config('AI_MAX_OUTPUT_TOKENS', default=8192, cast=int)
+AI_MAX_QUESTIONS = config('AI_MAX_QUESTIONS', default=30, cast=int)
+AI_MAX_FLASHCARDS = config('AI_MAX_FLASHCARDS', default=50, cast=int)
+
+# Deadline for synchronous generation requests (see generation/deadline.py).
+# Clients may ask for less with the X-Request-Timeout header; keep this below
+# the gunicorn worker timeout (30s by default). 0 disables the deadline
+AI_REQUEST_TIMEOUT = config('AI_REQUEST_TIMEOUT', default=25, cast=float)  # in seconds
+# Budget a model call needs before its latency history is known
+AI_MIN_CALL_SECONDS = config('AI_MIN_CALL_SECONDS', default=2.0, cast=float)
+
+# AI model circuit breaker (see generation/health.py)
+AI_BREAKER_FAILURE_THRESHOLD = config('AI_BREAKER_FAILURE_THRESHOLD', default=3, cast=int)
+AI_BREAKER_RECOVERY_SECONDS = config('AI_BREAKER_RECOVERY_SECONDS', default=60, cast=int)
+
+# Speculative quiz and flashcard drafts generated in the background when a
+# note is saved (see generation/drafts.py). Off by default: every note save
+# costs two model calls. The delay lets a burst of edits settle first
+AI_SPECULATIVE_DRAFTS = config('AI_SPECULATIVE_DRAFTS', default=False, cast=bool)
+AI_SPECULATIVE_DELAY = config('AI_SPECULATIVE_DELAY', default=15, cast=int)  # in seconds
+
+# Background AI generation jobs (see generation/jobs.py)
+AI_JOB_MAX_ATTEMPTS = config('AI_JOB_MAX_ATTEMPTS', default=3, cast=int)
+AI_JOB_RETRY_BACKOFF = config('AI_JOB_RETRY_BACKOFF', default=10, cast=int)  # in seconds, doubled per retry
+AI_JOB_LEASE_SECONDS = config('AI_JOB_LEASE_SECONDS', default=600, cast=int)
 
 # Production Security Settings
 if not DEBUG:
@@ -36,6 +36,7 @@ urlpatterns = [
     path('api/quizzes/', include('quizzes.urls')),
     path('api/flashcards/', include('flashcards.urls')),
     path('api/analytics/', include('analytics.urls')),
+    path('api/ai/', include('generation.urls')),
 ]
 
 # Serve media files during development